@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+import numpy as np
+from utility_module import SingletonMeta
+from log_module import logger
+
+
+def _current_index_version() -> tuple:
+    from file_classifier_module.retrieval_cache import current_index_version
+
+    return current_index_version()
+
+
+@dataclass
+class _CacheEntry:
+    query: str
+    vector: np.ndarray
+    doc_ids: FrozenSet[str]
+    model: str
+    reply: Dict[str, Any]
+    stored_at: float
+
+
+class SemanticAnswerCache(metaclass=SingletonMeta):
+    """
+    语义问答缓存（单例，LRU + TTL）。
+
+    以查询向量为键缓存LLM回复：新问题与已缓存问题的余弦相似度达到阈值、
+    且上下文引用的论文集合与模型完全相同时，直接返回缓存的回复。
+    索引版本（语料库或向量库写入）变化时清空全部条目。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.95,
+    ):
+        """
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl_seconds: 条目有效期（秒）
+            similarity_threshold: 命中所需的最小余弦相似度
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidations = 0
+
+    def get(self, vector, doc_ids, model: str) -> Optional[Dict[str, Any]]:
+        """
+        查找语义相近的已缓存回复。
+
+        Args:
+            vector: 查询向量（已L2归一化）
+            doc_ids: 上下文引用的论文file_id集合
+            model: LLM模型键（模型名及影响输出的生成参数）
+
+        Returns:
+            dict or None: 命中时返回缓存回复的副本（附带cached_query与similarity）
+        """
+        query_vector = np.asarray(vector, dtype=np.float32)
+        doc_ids = frozenset(doc_ids)
+        now = time.monotonic()
+        with self._lock:
+            self.__check_version()
+            best_id, best_similarity = None, -1.0
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry.stored_at > self.ttl_seconds:
+                    del self._entries[entry_id]
+                    self.expired += 1
+                    continue
+                if entry.doc_ids != doc_ids or entry.model != model:
+                    continue
+                similarity = float(np.dot(entry.vector, query_vector))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            logger.debug(f"✔ 问答缓存命中（相似度{best_similarity:.3f}）: {entry.query}")
+            return {**entry.reply, "cached_query": entry.query, "similarity": best_similarity}
+
+    def put(self, query: str, vector, doc_ids, model: str, reply: Dict[str, Any]) -> None:
+        with self._lock:
+            self.__check_version()
+            self._entries[self._next_id] = _CacheEntry(
+                query=query,
+                vector=np.asarray(vector, dtype=np.float32),
+                doc_ids=frozenset(doc_ids),
+                model=model,
+                reply=dict(reply),
+                stored_at=time.monotonic(),
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        """返回命中率及各计数"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "invalidations": self.invalidations,
+            "similarity_threshold": self.similarity_threshold,
+        }
+
+    def __check_version(self) -> None:
+        """索引版本变化时清空缓存（调用方需持有锁）"""
+        version = _current_index_version()
+        if version != self._version:
+            if self._entries:
+                logger.debug(f"索引版本已变更，清空{len(self._entries)}条问答缓存")
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
@@ -0,0 +1,225 @@
+"""批量问答：离线评估回答质量与延迟"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from log_module import logger
+
+from .semantic_service import Generator
+from .session import SessionManager
+
+
+def load_questions(
+    questions_path, invalid_lines: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, str]]:
+    """
+    读取问题文件。
+
+    支持两种格式：
+        - .jsonl：每行一个对象，包含 question 字段，可选 id 字段
+        - 其他：纯文本，每行一个问题（空行与#开头的行忽略）
+
+    无法解析或缺少question字段的行跳过，不影响其余问题。
+
+    Args:
+        questions_path: 问题文件路径
+        invalid_lines: 不为None时，被跳过的行以 {"line", "error"} 追加到该列表
+
+    Returns:
+        list: [{"id", "question"}]，未提供id时使用行号
+    """
+    questions = []
+    path = Path(questions_path)
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or (path.suffix != ".jsonl" and line.startswith("#")):
+                continue
+            if path.suffix != ".jsonl":
+                questions.append({"id": str(line_number), "question": line})
+                continue
+            try:
+                record = json.loads(line)
+                question = record["question"]
+                if not isinstance(question, str) or not question.strip():
+                    raise ValueError("question must be a non-empty string")
+            except (ValueError, KeyError, TypeError) as e:
+                logger.debug(f"✖ 问题文件第{line_number}行无效，已跳过: {e!r}")
+                if invalid_lines is not None:
+                    invalid_lines.append({"line": line_number, "error": repr(e)})
+                continue
+            questions.append({"id": str(record.get("id", line_number)), "question": question})
+    return questions
+
+
+def _percentile(values: List[float], ratio: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class BatchQARunner:
+    """
+    批量问答执行器。
+
+    问题按块处理：每块先并发完成意图分类与检索（并发的查询向量计算由embedding服务合并为批量编码），
+    再在并发上限内并发调用LLM，结果逐条写入JSONL。
+    每个问题使用独立会话，处理完成后立即移除，不影响在线用户的会话。
+    """
+
+    def __init__(
+        self,
+        generator: Optional[Generator] = None,
+        retrieval_workers: int = 4,
+        llm_concurrency: int = 4,
+        block_size: int = 64,
+    ):
+        """
+        Args:
+            generator: 问答生成器，为None时使用单例
+            retrieval_workers: 并发检索线程数
+            llm_concurrency: 并发LLM调用数（同时受共享LLM客户端的全局并发上限约束）
+            block_size: 每块问题数（限制同时存在的会话数）
+        """
+        self.generator = generator or Generator()
+        self.retrieval_workers = max(1, retrieval_workers)
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.block_size = max(1, block_size)
+
+    def run(self, questions_path, output_path) -> Dict[str, Any]:
+        """
+        执行批量问答。
+
+        Args:
+            questions_path: 问题文件路径
+            output_path: 输出JSONL路径（覆盖写入）
+
+        Returns:
+            dict: 汇总统计（问题数、失败数、被跳过的无效行、各阶段耗时的p50/p95）
+        """
+        invalid_lines: List[Dict[str, Any]] = []
+        questions = load_questions(questions_path, invalid_lines)
+        logger.debug(f"开始批量问答: {len(questions)}个问题，输出到 {output_path}")
+        start = time.perf_counter()
+        records: List[Dict[str, Any]] = []
+        batch_id = SessionManager.new_session_id()[:8]
+
+        with open(output_path, "w", encoding="utf-8") as f, ThreadPoolExecutor(
+            max_workers=self.retrieval_workers, thread_name_prefix="batch-retrieval"
+        ) as retrieval_pool, ThreadPoolExecutor(
+            max_workers=self.llm_concurrency, thread_name_prefix="batch-llm"
+        ) as llm_pool:
+            for block_start in range(0, len(questions), self.block_size):
+                block = questions[block_start : block_start + self.block_size]
+                for index, item in enumerate(block, start=block_start):
+                    # 用户提供的id可能重复，会话id使用问题序号保证唯一
+                    item["session_id"] = f"batch-{batch_id}-{index}"
+
+                prepared = list(retrieval_pool.map(self.__prepare, block))
+                for record in llm_pool.map(self.__answer, prepared):
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    records.append(record)
+                f.flush()
+                logger.debug(f"批量问答进度: {len(records)}/{len(questions)}")
+
+        summary = self.__summarize(records, time.perf_counter() - start)
+        summary["invalid_lines"] = invalid_lines
+        logger.debug(f"✔ 批量问答完成: {summary}")
+        return summary
+
+    def __prepare(self, item: Dict[str, str]) -> Dict[str, Any]:
+        """意图分类与检索"""
+        record: Dict[str, Any] = {"id": item["id"], "question": item["question"], "timings": {}}
+        record["session_id"] = item["session_id"]
+        try:
+            self.generator.set_demand(item["question"], item["session_id"])
+            record["timings"].update(self.generator.get_demand_timings(item["session_id"]))
+        except Exception as e:
+            record["error"] = f"set_demand failed: {e}"
+        return record
+
+    def __answer(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """调用LLM生成回复（文件查询直接返回文档列表）"""
+        session_id = record.pop("session_id")
+        try:
+            if "error" not in record:
+                start = time.perf_counter()
+                reply = self.generator.get_LLM_reply(session_id)
+                record["timings"]["llm_ms"] = (time.perf_counter() - start) * 1000
+                record["type"] = reply.get("type")
+                if reply.get("type") == "file_query":
+                    record["results"] = reply.get("results", [])
+                else:
+                    record["reply"] = reply.get("reply")
+                    record["citations"] = [
+                        c.get("doc_id") for c in reply.get("citations", [])
+                    ]
+                    record["cached"] = bool(reply.get("cached"))
+                if "error" in reply:
+                    record["error"] = reply["error"]
+        except Exception as e:
+            record["error"] = f"get_LLM_reply failed: {e}"
+        finally:
+            self.generator.end_session(session_id)
+        record["timings"]["total_ms"] = sum(
+            record["timings"].get(name, 0.0) for name in ("set_demand_ms", "llm_ms")
+        )
+        return record
+
+    @staticmethod
+    def __summarize(records: List[Dict[str, Any]], elapsed_seconds: float) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "questions": len(records),
+            "errors": sum(1 for r in records if "error" in r),
+            "qa": sum(1 for r in records if r.get("type") == "qa"),
+            "file_query": sum(1 for r in records if r.get("type") == "file_query"),
+            "cached": sum(1 for r in records if r.get("cached")),
+            "wall_seconds": elapsed_seconds,
+        }
+        for stage in ("classification_ms", "retrieval_ms", "llm_ms", "total_ms"):
+            values = [r["timings"][stage] for r in records if stage in r["timings"]]
+            summary[stage] = {"p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95)}
+        return summary
+
+
+def run_batch_qa(
+    questions_path,
+    output_path,
+    retrieval_workers: int = 4,
+    llm_concurrency: int = 4,
+    block_size: int = 64,
+) -> Dict[str, Any]:
+    """批量问答入口，参数见BatchQARunner"""
+    runner = BatchQARunner(
+        retrieval_workers=retrieval_workers,
+        llm_concurrency=llm_concurrency,
+        block_size=block_size,
+    )
+    return runner.run(questions_path, output_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量问答（离线评估）")
+    parser.add_argument("questions", help="问题文件（.txt每行一个问题，或.jsonl含question字段）")
+    parser.add_argument("output", help="输出JSONL路径")
+    parser.add_argument("--retrieval-workers", type=int, default=4)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--block-size", type=int, default=64)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            run_batch_qa(
+                args.questions,
+                args.output,
+                args.retrieval_workers,
+                args.llm_concurrency,
+                args.block_size,
+            ),
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
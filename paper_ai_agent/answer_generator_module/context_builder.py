@@ -0,0 +1,172 @@
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from log_module import logger
+from utility_module import WORD_PATTERN
+
+from .data_models import QueryResult
+
+
+@dataclass
+class ContextPassage:
+    """放入提示词的一段上下文"""
+
+    citation_id: str
+    doc_id: str
+    title: str
+    text: str
+    score: float
+    page: Optional[int] = None
+    section: Optional[str] = None
+    start_offset: Optional[int] = None
+    end_offset: Optional[int] = None
+    chunk_index: Optional[int] = None
+    tokens: int = 0
+
+    def header(self) -> str:
+        """段落标题行：[引用ID] 论文标题（页码，章节）"""
+        location = []
+        if self.page is not None:
+            location.append(f"p.{self.page}")
+        if self.section:
+            location.append(self.section)
+        suffix = f" ({', '.join(location)})" if location else ""
+        return f"[{self.citation_id}] {self.title}{suffix}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ContextBuilder:
+    """
+    问答上下文构建器。
+
+    从所有检索结果的文本块中挑选最相关的段落：
+    - 段落得分 = 文本块相似度 × 论文融合相关度，跨论文统一排序
+    - 去除同一论文中位置重叠的文本块，以及词集合高度相似的近重复文本块
+    - 按得分依次放入，直到达到token预算；无文本块的论文（仅BM25命中）使用标题与摘要
+    引用ID使用论文file_id，与提示词中的引用规则一致。
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 1500,
+        max_chunks_per_doc: int = 3,
+        dedup_threshold: float = 0.8,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Args:
+            token_budget: 上下文的最大token数（含段落标题行）
+            max_chunks_per_doc: 每篇论文最多放入的文本块数
+            dedup_threshold: 两段文本词集合的Jaccard相似度达到该值时视为重复
+            token_counter: token计数函数，为None时使用prompt_packer.count_tokens
+        """
+        if token_counter is None:
+            from file_classifier_module.prompt_packer import count_tokens
+
+            token_counter = count_tokens
+        self.token_budget = token_budget
+        self.max_chunks_per_doc = max_chunks_per_doc
+        self.dedup_threshold = dedup_threshold
+        self.count_tokens = token_counter
+
+    def build(self, results: List[QueryResult]) -> Tuple[str, List[ContextPassage]]:
+        """
+        构建上下文。
+
+        Args:
+            results: 检索结果（QueryResult.passages为命中的文本块）
+
+        Returns:
+            tuple: (上下文文本, 放入的段落列表)，段落按得分降序排列
+        """
+        selected: List[ContextPassage] = []
+        selected_words: List[frozenset] = []
+        per_doc: Dict[str, int] = {}
+        used_tokens = 0
+        skipped_duplicates = 0
+
+        for candidate in self.__candidates(results):
+            if per_doc.get(candidate.doc_id, 0) >= self.max_chunks_per_doc:
+                continue
+            words = frozenset(WORD_PATTERN.findall(candidate.text.lower()))
+            if any(self.__overlaps(candidate, kept) for kept in selected) or any(
+                self.__jaccard(words, kept_words) >= self.dedup_threshold
+                for kept_words in selected_words
+            ):
+                skipped_duplicates += 1
+                continue
+
+            block = f"{candidate.header()}\n{candidate.text}"
+            tokens = self.count_tokens(block) + 1
+            if used_tokens + tokens > self.token_budget:
+                # 放不下时继续尝试更短的段落
+                continue
+            candidate.tokens = tokens
+            used_tokens += tokens
+            selected.append(candidate)
+            selected_words.append(words)
+            per_doc[candidate.doc_id] = per_doc.get(candidate.doc_id, 0) + 1
+
+        context = "\n\n".join(f"{p.header()}\n{p.text}" for p in selected)
+        logger.debug(
+            f"✔ 上下文构建完成: {len(selected)}段，{used_tokens}/{self.token_budget} tokens，"
+            f"去重{skipped_duplicates}段"
+        )
+        return context, selected
+
+    def __candidates(self, results: List[QueryResult]) -> List[ContextPassage]:
+        """展开所有文本块为候选段落并按得分降序排列"""
+        candidates = []
+        for result in results:
+            doc_weight = max(result.relevance, 0.0) / 100.0
+            if not result.passages:
+                if result.summary:
+                    # 无文本块时以摘要代替，相似度按中等水平估计
+                    candidates.append(
+                        ContextPassage(
+                            citation_id=result.doc_id,
+                            doc_id=result.doc_id,
+                            title=result.title,
+                            text=result.summary.strip(),
+                            score=0.5 * doc_weight,
+                            section="summary",
+                        )
+                    )
+                continue
+            for passage in result.passages:
+                text = (passage.get("text") or "").strip()
+                if not text:
+                    continue
+                candidates.append(
+                    ContextPassage(
+                        citation_id=result.doc_id,
+                        doc_id=result.doc_id,
+                        title=result.title,
+                        text=text,
+                        score=passage.get("similarity", 0.0) * doc_weight,
+                        page=passage.get("page"),
+                        section=passage.get("section"),
+                        start_offset=passage.get("start_offset"),
+                        end_offset=passage.get("end_offset"),
+                        chunk_index=passage.get("chunk_index"),
+                    )
+                )
+        candidates.sort(key=lambda p: p.score, reverse=True)
+        return candidates
+
+    @staticmethod
+    def __overlaps(a: ContextPassage, b: ContextPassage) -> bool:
+        """同一论文中字符区间重叠（相邻文本块的重叠部分）"""
+        if a.doc_id != b.doc_id or None in (a.start_offset, a.end_offset, b.start_offset, b.end_offset):
+            return False
+        overlap = min(a.end_offset, b.end_offset) - max(a.start_offset, b.start_offset)
+        shorter = min(a.end_offset - a.start_offset, b.end_offset - b.start_offset)
+        # 只有很小的重叠（分块时的句子重叠）不算重复
+        return shorter > 0 and overlap / shorter > 0.5
+
+    @staticmethod
+    def __jaccard(a: frozenset, b: frozenset) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,149 @@
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from utility_module import WORD_PATTERN
+
+_REFERRING_WORDS = frozenset(
+    {
+        "it", "its", "this", "these", "those", "they", "them", "their", "previous",
+    }
+)
+_REFERRING_PHRASES_ZH = ("它", "这个", "这些", "那个", "那些", "上述", "刚才", "继续")
+"""指代上文的词：短问题中出现时视为追问"""
+_SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?。！？])\s+")
+
+
+@dataclass
+class ConversationTurn:
+    """一轮问答"""
+
+    question: str
+    answer: str
+    demand_type: str
+    doc_ids: List[str] = field(default_factory=list)
+    chunk_ids: List[str] = field(default_factory=list)
+    """放入上下文的文本块，格式为 file_id#chunk_index"""
+    reused_retrieval: bool = False
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "answer": self.answer,
+            "demand_type": self.demand_type,
+            "doc_ids": self.doc_ids,
+            "chunk_ids": self.chunk_ids,
+            "reused_retrieval": self.reused_retrieval,
+            "created_at": self.created_at,
+        }
+
+
+@dataclass
+class ConversationMemory:
+    """
+    会话的多轮对话记忆。
+
+    最近的若干轮以原文放入提示词，超出token预算时把最早的轮次折叠为抽取式摘要
+    （问题原文 + 回答首句），摘要本身也受预算约束，最旧的摘要行最先丢弃。
+    同时记录最近一次检索的查询向量，供判断追问是否仍是同一话题。
+    """
+
+    turns: List[ConversationTurn] = field(default_factory=list)
+    summary_lines: List[str] = field(default_factory=list)
+    topic_query: str = ""
+    topic_vector: Optional[List[float]] = None
+    topic_index_version: Optional[tuple] = None
+
+    def add_turn(
+        self,
+        turn: ConversationTurn,
+        token_counter: Callable[[str], int],
+        token_budget: int,
+    ) -> None:
+        """追加一轮问答并在超出预算时折叠旧轮次"""
+        self.turns.append(turn)
+        summary_budget = token_budget // 3
+        while len(self.turns) > 1 and self.__history_tokens(token_counter) > token_budget:
+            oldest = self.turns.pop(0)
+            self.summary_lines.append(self.__summarize_turn(oldest))
+            while self.summary_lines and token_counter("\n".join(self.summary_lines)) > summary_budget:
+                self.summary_lines.pop(0)
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        """历史对话消息（摘要 + 最近轮次原文），插入在本轮提示词之前"""
+        messages: List[Dict[str, str]] = []
+        if self.summary_lines:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": "Summary of the earlier conversation:\n" + "\n".join(self.summary_lines),
+                }
+            )
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.question})
+            messages.append({"role": "assistant", "content": turn.answer})
+        return messages
+
+    def is_follow_up(
+        self,
+        query: str,
+        query_vector=None,
+        similarity_threshold: float = 0.6,
+        index_version: Optional[tuple] = None,
+        referring_floor: float = 0.3,
+    ) -> bool:
+        """
+        判断新问题是否为同一话题的追问（可复用上一次检索结果）。
+
+        有查询向量时以与上一次检索查询的余弦相似度为准：达到阈值视为追问；
+        含指代词的短问题（如"它的训练数据呢？"）只需达到较低的referring_floor。
+        没有可用向量时才单独使用指代词规则。索引版本变化后不复用。
+        """
+        if not self.topic_query or (index_version is not None and index_version != self.topic_index_version):
+            return False
+        if query_vector is not None and self.topic_vector is not None:
+            similarity = sum(a * b for a, b in zip(query_vector, self.topic_vector))
+            if similarity >= similarity_threshold:
+                return True
+            if similarity < referring_floor:
+                return False
+        words = WORD_PATTERN.findall(query.lower())
+        english_words = [word for word in words if word.isascii()]
+        # 中文按两个字约等于一个词估算问题长度
+        length = len(english_words) + (len(words) - len(english_words)) / 2
+        refers = any(word in _REFERRING_WORDS for word in english_words) or any(
+            phrase in query for phrase in _REFERRING_PHRASES_ZH
+        )
+        return length <= 8 and refers
+
+    def set_topic(self, query: str, query_vector=None, index_version: Optional[tuple] = None) -> None:
+        """记录本次检索的查询（后续追问与其比较）"""
+        self.topic_query = query
+        self.topic_vector = list(query_vector) if query_vector is not None else None
+        self.topic_index_version = index_version
+
+    def clear(self) -> None:
+        self.turns.clear()
+        self.summary_lines.clear()
+        self.topic_query = ""
+        self.topic_vector = None
+        self.topic_index_version = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "summary": self.summary_lines,
+            "turns": [turn.to_dict() for turn in self.turns],
+            "topic_query": self.topic_query,
+        }
+
+    def __history_tokens(self, token_counter: Callable[[str], int]) -> int:
+        return sum(token_counter(message["content"]) for message in self.history_messages())
+
+    @staticmethod
+    def __summarize_turn(turn: ConversationTurn) -> str:
+        first_sentence = _SENTENCE_END_PATTERN.split(turn.answer.strip(), maxsplit=1)[0]
+        if len(first_sentence) > 300:
+            first_sentence = first_sentence[:300] + "..."
+        cited = f" (papers: {', '.join(turn.doc_ids[:3])})" if turn.doc_ids else ""
+        return f"- User asked: {turn.question} -> Answer: {first_sentence}{cited}"
@@ -41,6 +41,8 @@ class QueryResult:
     summary: str
     # key_fields_summary: str
     high_freq_terms: Dict[str, int]
+    passages: List[Dict[str, Any]] = field(default_factory=list)
+    """命中的文本块：text、similarity（余弦相似度）、page、section、start_offset、end_offset、chunk_index"""
 
 
 # LLM配置数据模型
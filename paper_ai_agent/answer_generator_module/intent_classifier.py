@@ -0,0 +1,263 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from utility_module import SingletonMeta, WORD_PATTERN, normalize_query
+from log_module import logger
+
+FILE_LABEL = "FILE"
+QA_LABEL = "QA"
+
+# 初始权重（正值倾向FILE，负值倾向QA），来自原关键字规则；训练时作为起点。
+# 未训练时单个关键字命中不应越过置信度阈值（0.8对应得分约1.39），交由LLM确认并记录标注，
+# 因此关键字权重取1.0（概率约0.73）；多个关键字同时命中时才在本地直接判定。
+_SEED_WEIGHTS: Dict[str, float] = {
+    **{
+        f"w:{word}": 1.0
+        for word in ("file", "files", "document", "documents", "doc", "docs", "list", "show",
+                     "open", "report", "reports", "pdf", "pdfs", "find", "search")
+    },
+    **{
+        f"w:{word}": -1.0
+        for word in ("why", "how", "explain", "difference", "compare", "versus", "vs")
+    },
+    "b:what is": -1.0,
+    "b:what s": -1.0,
+    "b:what are": -0.75,
+    "q:question": -0.25,
+}
+
+
+def extract_features(normalized_query: str) -> List[str]:
+    """提取稀疏特征：单词、相邻词二元组、是否以疑问词开头"""
+    tokens = WORD_PATTERN.findall(normalized_query)
+    features = [f"w:{token}" for token in tokens]
+    features.extend(f"b:{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    if tokens and tokens[0] in ("what", "why", "how", "which", "who"):
+        features.append("q:question")
+    return features
+
+
+class IntentClassifier(metaclass=SingletonMeta):
+    """
+    本地意图分类器（单例）。
+
+    对稀疏词特征做逻辑回归，判断查询是文件查询（FILE）还是问答（QA），单次预测耗时在微秒级。
+    - 初始权重来自原关键字规则，之后用LLM标注过的历史查询（JSONL日志）训练
+    - 置信度低于阈值时由调用方交给LLM分类，LLM的结果写入日志并定期在后台重新训练
+    - 分类结果按规范化查询缓存（LRU）
+    """
+
+    def __init__(
+        self,
+        confidence_threshold: float = 0.8,
+        cache_size: int = 1024,
+        log_filename: str = "intent_queries.jsonl",
+        retrain_every: int = 50,
+    ):
+        """
+        初始化分类器。单例模式确保此方法只执行一次，存在日志时立即训练。
+
+        Args:
+            confidence_threshold: 本地预测的置信度阈值，低于该值时需要LLM分类
+            cache_size: 分类结果缓存的最大条目数
+            log_filename: 标注日志文件名（位于DB/common目录）
+            retrain_every: 每新增多少条标注样本后重新训练
+        """
+        project_root = Path(__file__).parent.parent
+        self.log_path = project_root / "DB" / "common" / log_filename
+        self.confidence_threshold = confidence_threshold
+        self.cache_size = cache_size
+        self.retrain_every = retrain_every
+
+        self._weights: Dict[str, float] = dict(_SEED_WEIGHTS)
+        self._bias = 0.0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._new_samples = 0
+        self._training = False
+        self.cache_hits = 0
+        self.local_decisions = 0
+        self.llm_decisions = 0
+        self.trained_samples = 0
+
+        self.train(self.load_samples())
+
+    # ======================
+    # 预测
+    # ======================
+
+    def predict(self, query: str) -> Tuple[str, float]:
+        """
+        本地预测。
+
+        Returns:
+            tuple: (标签, 置信度)，置信度为预测标签的概率（0.5~1.0）
+        """
+        features = extract_features(normalize_query(query))
+        weights = self._weights
+        score = self._bias + sum(weights.get(feature, 0.0) for feature in features)
+        probability = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+        if probability >= 0.5:
+            return FILE_LABEL, probability
+        return QA_LABEL, 1.0 - probability
+
+    def classify(self, query: str, fallback=None, record_fallback: bool = True) -> str:
+        """
+        分类查询：缓存 -> 本地模型 -> （置信度不足时）fallback。
+
+        Args:
+            query: 用户查询
+            fallback: 置信度不足时调用的函数 fallback(query) -> 标签或None（通常为LLM分类），
+                      返回None时使用本地预测结果
+            record_fallback: 是否把fallback的结果记为训练样本（桩模型等非真实后端的结果不应记录）
+
+        Returns:
+            str: FILE 或 QA
+        """
+        key = normalize_query(query)
+        with self._lock:
+            label = self._cache.get(key)
+            if label is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return label
+
+        start = time.perf_counter()
+        label, confidence = self.predict(query)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if confidence >= self.confidence_threshold or fallback is None:
+            self.local_decisions += 1
+            logger.debug(f"✔ 本地意图分类: {label}（置信度{confidence:.2f}，耗时{elapsed_ms:.3f}ms）")
+        else:
+            fallback_label = fallback(query)
+            if fallback_label in (FILE_LABEL, QA_LABEL):
+                self.llm_decisions += 1
+                logger.debug(
+                    f"本地意图分类置信度不足（{label} {confidence:.2f}），LLM分类结果: {fallback_label}"
+                )
+                label = fallback_label
+                if record_fallback:
+                    self.record(query, label)
+            else:
+                self.local_decisions += 1
+                logger.debug(f"✖ LLM意图分类失败，使用本地结果: {label}（置信度{confidence:.2f}）")
+
+        with self._lock:
+            self._cache[key] = label
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return label
+
+    # ======================
+    # 训练数据与训练
+    # ======================
+
+    def record(self, query: str, label: str) -> None:
+        """把一条标注样本追加到日志，累计到一定数量后在后台重新训练"""
+        record = {"query": query, "label": label, "time": time.time()}
+        with self._log_lock:
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.debug(f"✖ 写入意图标注日志失败: {e}")
+                return
+            self._new_samples += 1
+            if self._new_samples < self.retrain_every or self._training:
+                return
+            self._new_samples = 0
+            self._training = True
+
+        def _retrain():
+            try:
+                self.train(self.load_samples())
+            finally:
+                self._training = False
+
+        threading.Thread(target=_retrain, name="intent-retrain", daemon=True).start()
+
+    def load_samples(self) -> List[Tuple[str, str]]:
+        """读取标注日志，同一规范化查询以最后一次标注为准，损坏的行直接跳过"""
+        if not self.log_path.exists():
+            return []
+        samples: Dict[str, str] = {}
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record["label"] in (FILE_LABEL, QA_LABEL):
+                        samples[normalize_query(record["query"])] = record["label"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+        return list(samples.items())
+
+    def train(
+        self,
+        samples: Iterable[Tuple[str, str]],
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-3,
+    ) -> None:
+        """
+        以关键字权重为起点，用随机梯度下降训练逻辑回归。
+
+        Args:
+            samples: (查询, 标签) 列表
+            epochs: 训练轮数
+            learning_rate: 学习率
+            l2: L2正则系数（把权重拉回初始值，避免少量样本时偏离关键字规则太远）
+        """
+        data = [
+            (extract_features(normalize_query(query)), 1.0 if label == FILE_LABEL else 0.0)
+            for query, label in samples
+        ]
+        if not data:
+            return
+        start = time.perf_counter()
+        weights = dict(_SEED_WEIGHTS)
+        bias = 0.0
+        for _ in range(epochs):
+            for features, target in data:
+                score = bias + sum(weights.get(feature, 0.0) for feature in features)
+                probability = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+                gradient = probability - target
+                bias -= learning_rate * gradient
+                for feature in features:
+                    current = weights.get(feature, 0.0)
+                    prior = _SEED_WEIGHTS.get(feature, 0.0)
+                    weights[feature] = current - learning_rate * (gradient + l2 * (current - prior))
+
+        correct = 0
+        for features, target in data:
+            score = bias + sum(weights.get(feature, 0.0) for feature in features)
+            correct += (score >= 0) == (target == 1.0)
+
+        with self._lock:
+            self._weights = weights
+            self._bias = bias
+            # 模型变化后旧的分类结果可能不再一致
+            self._cache.clear()
+        self.trained_samples = len(data)
+        logger.debug(
+            f"✔ 意图分类器训练完成: {len(data)}条样本，训练集准确率{correct / len(data):.2%}，"
+            f"耗时{time.perf_counter() - start:.2f}s"
+        )
+
+    def metrics(self) -> dict:
+        total = self.cache_hits + self.local_decisions + self.llm_decisions
+        return {
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "local_decisions": self.local_decisions,
+            "llm_decisions": self.llm_decisions,
+            "llm_rate": self.llm_decisions / total if total else 0.0,
+            "trained_samples": self.trained_samples,
+            "confidence_threshold": self.confidence_threshold,
+        }
@@ -1,13 +1,18 @@
-from typing import List, Dict, Any, Optional, AsyncGenerator
-from collections import Counter
-import asyncio
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, AsyncGenerator, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
 from openai.types.chat import ChatCompletion
-from .data_models import DemandType, Document, QueryResult, LLMConfig
-
-from datetime import datetime
+from .data_models import DemandType, Document, QueryResult
+from .session import DemandSnapshot, GeneratorSession, SessionManager
+from .intent_classifier import FILE_LABEL, IntentClassifier
+from .context_builder import ContextBuilder, ContextPassage
+from .answer_cache import SemanticAnswerCache
+from .conversation import ConversationTurn
 from global_module import answer_generator_config, API_KEY
-from utility_module import SingletonMeta
+from utility_module import SingletonMeta, get_llm_client_factory
+from log_module import logger
 from database_module import *
 
 
@@ -19,124 +24,299 @@ class Generator(metaclass=SingletonMeta):
         1. 自动识别意图（文件查询/问答）
         2. 文档搜索与富集
         3. 基于上下文的LLM问答
+
+    LLM客户端、索引与论文记录缓存由所有用户共享；每个用户的需求、检索结果与停止标记
+    保存在按session_id区分的GeneratorSession中，可在多线程服务器下并发调用。
+    未传入session_id时使用进程内的本地会话（单用户脚本调用）；HTTP接口为每个客户端分配独立的session_id。
     """
 
+    _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="generator-intent")
+    """意图分类线程池（所有会话共享，与检索并行执行）"""
+
     def __init__(self):
 
-        self._documents: List[File]
-        # 运行时状态
-        self._current_demand_raw: str = ""
-        self._current_demand_type: Optional[DemandType] = None
-        self._current_query_results: List[QueryResult] = []
-        self._stopped: bool = False
+        # 论文记录按需从数据库加载（按file_id缓存，索引版本变化时清空）
+        self._document_cache: "OrderedDict[str, Document]" = OrderedDict()
+        self._document_cache_size: int = 512
+        self._document_cache_version: Optional[tuple] = None
+        self._document_cache_lock = threading.Lock()
+        # 每个用户的运行时状态
+        self._sessions = SessionManager(
+            ttl_seconds=float(answer_generator_config.get("session_ttl", 1800)),
+            max_sessions=int(answer_generator_config.get("max_sessions", 1000)),
+        )
 
-        # LLM配置与客户端
-        self._client: Optional[OpenAI] = OpenAI(
-            api_key=API_KEY,
-            base_url=answer_generator_config.base_url,
+        # 本地意图分类器（低置信度时回退到LLM）
+        self._intent_classifier = IntentClassifier(
+            confidence_threshold=float(answer_generator_config.get("intent_confidence_threshold", 0.8)),
+            cache_size=int(answer_generator_config.get("intent_cache_size", 1024)),
         )
 
+        # 问答上下文构建
+        self._context_builder = ContextBuilder(
+            token_budget=int(answer_generator_config.get("context_token_budget", 1500)),
+            max_chunks_per_doc=int(answer_generator_config.get("context_max_chunks_per_doc", 3)),
+            dedup_threshold=float(answer_generator_config.get("context_dedup_threshold", 0.8)),
+        )
+
+        # 语义问答缓存（相近问题且引用相同论文时复用回复）
+        self._answer_cache: Optional[SemanticAnswerCache] = (
+            SemanticAnswerCache(
+                max_entries=int(answer_generator_config.get("answer_cache_size", 512)),
+                ttl_seconds=float(answer_generator_config.get("answer_cache_ttl", 3600)),
+                similarity_threshold=float(answer_generator_config.get("answer_cache_similarity", 0.95)),
+            )
+            if answer_generator_config.get("answer_cache_enabled", True)
+            else None
+        )
+
+        # 共享LLM客户端（推理后端由llm_client_config.backend决定）
+        self._llm = get_llm_client_factory()
+
     # ======================
     # 公共API
     # ======================
 
-    def set_demand(self, user_input: str) -> bool:
+    def set_demand(self, user_input: str, session_id: Optional[str] = None) -> bool:
         """设置用户需求"""
-        self._stopped = False
-        self._current_demand_raw = user_input.strip()
-        self._current_demand_type = self._classify_demand(user_input)
-        self._current_query_results = self._search_and_enrich(user_input)
+        session = self._sessions.get(session_id)
+        with session.lock:
+            from file_classifier_module.retrieval_cache import current_index_version
+
+            session.stopped = False
+            session.demand_id += 1
+            session.demand_raw = user_input.strip()
+            session.query_vector = None
+            session.turn_pending = True
+            # 意图分类（可能调用LLM）与检索互不依赖：分类在后台线程执行，检索投机地同时进行，
+            # 总耗时为两者中的较大值而非之和（文件查询与问答都需要检索结果）
+            start = time.perf_counter()
+            demand_future = self._executor.submit(self._timed_classify, user_input)
+
+            # 同一话题的追问直接复用上一次的检索结果
+            index_version = current_index_version()
+            conversation = session.conversation
+            session.reused_retrieval = bool(session.query_results) and conversation.is_follow_up(
+                user_input,
+                self._session_query_vector(session) if conversation.topic_vector else None,
+                similarity_threshold=float(answer_generator_config.get("followup_similarity", 0.6)),
+                index_version=index_version,
+            )
+            if session.reused_retrieval:
+                logger.debug(f"追问复用上一次检索结果（话题: {conversation.topic_query}）")
+            else:
+                session.query_results = self._search_and_enrich(user_input)
+                conversation.set_topic(
+                    user_input, self._session_query_vector(session), index_version
+                )
+            search_ms = (time.perf_counter() - start) * 1000
+            session.demand_type, classify_ms = demand_future.result()
+            session.timings = {
+                "classification_ms": classify_ms,
+                "retrieval_ms": search_ms,
+                "set_demand_ms": (time.perf_counter() - start) * 1000,
+            }
+            logger.debug(
+                f"需求处理完成: 检索{search_ms:.0f}ms，分类{classify_ms:.0f}ms，"
+                f"总耗时{session.timings['set_demand_ms']:.0f}ms，类型: {session.demand_type}"
+            )
         return True
 
-    def stop_current_task(self) -> bool:
+    def get_conversation(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """返回会话的对话历史（较早轮次的摘要与最近轮次原文）"""
+        session = self._sessions.get(session_id)
+        with session.lock:
+            return session.conversation.to_dict()
+
+    def reset_conversation(self, session_id: Optional[str] = None) -> bool:
+        """清空会话的对话历史，下一个问题重新检索"""
+        session = self._sessions.get(session_id)
+        with session.lock:
+            session.conversation.clear()
+            session.query_results = []
+        return True
+
+    def get_demand_timings(self, session_id: Optional[str] = None) -> Dict[str, float]:
+        """返回最近一次set_demand各阶段的耗时（毫秒）"""
+        return dict(self._sessions.get(session_id).timings)
+
+    def end_session(self, session_id: str) -> bool:
+        """结束并移除会话（批处理等一次性调用方使用）"""
+        return self._sessions.remove(session_id)
+
+    def stop_current_task(self, session_id: Optional[str] = None) -> bool:
         """停止当前任务（流式输出时使用）"""
-        self._stopped = True
+        # 不获取会话锁：流式输出期间锁可能被占用，停止标记需要立即生效
+        self._sessions.get(session_id).stopped = True
         return True
 
-    def redo_task(self, user_input: str) -> bool:
+    def redo_task(self, user_input: str, session_id: Optional[str] = None) -> bool:
         """重新运行任务"""
-        return self.set_demand(user_input)
+        return self.set_demand(user_input, session_id)
 
-    def get_query_file(self) -> List[str]:
+    def get_query_file(self, session_id: Optional[str] = None) -> List[str]:
         """返回匹配的文档标题列表（用于UI）"""
-        return [r.title for r in self._current_query_results]
+        return [r.title for r in self._sessions.get(session_id).query_results]
 
-    def get_qualified_files_info(self, top_n: int = 5) -> List[Dict[str, str]]:
+    def get_qualified_files_info(
+        self, top_n: int = 5, session_id: Optional[str] = None
+    ) -> List[Dict[str, str]]:
         """返回Top N文档的结构化信息"""
-        results: List[Dict[str, str]] = []
-        for r in self._current_query_results[:top_n]:
-            results.append(
-                {
-                    "doc_id": r.doc_id,
-                    "title": r.title,
-                    "relevance_percent": f"{r.relevance:.2f}%",
-                    "summary": r.summary,
-                    # "key_fields_summary": r.key_fields_summary,
-                    "high_freq_terms": ", ".join(
-                        [f"{k}:{v}" for k, v in r.high_freq_terms.items()]
-                    ),
-                }
-            )
-        return results
+        return self._files_info(self._sessions.get(session_id).query_results, top_n)
 
-    def get_query_task_result(self) -> List[Dict[str, str]]:
+    def get_query_task_result(self, session_id: Optional[str] = None) -> List[Dict[str, str]]:
         """返回所有查询结果（调试用）"""
-        return self.get_qualified_files_info(top_n=len(self._current_query_results))
+        session = self._sessions.get(session_id)
+        return self.get_qualified_files_info(
+            top_n=len(session.query_results), session_id=session_id
+        )
 
-    def get_LLM_reply(self) -> Any:
+    def get_LLM_reply(self, session_id: Optional[str] = None) -> Any:
         """获取LLM回复"""
-        if not self._current_demand_raw:
+        session = self._sessions.get(session_id)
+        # 需求、检索结果与对话历史在会话锁内取快照，之后只使用快照构建回复
+        demand = session.snapshot()
+        if not demand.demand_raw:
             return {"error": "no demand set"}
 
         # 文件查询：直接返回文档列表
-        if self._current_demand_type == DemandType.FILE_QUERY:
+        if demand.demand_type == DemandType.FILE_QUERY:
+            results = self._files_info(demand.query_results, top_n=10)
+            self._record_turn(
+                session,
+                demand,
+                "Found documents: " + "; ".join(r["title"] for r in results),
+                [r["doc_id"] for r in results],
+            )
             return {
                 "type": "file_query",
-                "query": self._current_demand_raw,
-                "results": self.get_qualified_files_info(top_n=10),
+                "query": demand.demand_raw,
+                "results": results,
             }
 
         # 问答：需要调用LLM
-        if not isinstance(self._client, OpenAI) or API_KEY.strip() == "":
+        if not self._llm.is_available(API_KEY):
             return {"error": "QA without api key"}
 
-        context_text = self._build_context_from_results(self._current_query_results)
-        prompt = self._build_llm_prompt(
-            query=self._current_demand_raw, context=context_text
-        )
+        prompt, passages = self._build_qa_prompt(demand)
+        doc_ids = {p.doc_id for p in passages}
+        query_vector = self._answer_cache_vector(demand)
+        if query_vector is not None:
+            cached = self._answer_cache.get(query_vector, doc_ids, self._answer_cache_model())
+            if cached is not None:
+                self._record_turn(session, demand, cached["reply"], passages)
+                # 只复用回复文本：提示词与引用来自本次请求，不能泄露其他用户的问题
+                return {
+                    "type": "qa",
+                    "prompt_sent": prompt,
+                    "reply": cached["reply"],
+                    "citations": [p.to_dict() for p in passages],
+                    "cached": True,
+                    "similarity": cached["similarity"],
+                }
 
         try:
-            resp: ChatCompletion = self._client.chat.completions.create(
-                model=answer_generator_config.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt},
-                ],
+            resp: ChatCompletion = self._chat(
+                self._build_qa_messages(prompt, demand),
                 max_tokens=answer_generator_config.max_tokens,
                 temperature=answer_generator_config.temperature,
             )
             if isinstance(resp.choices[0].message.content, str):
                 reply_text: str = resp.choices[0].message.content.strip()
+                self._record_turn(session, demand, reply_text, passages)
             else:
                 reply_text = "(LLM returned non-text content)"
+                query_vector = None  # 占位回复不缓存，也不计入对话历史
         except Exception as e:
             reply_text = f"(LLM call failed) {e}"
+            query_vector = None  # 失败的回复不缓存，也不计入对话历史
 
-        return {
+        reply = {
             "type": "qa",
             "prompt_sent": prompt,
             "reply": reply_text,
+            "citations": [p.to_dict() for p in passages],
         }
-
-    async def stream_LLM_reply(self) -> AsyncGenerator[str, None]:
-        """异步流式返回LLM回复"""
-        reply_obj = self.get_LLM_reply()
-        text = reply_obj.get("reply", "")
-        for ch in text:
-            if self._stopped:
-                break
-            yield ch
-            await asyncio.sleep(0.01)
+        if query_vector is not None:
+            self._answer_cache.put(
+                demand.demand_raw, query_vector, doc_ids, self._answer_cache_model(), reply
+            )
+        return reply
+
+    async def stream_LLM_reply(
+        self, session_id: Optional[str] = None
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """
+        异步流式返回LLM回复（推理后端的流式接口，逐个增量转发）
+
+        问答逐个返回文本增量（str）；文件查询不调用LLM，返回一个结构化结果（dict）。
+        未设置需求或问答缺少API key时抛出RuntimeError。
+        调用stop_current_task后在下一个增量到达时停止，并关闭上游连接以终止生成。
+        """
+        session = self._sessions.get(session_id)
+        session.stopped = False
+        demand = session.snapshot()
+        if not demand.demand_raw:
+            raise RuntimeError("no demand set")
+        if demand.demand_type == DemandType.FILE_QUERY:
+            yield self.get_LLM_reply(session_id)
+            return
+        if not self._llm.is_available(API_KEY):
+            raise RuntimeError("QA without api key")
+
+        prompt, passages = self._build_qa_prompt(demand)
+        doc_ids = {p.doc_id for p in passages}
+        query_vector = self._answer_cache_vector(demand)
+        if query_vector is not None:
+            cached = self._answer_cache.get(query_vector, doc_ids, self._answer_cache_model())
+            if cached is not None:
+                self._record_turn(session, demand, cached["reply"], passages)
+                yield cached["reply"]
+                return
+
+        deltas: List[str] = []
+        stream = self._llm.stream(
+            api_key=API_KEY,
+            base_url=answer_generator_config.base_url,
+            model=answer_generator_config.model,
+            messages=self._build_qa_messages(prompt, demand),
+            max_tokens=answer_generator_config.max_tokens,
+            temperature=answer_generator_config.temperature,
+        )
+        try:
+            async for delta in stream:
+                if session.stopped:
+                    logger.debug(f"会话{session.session_id}已停止，中断流式输出")
+                    break
+                deltas.append(delta)
+                yield delta
+            else:
+                # 只缓存并记录完整生成的回复（被停止或为空的不缓存）
+                reply_text = "".join(deltas).strip()
+                if reply_text:
+                    self._record_turn(session, demand, reply_text, passages)
+                if query_vector is not None and reply_text:
+                    self._answer_cache.put(
+                        demand.demand_raw,
+                        query_vector,
+                        doc_ids,
+                        self._answer_cache_model(),
+                        {
+                            "type": "qa",
+                            "prompt_sent": prompt,
+                            "reply": reply_text,
+                            "citations": [p.to_dict() for p in passages],
+                        },
+                    )
+        finally:
+            # 关闭后端流（HTTP后端随之断开上游连接，终止生成）
+            await stream.aclose()
+
+    def get_answer_cache_metrics(self) -> Dict[str, Any]:
+        """返回语义问答缓存的命中率等指标"""
+        if self._answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._answer_cache.metrics()}
 
     def set_llm_config(
         self,
@@ -147,7 +327,7 @@ class Generator(metaclass=SingletonMeta):
         temperature: Optional[float] = None,
         base_url: Optional[str] = None,
     ) -> bool:
-        """更新LLM配置并重建客户端"""
+        """更新LLM配置（共享客户端按base_url复用，无需重建）"""
         if model is not None:
             answer_generator_config.model = model
         if max_tokens is not None:
@@ -158,57 +338,40 @@ class Generator(metaclass=SingletonMeta):
             answer_generator_config.temperature = temperature
         if base_url is not None:
             answer_generator_config.base_url = base_url
-        self._client = OpenAI(
-            api_key=API_KEY,
-            base_url=answer_generator_config.base_url,
-        )
         return True
 
+    def get_llm_metrics(self) -> Dict[str, Any]:
+        """返回各模型LLM调用的延迟与token用量"""
+        return self._llm.metrics()
+
     # ======================
     # 内部方法：意图识别
     # ======================
 
-    def _classify_demand(self, user_input: str) -> DemandType:
-        """分类用户需求类型"""
-        # 优先用LLM分类
-        llm_label = self._classify_with_llm(user_input)
-        if llm_label == "FILE":
-            return DemandType.FILE_QUERY
-        if llm_label == "QA":
-            return DemandType.QA
-
-        # 关键字 fallback
-        text = user_input.lower()
-        file_keywords = [
-            "file",
-            "document",
-            "doc",
-            "list",
-            "show",
-            "open",
-            "report",
-            "pdf",
-            "find",
-            "search",
-        ]
-        qa_keywords = [
-            "why",
-            "how",
-            "explain",
-            "difference",
-            "compare",
-            "what is",
-            "what's",
-        ]
+    def _timed_classify(self, user_input: str) -> Tuple[DemandType, float]:
+        from database_module import session as database_session
 
-        has_file = any(k in text for k in file_keywords)
-        has_qa = any(k in text for k in qa_keywords)
+        start = time.perf_counter()
+        try:
+            demand_type = self._classify_demand(user_input)
+        finally:
+            # 在线程池中执行，释放本线程可能打开的数据库会话
+            database_session.remove()
+        return demand_type, (time.perf_counter() - start) * 1000
 
-        return DemandType.FILE_QUERY if has_file else DemandType.QA
+    def _classify_demand(self, user_input: str) -> DemandType:
+        """分类用户需求类型：优先使用本地分类器，置信度不足时才调用LLM"""
+        label = self._intent_classifier.classify(
+            user_input,
+            fallback=self._classify_with_llm,
+            # 桩模型的分类结果只用于压测，不能作为训练样本
+            record_fallback=self._llm.backend != "stub",
+        )
+        return DemandType.FILE_QUERY if label == FILE_LABEL else DemandType.QA
 
     def _classify_with_llm(self, user_input: str) -> Optional[str]:
         """用LLM进行意图分类"""
-        if not self._client:
+        if not self._llm.is_available(API_KEY):
             return None
 
         system_prompt = (
@@ -222,9 +385,8 @@ class Generator(metaclass=SingletonMeta):
         user_prompt = f"User query:\n{user_input}\n\nYour answer (FILE or QA):"
 
         try:
-            resp = self._client.chat.completions.create(
-                model=answer_generator_config.model,
-                messages=[
+            resp = self._chat(
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
@@ -242,68 +404,256 @@ class Generator(metaclass=SingletonMeta):
         except Exception:
             return None
 
+    def _chat(self, messages: List[Dict[str, str]], **kwargs) -> ChatCompletion:
+        """通过共享LLM客户端调用当前配置的模型"""
+        return self._llm.chat(
+            api_key=API_KEY,
+            base_url=answer_generator_config.base_url,
+            model=answer_generator_config.model,
+            messages=messages,
+            **kwargs,
+        )
+
     # ======================
     # 内部方法：搜索与富集（调用独立相关性计算器）
     # ======================
 
     def _search_and_enrich(self, query: str) -> List[QueryResult]:
-        """基于关键词的搜索与结果富集"""
-        # 调用独立模块的分词方法
-        query_tokens = ...
-        results: List[QueryResult] = []
+        """基于混合检索（FAISS + BM25融合排序）的搜索与结果富集"""
+        from file_classifier_module.utils import hybrid_retrieve, get_term_stats
 
-        # 计算文档相关性得分（调用独立模块）
-        scored_docs = []
-        for doc in self._documents:
-            score: int = ...
-            if score > 0:
-                scored_docs.append((doc, score))
-
-        if not scored_docs:
+        try:
+            retrieval = hybrid_retrieve(query, k=10)
+        except Exception as e:
+            logger.debug(f"✖ 混合检索失败: {e}")
             return []
+        if not retrieval.hits:
+            return []
+
+        file_ids = [hit.file_id for hit in retrieval.hits]
+        documents = self._load_documents(file_ids)
+        term_stats = {stats["file_id"]: stats for stats in get_term_stats(file_ids)}
+        query_tokens = self._tokenize_query(query)
 
-        # 归一化得分到0-100%
-        max_score = max(s for _, s in scored_docs) or 1.0
+        # 融合得分归一化到0-100%（启用重排时列表按交叉编码器得分排序，首条不一定是融合得分最高的）
+        max_score = max(hit.score for hit in retrieval.hits) or 1.0
 
-        # 构建查询结果
-        for doc, score in scored_docs:
-            relevance_percent = (score / max_score) * 100.0
+        results: List[QueryResult] = []
+        for hit in retrieval.hits:
+            doc = documents.get(hit.file_id)
+            if doc is None:
+                # 数据库中没有记录（如入库中途失败），退回检索结果自带的字段
+                doc = Document(
+                    file_id=hit.file_id,
+                    title=hit.metadata.get("file_title", "")
+                    or hit.metadata.get("file_name", ""),
+                    summary=hit.metadata.get("file_summary", ""),
+                )
             results.append(
                 QueryResult(
                     doc_id=doc.file_id,
                     title=doc.title,
-                    relevance=relevance_percent,
+                    relevance=(hit.score / max_score) * 100.0,
                     summary=doc.summary,
                     # key_fields_summary=self._summarize_key_fields(doc),
-                    high_freq_terms=self._extract_high_freq_terms(doc, query_tokens),
+                    high_freq_terms=self._extract_high_freq_terms(
+                        doc, query_tokens, term_stats.get(doc.file_id)
+                    ),
+                    passages=self._hit_passages(hit),
                 )
             )
-
-        # 按相关性排序
-        results.sort(key=lambda x: x.relevance, reverse=True)
         return results
 
+    def _hit_passages(self, hit) -> List[Dict[str, Any]]:
+        """把命中的文本块转换为上下文构建所需的字段（FAISS IndexFlatL2返回平方L2距离d，向量已归一化，对应余弦相似度1-d/2）"""
+        passages = []
+        for chunk, distance in hit.chunks:
+            metadata = chunk.metadata
+            passages.append(
+                {
+                    "text": chunk.page_content,
+                    "similarity": 1.0 - float(distance) / 2.0,
+                    "page": metadata.get("page"),
+                    "section": metadata.get("section"),
+                    "start_offset": metadata.get("start_offset"),
+                    "end_offset": metadata.get("end_offset"),
+                    "chunk_index": metadata.get("chunk_index"),
+                }
+            )
+        return passages
+
+    def _load_documents(self, file_ids: List[str]) -> Dict[str, Document]:
+        """按file_id批量加载论文记录（不含全文），已加载的记录从缓存读取"""
+        from file_classifier_module.retrieval_cache import current_index_version
+
+        documents: Dict[str, Document] = {}
+        missing = []
+        with self._document_cache_lock:
+            # 重新入库会更新论文字段，索引版本变化时清空缓存
+            version = current_index_version()
+            if version != self._document_cache_version:
+                self._document_cache.clear()
+                self._document_cache_version = version
+
+            for file_id in file_ids:
+                doc = self._document_cache.get(file_id)
+                if doc is None:
+                    missing.append(file_id)
+                else:
+                    self._document_cache.move_to_end(file_id)
+                    documents[file_id] = doc
+
+        if missing:
+            loaded: Dict[str, Document] = {}
+            for file_id, brief in query_file_briefs_by_ids(missing).items():
+                loaded[file_id] = Document(
+                    file_id=file_id,
+                    title=brief.get("title") or brief.get("file_name") or "",
+                    summary=brief.get("summary") or "",
+                    keywords=[
+                        k.strip() for k in (brief.get("keywords") or "").split(",") if k.strip()
+                    ],
+                )
+            documents.update(loaded)
+            with self._document_cache_lock:
+                self._document_cache.update(loaded)
+                while len(self._document_cache) > self._document_cache_size:
+                    self._document_cache.popitem(last=False)
+        return documents
+
+    def _tokenize_query(self, query: str) -> List[str]:
+        """使用与BM25索引相同的分词配置对查询分词，保证与预计算词频中的词形一致"""
+        from file_classifier_module.tokenizer_service import tokenize
+        from global_module import file_classifier_config
+
+        return tokenize(
+            query, use_stemmer=bool(file_classifier_config.get("tokenizer_stemmer", False))
+        )
+
     def _extract_high_freq_terms(
-        self, doc: Document, query_tokens: List[str], top_k: int = 5
+        self,
+        doc: Document,
+        query_tokens: List[str],
+        term_stats: Optional[Dict[str, Any]] = None,
+        top_k: int = 5,
     ) -> Dict[str, int]:
-        """提取高频词汇"""
-        all_tokens = (
-            ...  # TODO:调用独立模块的分词方法
-            + query_tokens
-            + [t.lower() for t in doc.keywords]
+        """提取高频词汇（读取入库时预计算的词频统计，查询词优先）"""
+        if not term_stats:
+            return {}
+        doc.total_tokens = term_stats.get("total_tokens") or 0
+        doc.unique_tokens = term_stats.get("unique_tokens") or 0
+
+        term_counts: Dict[str, int] = dict(term_stats.get("top_terms", []))
+        query_terms = [t for t in dict.fromkeys(query_tokens) if t in term_counts]
+        other_terms = [t for t in term_counts if t not in query_terms]
+        return {t: term_counts[t] for t in (query_terms + other_terms)[:top_k]}
+
+    @staticmethod
+    def _files_info(query_results, top_n: int) -> List[Dict[str, str]]:
+        """把Top N查询结果转换为结构化信息"""
+        results: List[Dict[str, str]] = []
+        for r in list(query_results)[:top_n]:
+            results.append(
+                {
+                    "doc_id": r.doc_id,
+                    "title": r.title,
+                    "relevance_percent": f"{r.relevance:.2f}%",
+                    "summary": r.summary,
+                    # "key_fields_summary": r.key_fields_summary,
+                    "high_freq_terms": ", ".join(
+                        [f"{k}:{v}" for k, v in r.high_freq_terms.items()]
+                    ),
+                }
+            )
+        return results
+
+    def _session_query_vector(self, session: GeneratorSession):
+        """计算并缓存本轮问题的查询向量（追问判断与问答缓存共用，调用方持有会话锁）"""
+        if session.query_vector is None:
+            session.query_vector = self._embed_query(session.demand_raw)
+        return session.query_vector
+
+    @staticmethod
+    def _embed_query(text: str):
+        """计算查询向量，embedding模型不可用时返回None"""
+        from file_classifier_module.utils import get_local_embedding_model
+
+        try:
+            model = get_local_embedding_model()
+            return model.embed_query(text) if model is not None else None
+        except Exception as e:
+            logger.debug(f"✖ 计算查询向量失败: {e}")
+            return None
+
+    @staticmethod
+    def _answer_cache_model() -> str:
+        """问答缓存的模型键：模型名与影响输出的生成参数（set_llm_config修改后不命中旧回复）"""
+        return (
+            f"{answer_generator_config.model}|{answer_generator_config.base_url}"
+            f"|temperature={answer_generator_config.temperature}"
+            f"|max_tokens={answer_generator_config.max_tokens}"
         )
-        return dict(Counter(all_tokens).most_common(top_k))
+
+    def _answer_cache_vector(self, demand: DemandSnapshot):
+        """问答缓存使用的查询向量；有对话历史时回复依赖上文，不使用缓存"""
+        if self._answer_cache is None or demand.has_turns:
+            return None
+        if demand.query_vector is not None:
+            return demand.query_vector
+        return self._embed_query(demand.demand_raw)
+
+    def _record_turn(
+        self, session: GeneratorSession, demand: DemandSnapshot, answer: str, passages
+    ) -> None:
+        """把本轮问答计入对话历史（每个需求只记录一次；回复期间需求已被替换时不记录）"""
+        with session.lock:
+            if not session.turn_pending or session.demand_id != demand.demand_id:
+                return
+            session.turn_pending = False
+            doc_ids = [p if isinstance(p, str) else p.doc_id for p in passages]
+            chunk_ids = [
+                f"{p.doc_id}#{p.chunk_index}"
+                for p in passages
+                if not isinstance(p, str) and p.chunk_index is not None
+            ]
+            session.conversation.add_turn(
+                ConversationTurn(
+                    question=demand.demand_raw,
+                    answer=answer,
+                    demand_type=demand.demand_type.name if demand.demand_type else "",
+                    doc_ids=list(dict.fromkeys(doc_ids)),
+                    chunk_ids=chunk_ids,
+                    reused_retrieval=session.reused_retrieval,
+                ),
+                token_counter=self._context_builder.count_tokens,
+                token_budget=int(answer_generator_config.get("history_token_budget", 800)),
+            )
 
     # ======================
     # 内部方法：Prompt构建
     # ======================
 
-    def _build_context_from_results(self, results: List[QueryResult]) -> str:
-        """从查询结果构建LLM上下文"""
-        blocks = []
-        for r in results:
-            blocks.append(f"[{r.doc_id}] {r.title}\n{r.summary}\n")
-        return "\n".join(blocks)
+    def _build_qa_prompt(self, demand: DemandSnapshot) -> Tuple[str, List[ContextPassage]]:
+        """根据需求快照的检索结果构建问答提示词，返回 (提示词, 放入上下文的段落)"""
+        context_text, passages = self._build_context_from_results(list(demand.query_results))
+        return self._build_llm_prompt(query=demand.demand_raw, context=context_text), passages
+
+    def _build_qa_messages(
+        self, prompt: str, demand: Optional[DemandSnapshot] = None
+    ) -> List[Dict[str, str]]:
+        """系统提示 + 对话历史（较早轮次的摘要与最近轮次原文） + 本轮提示词"""
+        history = list(demand.history) if demand is not None else []
+        return [
+            {"role": "system", "content": "You are a helpful assistant."},
+            *history,
+            {"role": "user", "content": prompt},
+        ]
+
+    def _build_context_from_results(
+        self, results: List[QueryResult]
+    ) -> Tuple[str, List[ContextPassage]]:
+        """从查询结果构建LLM上下文（文本块级，去重并按token预算截断）"""
+        return self._context_builder.build(results)
 
     def _build_llm_prompt(self, *, query: str, context: str) -> str:
         """构建LLM提示词"""
@@ -347,10 +697,11 @@ def answer_generator(user_queries=None) -> list[tuple[str, str]]:
         ]
 
     answers: list[tuple[str, str]] = []
+    session_id = SessionManager.new_session_id()
     for q in user_queries:
 
-        service.set_demand(q)
-        resp = service.get_LLM_reply()
+        service.set_demand(q, session_id)
+        resp = service.get_LLM_reply(session_id)
 
         if resp.get("type") == "file_query":
             all_doc: list[File] = []
@@ -360,4 +711,5 @@ def answer_generator(user_queries=None) -> list[tuple[str, str]]:
         else:
             answers.append(("QA", resp.get("reply", "")))
 
+    service.end_session(session_id)
     return answers
@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from utility_module import SingletonMeta
+from log_module import logger
+
+from .data_models import DemandType, QueryResult
+from .conversation import ConversationMemory
+
+LOCAL_SESSION_ID = "local"
+"""进程内单用户调用未传入会话ID时使用的会话；HTTP接口总是为每个客户端分配独立的会话ID，不使用该会话"""
+
+
+@dataclass(frozen=True)
+class DemandSnapshot:
+    """在会话锁内复制的本轮需求；回复期间并发的set_demand不会改变已开始的回复"""
+
+    demand_id: int
+    demand_raw: str
+    demand_type: Optional[DemandType]
+    query_results: Tuple[QueryResult, ...]
+    query_vector: Optional[List[float]]
+    history: Tuple[Dict[str, str], ...]
+    """对话历史消息（较早轮次的摘要与最近轮次原文）"""
+    has_turns: bool
+
+
+@dataclass
+class GeneratorSession:
+    """单个用户/会话的问答状态"""
+
+    session_id: str
+    demand_id: int = 0
+    """每次set_demand递增，用于判断回复是否仍属于当前需求"""
+    demand_raw: str = ""
+    demand_type: Optional[DemandType] = None
+    query_results: List[QueryResult] = field(default_factory=list)
+    stopped: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+    """最近一次set_demand各阶段的耗时（毫秒）"""
+    conversation: ConversationMemory = field(default_factory=ConversationMemory)
+    """多轮对话历史"""
+    query_vector: Optional[List[float]] = None
+    """本轮问题的查询向量（按需计算）"""
+    reused_retrieval: bool = False
+    """本轮是否复用了上一次的检索结果"""
+    turn_pending: bool = False
+    """本轮问答尚未计入对话历史"""
+    last_access: float = field(default_factory=time.monotonic)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    """同一会话的请求串行执行，不同会话互不阻塞"""
+
+    def touch(self) -> None:
+        self.last_access = time.monotonic()
+
+    def snapshot(self) -> DemandSnapshot:
+        """在会话锁内复制本轮需求、检索结果与对话历史"""
+        with self.lock:
+            return DemandSnapshot(
+                demand_id=self.demand_id,
+                demand_raw=self.demand_raw,
+                demand_type=self.demand_type,
+                query_results=tuple(self.query_results),
+                query_vector=self.query_vector,
+                history=tuple(self.conversation.history_messages()),
+                has_turns=bool(self.conversation.turns),
+            )
+
+
+class SessionManager(metaclass=SingletonMeta):
+    """
+    会话管理器（单例）。
+
+    按会话ID保存每个用户的问答状态，超过TTL未访问的会话被淘汰；
+    会话数超过上限时淘汰最久未访问的会话。
+    """
+
+    def __init__(self, ttl_seconds: float = 1800.0, max_sessions: int = 1000):
+        """
+        Args:
+            ttl_seconds: 会话空闲超时（秒）
+            max_sessions: 最大会话数
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, GeneratorSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id() -> str:
+        return uuid.uuid4().hex
+
+    def get(self, session_id: Optional[str] = None) -> GeneratorSession:
+        """获取会话，不存在或已过期时创建新会话（未传入会话ID时为进程内的本地会话）"""
+        if not session_id:
+            session_id = LOCAL_SESSION_ID
+        with self._lock:
+            self.__evict_expired()
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = GeneratorSession(session_id=session_id)
+                self._sessions[session_id] = session
+                logger.debug(f"创建会话: {session_id}，当前会话数: {len(self._sessions)}")
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, _ = self._sessions.popitem(last=False)
+                    logger.debug(f"会话数超过上限，淘汰会话: {evicted_id}")
+            else:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __evict_expired(self) -> None:
+        """淘汰超时会话（按访问顺序排列，从最旧的开始检查）"""
+        now = time.monotonic()
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if now - oldest.last_access <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            logger.debug(f"会话超时已淘汰: {oldest_id}")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -7,7 +7,11 @@ from .operations import *
 
 __all__ = [
     "File",
+    "TermStat",
     "session",
     "query_files_by_attributes",
+    "query_file_briefs_by_ids",
     "add_or_update_file_to_database",
+    "add_or_update_term_stats",
+    "query_term_stats",
 ]
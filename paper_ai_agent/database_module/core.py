@@ -1,6 +1,6 @@
 """数据库核心模块"""
 
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
 
 
 _is_initialized = False
@@ -66,7 +66,8 @@ def _initialize_database() -> Session:
     try:
         logger.debug("正在创建数据库会话...")
         _Session = sessionmaker(bind=_engine)
-        session = _Session()
+        # 线程局部会话：接口与Session相同，多线程服务器下每个线程使用独立会话
+        session = scoped_session(_Session)
         """ 数据库会话实例 """
         logger.debug("✔ 数据库会话创建成功")
     except Exception as e:
@@ -8,6 +8,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, date
+import json
 
 # 定义基类
 _Base = declarative_base()
@@ -86,3 +87,47 @@ class File(_Base):
         """从对象提取文件信息为字典表示"""
         file_instance = cls.from_object(obj)
         return file_instance.to_dict()
+
+
+class TermStat(_Base):
+    """文档词频统计数据结构，保存每篇文档的高频词等BM25统计信息"""
+
+    __tablename__ = "term_stat"
+    """ 数据库表名称 """
+
+    # region 数据库字段定义
+    file_id = Column(String(50), primary_key=True)
+    """ 文件ID """
+    file_name = Column(String(256), nullable=True)
+    """ 文件名 """
+    top_terms = Column(Text, nullable=True)  # JSON: [["term", count], ...]
+    """ 高频词列表 """
+    total_tokens = Column(Integer, nullable=True)
+    """ 文档词数 """
+    unique_tokens = Column(Integer, nullable=True)
+    """ 独特词数 """
+
+    # endregion
+
+    def __repr__(self) -> str:
+        """返回词频统计字典表示的字符串形式"""
+        return str(self.to_dict())
+
+    def to_dict(self) -> dict:
+        """将词频统计对象转换为字典表示，高频词解析为列表"""
+        return {
+            "file_id": self.file_id,
+            "file_name": self.file_name,
+            "top_terms": json.loads(self.top_terms) if self.top_terms else [],
+            "total_tokens": self.total_tokens,
+            "unique_tokens": self.unique_tokens,
+        }
+
+    def update_attributes_from_dict(self, data: dict) -> None:
+        """从字典更新词频统计对象的属性，高频词序列化为JSON"""
+        for key, value in data.items():
+            if not hasattr(self, key):
+                continue
+            if key == "top_terms" and not isinstance(value, str):
+                value = json.dumps([list(item) for item in value], ensure_ascii=False)
+            setattr(self, key, value)
@@ -3,7 +3,7 @@
 from datetime import date, datetime
 import sys
 from typing import Any
-from .models import File
+from .models import File, TermStat
 from .core import session
 from log_module import *  # 导入全局日志模块
 
@@ -79,3 +79,90 @@ def add_or_update_file_to_database(file_data: object | dict) -> bool:
         # 处理异常情况，记录日志等
         logger.debug(f"✖ 添加或更新文件记录失败: {e}")
         return False
+
+
+def add_or_update_term_stats(stats_list: list[dict]) -> bool:
+    """
+    批量添加或更新文档词频统计，整批在一个事务内提交
+
+    参数：
+        stats_list (list[dict]): 词频统计字典列表，每项包含file_id、file_name、top_terms等字段
+    返回：
+        success (bool): 操作是否成功
+    """
+    if not stats_list:
+        return True
+    try:
+        logger.debug(f"{sys._getframe().f_code.co_name}接口被调用，共{len(stats_list)}条记录...")
+
+        file_ids = [stats["file_id"] for stats in stats_list]
+        existing: dict[str, TermStat] = {
+            record.file_id: record
+            for record in session.query(TermStat)
+            .filter(TermStat.file_id.in_(file_ids))
+            .all()
+        }
+        for stats in stats_list:
+            record = existing.get(stats["file_id"])
+            if record is None:
+                record = TermStat()
+                session.add(record)
+                existing[stats["file_id"]] = record
+            record.update_attributes_from_dict(stats)
+        session.commit()
+        logger.debug(f"✔ 批量保存词频统计成功，共{len(stats_list)}条记录")
+        return True
+    except Exception as e:
+        session.rollback()
+        logger.debug(f"✖ 批量保存词频统计失败: {e}")
+        return False
+
+
+def query_term_stats(file_ids: list[str] | None = None) -> list[dict[str, Any]]:
+    """
+    查询文档词频统计
+
+    参数：
+        file_ids (list[str] | None): 文件ID列表，为None时返回全部记录
+    返回：
+        stats (list[dict[str, Any]]): 词频统计记录列表
+    """
+    try:
+        query = session.query(TermStat)
+        if file_ids is not None:
+            query = query.filter(TermStat.file_id.in_(file_ids))
+        return [record.to_dict() for record in query.all()]
+    except Exception as e:
+        logger.debug(f"✖ 查询词频统计失败: {e}")
+        return []
+
+
+def query_file_briefs_by_ids(file_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    按文件ID批量查询论文级字段（不加载全文content）
+
+    参数：
+        file_ids (list[str]): 文件ID列表
+    返回：
+        briefs (dict[str, dict[str, Any]]): file_id -> {file_name, title, summary, keywords}
+    """
+    if not file_ids:
+        return {}
+    try:
+        rows = (
+            session.query(File.file_id, File.file_name, File.title, File.summary, File.keywords)
+            .filter(File.file_id.in_(set(file_ids)))
+            .all()
+        )
+        return {
+            row.file_id: {
+                "file_name": row.file_name,
+                "title": row.title,
+                "summary": row.summary,
+                "keywords": row.keywords,
+            }
+            for row in rows
+        }
+    except Exception as e:
+        logger.debug(f"✖ 批量查询论文信息失败: {e}")
+        return {}
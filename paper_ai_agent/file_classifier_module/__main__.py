@@ -2,22 +2,24 @@ import os
 
 
 def start_file_classify_task(
-        unclassified_path, classified_path, file_type, file_name=None
+        unclassified_path, classified_path, file_type, file_name=None, analysis_mode=None
 ) -> None:
     """
     目前数据格式如下
         "file_id",
         "file_text",
         "file_name",
+        "file_layout_title",
         "file_title",
         "file_summary",
         "file_keywords",
 
+    analysis_mode: 论文分析模式("llm"/"local")，为None时读取配置；批量回填时可指定"local"
     """
     from .pdf_analysis import PDFContentAnalyzer
     from .pdf_split_and_embed import PDFRagWorker
-    from .pdf_transform import PDFTransformer
-    from .utils import save_to_database, move_files, get_local_embedding_model
+    from .utils import get_local_embedding_model
+    from global_module import file_classifier_config
 
     # 这里先以单文件为例顺序执行,后续可以实现根据流式处理的多线程调度
 
@@ -38,39 +40,64 @@ def start_file_classify_task(
 
     embedding_model = get_local_embedding_model()
 
-    for name in file_name_list:
+    # pdf分析,目前使用了deepseek api;批量大小大于1时多篇论文合并为一次请求
+    analyzer = PDFContentAnalyzer(mode=analysis_mode)
+    batch_size = max(1, int(file_classifier_config.get("analysis_batch_size", 1)))
+
+    # rag前期工作,包括embedding和BM25;同一轮入库共用一个worker,词频统计在结束时批量写入
+    ragWorker = PDFRagWorker(embedding_model=embedding_model)  # 明确指定本地模型
+    try:
+        _classify_files(
+            unclassified_path,
+            classified_path,
+            file_name_list,
+            batch_size,
+            analyzer,
+            ragWorker,
+        )
+    finally:
+        ragWorker.flush_term_stats()
+
+
+def _classify_files(
+        unclassified_path, classified_path, file_name_list, batch_size, analyzer, ragWorker
+) -> None:
+    """按批次执行 pdf转换 -> 分析 -> 检索知识构建 -> 入库"""
+    from .pdf_transform import PDFTransformer
+    from .utils import save_to_database, move_files
+
+    for batch_start in range(0, len(file_name_list), batch_size):
+        batch_names = file_name_list[batch_start : batch_start + batch_size]
         transformer = PDFTransformer()
-        pdf_info_dict = transformer.transform(unclassified_path, name)
-
-        # pdf分析,目前使用了deepseek api
-        analyzer = PDFContentAnalyzer()
-        pdf_info_dict = analyzer.analyze(pdf_info_dict)
-
-        # rag前期工作,包括embedding和BM25,目前仅有基于embedding api的模型,且数据切分很粗糙,后续需要优化
-        ragWorker = PDFRagWorker(embedding_model=embedding_model)  # 明确指定本地模型
-        ragWorker.set_retrieval_knowledge(pdf_info_dict)
-
-        # 数据入库(键值库,现在先保存到json)
-
-        save_dict={
-            "file_id":pdf_info_dict["file_id"],
-            "title":pdf_info_dict["file_title"],
-            "summary": pdf_info_dict["file_summary"],
-            "content":pdf_info_dict["file_text"],
-            "keywords":','.join(pdf_info_dict["file_keywords"]),
-            "author":"",
-            "text_length":len(pdf_info_dict["file_text"]),
-            "file_name":pdf_info_dict["file_name"],
-        }
-
-        if save_to_database(save_dict):
-            from paper_ai_agent.log_module import logger
-            import sys
-
-            logger.info(
-                f"✔ {sys._getframe().f_code.co_name}:文件{pdf_info_dict['file_name']}保存到数据库成功"
-            )
-            move_files(unclassified_path, classified_path, [name])
+        pdf_info_dicts = [
+            transformer.transform(unclassified_path, name) for name in batch_names
+        ]
+        pdf_info_dicts = analyzer.analyze_batch(pdf_info_dicts)
+
+        for name, pdf_info_dict in zip(batch_names, pdf_info_dicts):
+            ragWorker.set_retrieval_knowledge(pdf_info_dict)
+
+            # 数据入库(键值库,现在先保存到json)
+
+            save_dict={
+                "file_id":pdf_info_dict["file_id"],
+                "title":pdf_info_dict["file_title"],
+                "summary": pdf_info_dict["file_summary"],
+                "content":pdf_info_dict["file_text"],
+                "keywords":','.join(pdf_info_dict["file_keywords"]),
+                "author":"",
+                "text_length":len(pdf_info_dict["file_text"]),
+                "file_name":pdf_info_dict["file_name"],
+            }
+
+            if save_to_database(save_dict):
+                from paper_ai_agent.log_module import logger
+                import sys
+
+                logger.info(
+                    f"✔ {sys._getframe().f_code.co_name}:文件{pdf_info_dict['file_name']}保存到数据库成功"
+                )
+                move_files(unclassified_path, classified_path, [name])
 
 
 def run():
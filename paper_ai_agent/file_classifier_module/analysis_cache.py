@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from utility_module import SingletonMeta
+from log_module import logger
+
+
+class AnalysisCacheSingleton(metaclass=SingletonMeta):
+    """
+    论文分析结果缓存（单例）。
+
+    以 (提示词模板版本, 模型名, key_text哈希) 为键，缓存LLM解析后的JSON结果。
+    持久化为追加写入的JSONL文件，每条结果写入一行，
+    批处理中途失败后重新运行时可直接命中已分析过的论文。
+    """
+
+    def __init__(self, cache_filename="analysis_cache.jsonl"):
+        """
+        初始化缓存。单例模式确保此方法只执行一次。
+
+        Args:
+            cache_filename: 缓存持久化文件名（位于DB/common目录）
+        """
+        project_root = Path(__file__).parent.parent
+        self.cache_folder = project_root / "DB" / "common"
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+
+        self.cache_path = self.cache_folder / cache_filename
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+        self._load_cache()
+
+    @staticmethod
+    def make_key(prompt_version: str, model: str, key_text: str) -> str:
+        """根据提示词版本、模型和文本内容生成缓存键"""
+        text_hash = hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+        return f"{prompt_version}:{model}:{text_hash}"
+
+    def _load_cache(self):
+        """从JSONL文件加载缓存，同一键以最后一次写入为准，损坏的行直接跳过。"""
+        if not self.cache_path.exists():
+            logger.debug("未找到分析结果缓存文件，已初始化空缓存。")
+            return
+        skipped = 0
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    self._entries[record["key"]] = record["result"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    # 进程中断时最后一行可能只写了一半
+                    skipped += 1
+        logger.debug(
+            f"✔ 已从 {self.cache_path} 加载 {len(self._entries)} 条分析结果缓存"
+            + (f"，跳过 {skipped} 条损坏记录" if skipped else "")
+        )
+
+    def get(self, key: str) -> dict | None:
+        """
+        查询缓存。
+
+        Returns:
+            dict or None: 命中时返回缓存结果的副本，未命中返回 None。
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(result)
+
+    def put(self, key: str, result: dict):
+        """写入缓存并立即追加到文件，保证中途失败时已完成的结果不丢失。"""
+        with self._lock:
+            self._entries[key] = dict(result)
+            try:
+                with open(self.cache_path, "a", encoding="utf-8") as f:
+                    f.write(
+                        json.dumps({"key": key, "result": result}, ensure_ascii=False)
+                        + "\n"
+                    )
+            except Exception as e:
+                logger.debug(f"✖ 写入分析结果缓存失败: {e}")
+
+    def __len__(self):
+        """返回缓存条目数量。"""
+        return len(self._entries)
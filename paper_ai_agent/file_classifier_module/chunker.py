@@ -0,0 +1,282 @@
+import re
+from dataclasses import dataclass
+from log_module import logger
+
+from .prompt_packer import count_tokens
+
+# 章节标题行：编号标题（"3 Model Architecture"、"4.2 Training"）、全大写短行，或常见无编号标题
+_NUMBERED_HEADING_PATTERN = re.compile(
+    r"^(?:\d{1,2}(?:\.\d{1,2}){0,2}\.?|[IVX]{1,4}\.)\s+[A-Z][^.!?]{0,80}$"
+)
+_NAMED_HEADING_PATTERN = re.compile(
+    r"^(?:abstract|introduction|related work|background|conclusions?|discussion|"
+    r"references|bibliography|acknowledge?ments?|appendix)$",
+    re.IGNORECASE,
+)
+_UPPER_HEADING_PATTERN = re.compile(r"^[A-Z][A-Z0-9 \-:&]{2,60}$")
+# 句子边界：句末标点后的空白（包括换行），且下一句以大写字母/数字/括号/中文开头
+_SENTENCE_BOUNDARY_PATTERN = re.compile(
+    r"(?<=[.!?。！？])\s+(?=[A-Z0-9\"'(\[\u4e00-\u9fff])"
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def flatten_pages(pages):
+    """
+    把逐页文本拼接为单行全文（入库保存的file_text），文本块的偏移量指向该文本。
+
+    换行替换为空格、非空页面之间以一个空格分隔，字符与各页文本一一对应。
+    """
+    return " ".join(
+        (page_entry.get("text") or "").replace("\n", " ")
+        for page_entry in pages
+        if page_entry.get("text")
+    )
+
+
+@dataclass
+class TextChunk:
+    """切分后的文本块（偏移量基于flatten_pages拼接的全文）"""
+
+    text: str
+    ordinal: int
+    start: int
+    end: int
+    page: int | None
+    section: str
+
+
+def get_model_token_counter(embedding_model=None):
+    """
+    获取与embedding模型一致的token计数函数。
+
+    本地HuggingFace/SentenceTransformer/ONNX模型直接使用其分词器；
+    API模型或无法获取分词器时退回tiktoken计数（与WordPiece数量相近）。
+    """
+    client = getattr(embedding_model, "client", None)
+    # ONNX后端直接持有tokenizer
+    hf_tokenizer = getattr(client, "tokenizer", None) or getattr(
+        embedding_model, "tokenizer", None
+    )
+    if hf_tokenizer is not None:
+        return lambda text: len(hf_tokenizer.encode(text, add_special_tokens=False))
+    return count_tokens
+
+
+class SectionAwareChunker:
+    """
+    按页面与章节边界、以句子为单位的文本切分器。
+
+    1. 逐页逐行识别章节标题，文本块不跨越章节
+    2. 在句子边界处切分，按embedding模型的token数控制块大小
+    3. 自适应重叠：仅在同一章节内的切分点携带上一块末尾的短句，章节切换处不重叠
+    """
+
+    def __init__(
+        self,
+        max_tokens=240,
+        min_tokens=40,
+        max_overlap_ratio=0.15,
+        token_counter=None,
+    ):
+        """
+        Args:
+            max_tokens: 单块token上限（all-MiniLM-L6-v2最大输入为256，需给特殊符号留出余量）
+            min_tokens: 章节末尾不足该长度的小块并入前一块
+            max_overlap_ratio: 重叠部分最多占块大小的比例
+            token_counter: token计数函数，默认使用tiktoken
+        """
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.max_overlap_tokens = int(max_tokens * max_overlap_ratio)
+        self.count_tokens = token_counter or count_tokens
+
+    def split(self, pages):
+        """
+        切分论文文本。
+
+        Args:
+            pages: list[dict]，每项为 {"page": 页码或None, "text": 保留换行的页面文本}
+
+        Returns:
+            list[TextChunk]: 按原文顺序排列的文本块
+        """
+        sentences = self.__split_sentences(pages)
+
+        chunks = []
+        current = []  # [(text, tokens, start, end, page, section)]
+        current_tokens = 0
+
+        def flush():
+            nonlocal current, current_tokens
+            if current:
+                chunks.append(self.__make_chunk(current, len(chunks)))
+            current, current_tokens = [], 0
+
+        for sentence in sentences:
+            text, tokens, _, _, _, section = sentence
+
+            # 章节切换：结束当前块，不携带重叠
+            if current and current[-1][5] != section:
+                self.__merge_small_tail(chunks, current, current_tokens)
+                flush()
+
+            if current_tokens + tokens > self.max_tokens and current:
+                overlap = self.__select_overlap(current)
+                flush()
+                current = overlap
+                current_tokens = sum(s[1] for s in overlap)
+
+            current.append(sentence)
+            current_tokens += tokens
+
+        self.__merge_small_tail(chunks, current, current_tokens)
+        flush()
+
+        logger.debug(
+            f"文本切分完成: {len(sentences)}个句子 -> {len(chunks)}个文本块，"
+            f"平均{sum(self.count_tokens(c.text) for c in chunks) // max(1, len(chunks))} tokens/块"
+        )
+        return chunks
+
+    def __split_sentences(self, pages):
+        """逐页识别章节标题并切分句子，记录每个句子在flatten_pages全文中的字符偏移、页码与所属章节"""
+        sentences = []
+        section = "front"
+        offset = 0
+        for page_entry in pages:
+            page_text = page_entry.get("text") or ""
+            page_number = page_entry.get("page")
+
+            block_start = None
+            line_start = 0
+            for line in page_text.split("\n") + [None]:
+                stripped = line.strip() if line is not None else ""
+                is_heading = line is not None and self.__is_heading(stripped)
+
+                # 遇到标题或页末时，把之前累积的段落切成句子
+                if (is_heading or line is None) and block_start is not None:
+                    sentences.extend(
+                        self.__block_sentences(
+                            page_text, block_start, line_start, offset, page_number, section
+                        )
+                    )
+                    block_start = None
+
+                if line is None:
+                    break
+                if is_heading:
+                    section = stripped
+                    # 标题本身作为新章节的首句，为检索提供上下文
+                    sentences.append(
+                        self.__make_sentence(
+                            stripped,
+                            offset + line_start,
+                            offset + line_start + len(line),
+                            page_number,
+                            section,
+                        )
+                    )
+                elif stripped and block_start is None:
+                    block_start = line_start
+                line_start += len(line) + 1
+
+            if page_text:
+                # 与flatten_pages一致：空页面不占位，非空页面之间一个分隔符
+                offset += len(page_text) + 1
+        return [s for s in sentences if s[1] > 0]
+
+    def __block_sentences(self, page_text, start, end, offset, page_number, section):
+        """将页面中的一段文本切分为句子，超长句子按词拆开"""
+        block = page_text[start:end]
+        sentences = []
+        cursor = 0
+        for boundary in list(_SENTENCE_BOUNDARY_PATTERN.finditer(block)) + [None]:
+            stop = boundary.start() if boundary else len(block)
+            raw = block[cursor:stop]
+            if raw.strip():
+                lead = len(raw) - len(raw.lstrip())
+                sentence_start = offset + start + cursor + lead
+                sentence = self.__make_sentence(
+                    raw,
+                    sentence_start,
+                    sentence_start + len(raw.strip()),
+                    page_number,
+                    section,
+                )
+                if sentence[1] > self.max_tokens:
+                    sentences.extend(self.__split_long_sentence(sentence))
+                else:
+                    sentences.append(sentence)
+            cursor = boundary.end() if boundary else len(block)
+        return sentences
+
+    def __split_long_sentence(self, sentence):
+        """按词拆分超出块大小的句子（多为表格、公式或提取失败的长段）"""
+        text, tokens, start, end, page_number, section = sentence
+        words = text.split(" ")
+        pieces = max(2, -(-tokens // self.max_tokens))
+        step = -(-len(words) // pieces)
+        parts = []
+        cursor = start
+        for i in range(0, len(words), step):
+            piece = " ".join(words[i : i + step])
+            parts.append(
+                self.__make_sentence(piece, cursor, min(end, cursor + len(piece)), page_number, section)
+            )
+            cursor += len(piece) + 1
+        return parts
+
+    def __make_sentence(self, raw, start, end, page_number, section):
+        text = _WHITESPACE_PATTERN.sub(" ", raw).strip()
+        # 行尾连字符断词（"atten- tion"）还原
+        text = re.sub(r"(?<=[a-z])- (?=[a-z])", "", text)
+        return (text, self.count_tokens(text), start, end, page_number, section)
+
+    def __is_heading(self, line):
+        if not line or len(line) > 90 or len(line.split()) > 12:
+            return False
+        return bool(
+            _NAMED_HEADING_PATTERN.match(line)
+            or _NUMBERED_HEADING_PATTERN.match(line)
+            or (_UPPER_HEADING_PATTERN.match(line) and len(line.split()) <= 6)
+        )
+
+    def __select_overlap(self, current):
+        """自适应重叠：从当前块末尾取不超过重叠预算的完整句子；末句过长则不重叠"""
+        overlap = []
+        tokens = 0
+        for sentence in reversed(current[1:]):
+            if tokens + sentence[1] > self.max_overlap_tokens:
+                break
+            overlap.insert(0, sentence)
+            tokens += sentence[1]
+        return overlap
+
+    def __merge_small_tail(self, chunks, current, current_tokens):
+        """章节末尾的小块并入同章节的前一块（允许略超上限），减少碎片块数量"""
+        if not chunks or not current or current_tokens >= self.min_tokens:
+            return
+        previous = chunks[-1]
+        if previous.section != current[-1][5]:
+            return
+        if self.count_tokens(previous.text) + current_tokens > self.max_tokens * 1.2:
+            return
+        new_sentences = [s for s in current if s[2] >= previous.end]
+        if not new_sentences:
+            # 全部为重叠句，丢弃即可
+            current.clear()
+            return
+        previous.text = " ".join([previous.text] + [s[0] for s in new_sentences])
+        previous.end = new_sentences[-1][3]
+        current.clear()
+
+    def __make_chunk(self, sentences, ordinal):
+        return TextChunk(
+            text=" ".join(s[0] for s in sentences),
+            ordinal=ordinal,
+            start=sentences[0][2],
+            end=sentences[-1][3],
+            page=sentences[0][4],
+            section=sentences[0][5],
+        )
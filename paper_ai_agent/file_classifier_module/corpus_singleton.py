@@ -11,6 +11,9 @@ class CorpusSingleton(metaclass=SingletonMeta):  # 请确保这里使用了您
     负责语料库的加载、添加文档、检索和持久化。
     """
 
+    version = 0
+    """语料库版本号，每次添加或更新文档时递增（用于检索缓存失效）"""
+
     def __init__(self, corpus_filename="bm25_corpus.pkl"):
         """
         初始化语料库管理器。单例模式确保此方法只执行一次。
@@ -69,6 +72,7 @@ class CorpusSingleton(metaclass=SingletonMeta):  # 请确保这里使用了您
             # 添加新文档
             self._corpus.append(document_data)
             print(f"添加了新文档: {document_data.get('file_name', 'Unknown')}")
+        type(self).version += 1
 
         # 添加或更新后，可以选择自动保存
         self.save_corpus()
@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from utility_module import SingletonMeta
+from log_module import logger
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+"""默认本地embedding模型（英文模型，约90MB）"""
+
+EMBEDDING_BACKENDS = ("torch", "onnx")
+"""
+推理后端：PyTorch（sentence-transformers）、ONNX Runtime fp32。
+int8量化模型目前只在benchmark_embedding_backends中参与对比，记录吞吐量与余弦偏差的实测结果之前不作为可选后端
+"""
+
+
+def _make_key(model_name, device, backend):
+    return f"{model_name or DEFAULT_EMBEDDING_MODEL}@{device}:{backend}"
+
+
+def _current_rss_mb():
+    """当前进程常驻内存（MB），psutil不可用时返回None"""
+    try:
+        import psutil
+
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class EmbeddingModelRegistry(metaclass=SingletonMeta):
+    """
+    进程级embedding模型注册表（单例）。
+
+    每个模型只加载一次并在进程内复用：首次获取时懒加载，
+    同一模型的并发加载通过模型级锁串行化，已加载模型的获取无需加锁。
+    记录每个模型的加载耗时、内存增量和获取次数。
+    """
+
+    def __init__(self):
+        """初始化注册表。单例模式确保此方法只执行一次。"""
+        self._models: dict = {}
+        self._model_locks: dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._metrics: dict[str, dict] = {}
+        self._services: dict = {}
+
+    def get(
+        self,
+        model_name: str | None = None,
+        device: str = "cpu",
+        backend: str = "torch",
+        onnx_threads: int | None = None,
+    ):
+        """
+        获取embedding模型，未加载时加载。
+
+        Args:
+            model_name: HuggingFace模型名，为None时使用默认模型
+            device: 运行设备，如'cpu'或'cuda'（ONNX后端只支持CPU）
+            backend: 推理后端，见EMBEDDING_BACKENDS
+            onnx_threads: ONNX Runtime算子内线程数，None时自动
+
+        Returns:
+            Embeddings or None: 加载失败时返回None（下次调用会重试）
+        """
+        if backend == "onnx-int8":
+            raise ValueError("onnx-int8后端尚未完成基准测试，请使用torch或onnx（见benchmark_embedding_backends）")
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"不支持的embedding后端: {backend}")
+        key = _make_key(model_name, device, backend)
+        model = self._models.get(key)
+        if model is not None:
+            self._metrics[key]["requests"] += 1
+            return model
+
+        with self._registry_lock:
+            model_lock = self._model_locks.setdefault(key, threading.Lock())
+        with model_lock:
+            # 等待锁期间其他线程可能已完成加载
+            model = self._models.get(key)
+            if model is None:
+                model = self.__load(
+                    model_name or DEFAULT_EMBEDDING_MODEL, device, backend, onnx_threads, key
+                )
+                if model is None:
+                    return None
+                self._models[key] = model
+            self._metrics[key]["requests"] += 1
+            return model
+
+    def get_service(
+        self,
+        model_name: str | None = None,
+        device: str = "cpu",
+        backend: str = "torch",
+        onnx_threads: int | None = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        """
+        获取合并并发请求的embedding服务（每个模型一个服务实例，共享同一个后台编码线程）。
+
+        Returns:
+            EmbeddingService or None: 模型加载失败时返回None
+        """
+        from .embedding_service import EmbeddingService
+
+        key = _make_key(model_name, device, backend)
+        service = self._services.get(key)
+        if service is not None:
+            return service
+        model = self.get(model_name, device, backend, onnx_threads)
+        if model is None:
+            return None
+        with self._registry_lock:
+            service = self._services.get(key)
+            if service is None:
+                service = EmbeddingService(model, max_batch_size, max_wait_ms)
+                self._services[key] = service
+        return service
+
+    def warm_up(
+        self,
+        model_names: list[str] | None = None,
+        background: bool = True,
+        device: str = "cpu",
+        backend: str = "torch",
+        onnx_threads: int | None = None,
+    ):
+        """
+        预加载模型并执行一次编码（消除首次推理的初始化开销）。
+
+        Args:
+            model_names: 待预热的模型名列表，为None时预热默认模型
+            background: 是否在后台线程中执行（不阻塞服务启动）
+            device/backend/onnx_threads: 同get
+        """
+
+        def _run():
+            for name in model_names or [None]:
+                model = self.get(name, device, backend, onnx_threads)
+                if model is None:
+                    continue
+                start = time.perf_counter()
+                try:
+                    model.embed_query("warm up")
+                    key = _make_key(name, device, backend)
+                    self._metrics[key]["warmup_seconds"] = time.perf_counter() - start
+                    logger.debug(f"✔ embedding模型预热完成: {key}")
+                except Exception as e:
+                    logger.debug(f"✖ embedding模型预热失败: {e}")
+
+        if background:
+            threading.Thread(target=_run, name="embedding-warmup", daemon=True).start()
+        else:
+            _run()
+
+    def metrics(self) -> dict[str, dict]:
+        """返回各模型的加载耗时（秒）、内存增量（MB）、加载时间、获取次数及编码服务的批处理统计"""
+        metrics = {key: dict(value) for key, value in self._metrics.items()}
+        for key, service in self._services.items():
+            metrics.setdefault(key, {})["service"] = service.metrics()
+        return metrics
+
+    def is_loaded(
+        self, model_name: str | None = None, device: str = "cpu", backend: str = "torch"
+    ) -> bool:
+        return _make_key(model_name, device, backend) in self._models
+
+    def __load(self, model_name: str, device: str, backend: str, onnx_threads, key: str):
+        """加载HuggingFace模型（本地缓存不存在时自动下载）"""
+        logger.debug(f"获取本地Embedding模型: {model_name}，后端: {backend}")
+        try:
+
+            # 检查模型是否已下载
+            cache_dir = os.path.expanduser("~/.cache/huggingface/hub")
+            model_path = os.path.join(cache_dir, f"models--{model_name.replace('/', '--')}")
+            if os.path.exists(model_path):
+                logger.debug(f"  本地模型已缓存: {model_path}")
+            else:
+                logger.debug(f"  本地模型未找到，开始自动下载...")
+                logger.debug(f"  下载位置: {cache_dir}")
+
+            rss_before = _current_rss_mb()
+            start = time.perf_counter()
+            if backend == "torch":
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+
+                embeddings_model = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs={"device": device},
+                    encode_kwargs={"normalize_embeddings": True},
+                )
+            else:
+                from .onnx_embeddings import OnnxEmbeddings
+
+                embeddings_model = OnnxEmbeddings(model_name, intra_op_threads=onnx_threads)
+            load_seconds = time.perf_counter() - start
+            rss_after = _current_rss_mb()
+
+            self._metrics[key] = {
+                "model_name": model_name,
+                "device": device,
+                "backend": backend,
+                "load_seconds": load_seconds,
+                "memory_mb": (
+                    rss_after - rss_before
+                    if rss_before is not None and rss_after is not None
+                    else None
+                ),
+                "loaded_at": time.time(),
+                "requests": 0,
+            }
+            logger.debug(f"✔ 本地模型加载成功: {model_name}，耗时{load_seconds:.2f}s")
+            return embeddings_model
+
+        except Exception as e:
+            logger.debug(f"✖ 本地模型加载失败: {e}")
+            logger.debug("首次使用需要下载模型，请确保网络连接")
+            logger.debug("或安装: pip install sentence-transformers")
+            return None
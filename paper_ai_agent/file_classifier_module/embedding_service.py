@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from log_module import logger
+
+
+class EmbeddingService(Embeddings):
+    """
+    进程内embedding服务：合并并发的编码请求为微批次。
+
+    所有调用方（入库__embed、FAISS检索、回答生成器）通过同一个embed(texts)接口提交请求，
+    后台线程从队列中取出请求，在max_wait_ms内继续收集，直到凑满max_batch_size条文本后一次性编码，
+    再把向量按请求拆分返回。并发Web请求下批量编码的吞吐量远高于逐条编码。
+
+    实现了langchain的Embeddings接口，可直接替代原模型传给FAISS；未定义的属性（如client）转发给原模型。
+    """
+
+    def __init__(self, model: Embeddings, max_batch_size=64, max_wait_ms=5.0):
+        """
+        Args:
+            model: 实际执行编码的embedding模型
+            max_batch_size: 单个微批次的最大文本数
+            max_wait_ms: 收到首个请求后等待更多请求的最长时间（毫秒）
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+        self._stats = {"requests": 0, "texts": 0, "batches": 0, "encode_seconds": 0.0}
+
+    def __getattr__(self, name):
+        # 仅在实例属性中找不到时调用；model尚未赋值时避免无限递归
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        编码一组文本，返回与texts顺序一致的向量列表（阻塞直到全部编码完成）。
+
+        超过max_batch_size的请求（如入库时的整篇论文）按max_batch_size切片，逐片提交并等待，
+        其他线程的查询请求可以排在两片之间，不会被大请求整体阻塞。
+        """
+        if not texts:
+            return []
+        self.__ensure_worker()
+        texts = list(texts)
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            future: Future = Future()
+            self._queue.put((texts[start : start + self.max_batch_size], future))
+            vectors.extend(future.result())
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        # all-MiniLM等对称模型的查询与文档编码方式相同，可与文档请求合并到同一批次
+        return self.embed([text])[0]
+
+    def metrics(self) -> dict:
+        """返回请求数、文本数、批次数、平均批大小和累计编码耗时"""
+        stats = dict(self._stats)
+        stats["avg_batch_texts"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        stats["queue_size"] = self._queue.qsize()
+        return stats
+
+    def __ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self.__run, name="embedding-service", daemon=True
+                )
+                self._worker.start()
+
+    def __run(self):
+        """后台线程：收集微批次并编码"""
+        while True:
+            batch = [self._queue.get()]
+            text_count = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while text_count < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                text_count += len(request[0])
+            self.__encode(batch)
+
+    def __encode(self, batch):
+        """编码一个批次并把结果分发给各个请求"""
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        start = time.perf_counter()
+        try:
+            vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            logger.debug(f"✖ 批量编码失败（{len(batch)}个请求，{len(texts)}条文本）: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self._stats["requests"] += len(batch)
+        self._stats["texts"] += len(texts)
+        self._stats["batches"] += 1
+        self._stats["encode_seconds"] += time.perf_counter() - start
+
+        offset = 0
+        for request_texts, future in batch:
+            future.set_result(vectors[offset : offset + len(request_texts)])
+            offset += len(request_texts)
@@ -6,6 +6,9 @@ from langchain_community.vectorstores import FAISS
 from utility_module import SingletonMeta
 from log_module import logger
 
+_PAPER_LEVEL_METADATA_KEYS = ("file_name", "file_title", "file_summary", "file_keywords")
+"""旧版文本块中冗余复制的论文级字段，现改为检索时从数据库补全"""
+
 
 class FAISSVectorStoreSingleton(metaclass=SingletonMeta):
     """
@@ -16,6 +19,8 @@ class FAISSVectorStoreSingleton(metaclass=SingletonMeta):
     _embeddings_model: Embeddings
     _save_path: str
     _initialized = False  # 用于标记是否已初始化atexit注册，避免重复注册
+    version = 0
+    """向量库版本号，每次添加文档时递增（用于检索缓存失效）"""
 
     def __init__(self, embeddings_model, save_path: str) -> None:
         """初始化函数，实际初始化在需要时进行（懒加载）。"""
@@ -48,6 +53,7 @@ class FAISSVectorStoreSingleton(metaclass=SingletonMeta):
                 allow_dangerous_deserialization=True,
             )
             logger.debug("✔ 检测到现有索引文件，已加载。")
+            self._compact_docstore_metadata()
             record_count = self._vector_db.index.ntotal
             logger.debug(f"当前索引数量：{record_count}")
         else:
@@ -63,6 +69,31 @@ class FAISSVectorStoreSingleton(metaclass=SingletonMeta):
         # 标记初始化完成
         self._initialized = True
 
+    def _compact_docstore_metadata(self):
+        """移除旧版文本块中冗余的论文级字段，下次保存时docstore随之缩小
+
+        仅处理数据库中已收录的论文，保证字段在检索时仍能补全。
+        """
+        from database_module import query_file_briefs_by_ids
+
+        legacy_docs = [
+            doc
+            for doc in self._vector_db.docstore._dict.values()
+            if any(key in doc.metadata for key in _PAPER_LEVEL_METADATA_KEYS)
+        ]
+        if not legacy_docs:
+            return
+        known_ids = query_file_briefs_by_ids(
+            [doc.metadata.get("file_id") for doc in legacy_docs]
+        ).keys()
+        compacted = 0
+        for doc in legacy_docs:
+            if doc.metadata.get("file_id") in known_ids:
+                for key in _PAPER_LEVEL_METADATA_KEYS:
+                    doc.metadata.pop(key, None)
+                compacted += 1
+        logger.debug(f"✔ 已精简{compacted}/{len(legacy_docs)}个旧版文本块的元数据。")
+
     def add_documents(self, docs: list[Document]):
         """向现有向量数据库中添加文档。"""
         if not self._initialized:
@@ -70,6 +101,7 @@ class FAISSVectorStoreSingleton(metaclass=SingletonMeta):
             self._lazy_initialize(docs)
         else:
             self._vector_db.add_documents(docs)
+        type(self).version += 1
         # 注意：添加文档后不立即保存，由退出时统一保存以提高性能
         logger.debug(f"✔ 已添加 {len(docs)} 个文档到索引（更改暂存于内存）。")
         record_count = self._vector_db.index.ntotal
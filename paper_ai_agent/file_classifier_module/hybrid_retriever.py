@@ -0,0 +1,246 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from log_module import logger
+
+_LEGS = ("faiss", "bm25")
+
+
+@dataclass
+class RetrievalHit:
+    """融合后的单条检索结果（论文粒度时key为file_id，文本块粒度时为"file_id#块序号"）"""
+
+    key: str
+    file_id: str
+    score: float
+    rank: int = 0
+    leg_scores: dict = field(default_factory=dict)  # 各路原始得分（FAISS为L2距离，越小越相似）
+    leg_ranks: dict = field(default_factory=dict)  # 各路排名（从1开始）
+    chunks: list = field(default_factory=list)  # 命中的文本块 [(Document, L2距离)]，按相似度排序
+    metadata: dict = field(default_factory=dict)  # file_name、file_title、file_summary、file_keywords等
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "file_id": self.file_id,
+            "score": self.score,
+            "rank": self.rank,
+            "leg_scores": self.leg_scores,
+            "leg_ranks": self.leg_ranks,
+            "chunks": [
+                {"content": doc.page_content, "metadata": doc.metadata, "distance": float(distance)}
+                for doc, distance in self.chunks
+            ],
+            "metadata": self.metadata,
+        }
+
+
+@dataclass
+class HybridRetrievalResult:
+    """混合检索结果：统一排序的结果列表及各阶段耗时（毫秒）"""
+
+    hits: list
+    timings: dict = field(default_factory=dict)
+    completed_legs: list = field(default_factory=list)
+    leg_results: dict = field(default_factory=dict)  # 两路原始结果，供旧接口使用
+
+    def to_dict(self):
+        return {
+            "hits": [hit.to_dict() for hit in self.hits],
+            "timings": self.timings,
+            "completed_legs": self.completed_legs,
+        }
+
+
+class HybridRetriever:
+    """
+    FAISS向量检索与BM25关键词检索的混合检索器。
+
+    1. 两路检索在线程池中并发执行，超过timeout仍未返回的一路被放弃（提前结束），只融合已完成的结果
+    2. 融合方式：RRF（倒数排名融合）或加权分数归一化（min-max）
+    3. 融合粒度：按论文（BM25本身为论文级，FAISS取论文内最佳文本块）或按文本块（文本块继承所属论文的BM25排名）
+    4. 可选的交叉编码器重排：对融合后的前N个候选重新打分
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-retrieval")
+    """所有检索器共享的线程池"""
+
+    def __init__(
+        self,
+        rag_worker,
+        fusion="rrf",
+        granularity="paper",
+        rrf_k=60,
+        weights=None,
+        timeout=None,
+        reranker=None,
+    ):
+        """
+        Args:
+            rag_worker: PDFRagWorker实例，提供get_faiss_retrieval与get_bm25_retrieval
+            fusion: 融合方式，"rrf"或"weighted"
+            granularity: 融合粒度，"paper"或"chunk"
+            rrf_k: RRF平滑常数
+            weights: 各路权重，如{"faiss": 0.5, "bm25": 0.5}
+            timeout: 等待两路检索的最长秒数，None表示一直等待
+            reranker: CrossEncoderReranker实例，为None时不重排
+        """
+        if fusion not in ("rrf", "weighted"):
+            raise ValueError(f"不支持的融合方式: {fusion}")
+        if granularity not in ("paper", "chunk"):
+            raise ValueError(f"不支持的融合粒度: {granularity}")
+        self.rag_worker = rag_worker
+        self.fusion = fusion
+        self.granularity = granularity
+        self.rrf_k = rrf_k
+        self.weights = weights or {"faiss": 0.5, "bm25": 0.5}
+        self.timeout = timeout
+        self.reranker = reranker
+
+    def retrieve(self, query, k=5, k_segments=20, k_articles=10):
+        """
+        执行混合检索。
+
+        Args:
+            query: 查询文本
+            k: 融合后返回的结果数量
+            k_segments: FAISS检索的文本块数量
+            k_articles: BM25检索的论文数量
+
+        Returns:
+            HybridRetrievalResult: 统一排序的结果及各路得分、耗时
+        """
+        start = time.perf_counter()
+        timings = {}
+
+        def timed(func, *args):
+            """在工作线程中执行一路检索，返回(结果, 耗时ms)；timings只由主线程写入"""
+            from database_module import session
+
+            leg_start = time.perf_counter()
+            try:
+                return func(*args), (time.perf_counter() - leg_start) * 1000
+            finally:
+                # 线程池线程长期存活，释放本线程的数据库会话，避免持有连接与过期的读快照
+                session.remove()
+
+        futures = {
+            self._executor.submit(timed, self.rag_worker.get_faiss_retrieval, query, k_segments): "faiss",
+            self._executor.submit(timed, self.rag_worker.get_bm25_retrieval, query, k_articles): "bm25",
+        }
+        done, not_done = wait(futures, timeout=self.timeout)
+
+        leg_results = {leg: [] for leg in _LEGS}
+        completed = []
+        for future in done:
+            leg = futures[future]
+            try:
+                result, elapsed_ms = future.result()
+                leg_results[leg] = result or []
+                timings[f"{leg}_ms"] = elapsed_ms
+                completed.append(leg)
+            except Exception as e:
+                logger.debug(f"✖ {leg}检索失败: {e}")
+        for future in not_done:
+            # 已提交的任务无法中断，结果直接丢弃
+            logger.debug(f"✖ {futures[future]}检索超过{self.timeout}s，已放弃该路结果")
+
+        fusion_start = time.perf_counter()
+        hits = self.__fuse(leg_results["faiss"], leg_results["bm25"])
+        timings["fusion_ms"] = (time.perf_counter() - fusion_start) * 1000
+
+        if self.reranker is not None:
+            rerank_start = time.perf_counter()
+            hits = self.reranker.rerank(query, hits)
+            timings["rerank_ms"] = (time.perf_counter() - rerank_start) * 1000
+
+        hits = hits[:k]
+        for rank, hit in enumerate(hits, start=1):
+            hit.rank = rank
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+
+        logger.debug(
+            f"✔ 混合检索完成: 查询='{query}', 返回{len(hits)}条结果，"
+            f"完成的检索路: {completed}, 耗时: { {name: round(ms, 1) for name, ms in timings.items()} }"
+        )
+        return HybridRetrievalResult(
+            hits=hits,
+            timings=timings,
+            completed_legs=sorted(completed),
+            leg_results=leg_results,
+        )
+
+    def __fuse(self, faiss_results, bm25_results):
+        """按配置的粒度汇总两路结果并计算融合得分"""
+        hits = {}
+
+        def get_hit(key, file_id):
+            if key not in hits:
+                hits[key] = RetrievalHit(key=key, file_id=file_id, score=0.0)
+            return hits[key]
+
+        # FAISS：距离越小越相似，结果已按距离升序排列
+        faiss_rank = 0
+        for doc, distance in faiss_results:
+            file_id = doc.metadata.get("file_id", "")
+            if self.granularity == "paper":
+                key = file_id
+            else:
+                key = f"{file_id}#{doc.metadata.get('chunk_index', len(hits))}"
+            hit = get_hit(key, file_id)
+            hit.chunks.append((doc, distance))
+            if "faiss" not in hit.leg_ranks:
+                faiss_rank += 1
+                hit.leg_ranks["faiss"] = faiss_rank
+                hit.leg_scores["faiss"] = float(distance)
+            for name in ("file_name", "file_title", "file_summary", "file_keywords"):
+                if doc.metadata.get(name):
+                    hit.metadata.setdefault(name, doc.metadata[name])
+
+        # BM25：论文级结果；文本块粒度时所属论文的所有块共享该路排名
+        for bm25_rank, result in enumerate(bm25_results, start=1):
+            file_id = result["file_id"]
+            if self.granularity == "paper":
+                targets = [get_hit(file_id, file_id)]
+            else:
+                targets = [hit for hit in hits.values() if hit.file_id == file_id]
+                if not targets:
+                    targets = [get_hit(f"{file_id}#bm25", file_id)]
+            doc_metadata = result.get("document", {}).get("metadata", {})
+            for hit in targets:
+                hit.leg_ranks["bm25"] = bm25_rank
+                hit.leg_scores["bm25"] = float(result["score"])
+                hit.metadata.setdefault("file_name", result.get("file_name", ""))
+                hit.metadata["matched_terms"] = result.get("matched_terms", [])
+                for name, value in doc_metadata.items():
+                    if value:
+                        hit.metadata.setdefault(name, value)
+
+        if self.fusion == "rrf":
+            for hit in hits.values():
+                hit.score = sum(
+                    self.weights.get(leg, 0.0) / (self.rrf_k + rank)
+                    for leg, rank in hit.leg_ranks.items()
+                )
+        else:
+            self.__weighted_scores(hits.values())
+
+        return sorted(hits.values(), key=lambda h: h.score, reverse=True)
+
+    def __weighted_scores(self, hits):
+        """min-max归一化各路得分后加权求和（FAISS距离取负转为相似度）"""
+        hits = list(hits)
+        for leg in _LEGS:
+            values = {
+                id(hit): -hit.leg_scores[leg] if leg == "faiss" else hit.leg_scores[leg]
+                for hit in hits
+                if leg in hit.leg_scores
+            }
+            if not values:
+                continue
+            low, high = min(values.values()), max(values.values())
+            span = (high - low) or 1.0
+            for hit in hits:
+                if id(hit) in values:
+                    normalized = (values[id(hit)] - low) / span if high > low else 1.0
+                    hit.score += self.weights.get(leg, 0.0) * normalized
@@ -0,0 +1,203 @@
+import math
+import re
+from collections import Counter, defaultdict
+from log_module import logger
+
+from .tokenizer_service import EN_STOP_WORDS
+
+# 句子切分：在句末标点后、下一句大写字母/数字/引号开头处切分
+_SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?。！？])\s+(?=[A-Z0-9\"'(\[\u4e00-\u9fff])")
+_WORD_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z\-]+")
+# RAKE候选短语分隔：标点、数字等非单词字符
+_PHRASE_DELIMITER_PATTERN = re.compile(r"[^a-zA-Z\-\s]+")
+_ABSTRACT_PATTERN = re.compile(r"\babstract\b", re.IGNORECASE)
+_REFERENCES_PATTERN = re.compile(r"\b(references|bibliography)\b", re.IGNORECASE)
+
+_RAKE_STOP_WORDS = EN_STOP_WORDS | frozenset(
+    """
+    also based doing et al given having however paper propose proposed show shown thus
+    use used uses using via well within without
+    """.split()
+)
+"""RAKE关键词抽取使用的停用词（额外包含论文常见功能词）"""
+
+
+class LocalSummarizer:
+    """
+    本地抽取式摘要与关键词提取器（纯CPU，无需API）。
+
+    - 摘要：基于TF-IDF的句子打分，按原文顺序输出得分最高的句子
+    - 关键词：RAKE算法（按停用词和标点切分候选短语，以词的度/频率打分）
+    - 标题：优先使用PDF首页版面检测出的标题，否则取Abstract之前的首行文本
+
+    用于未配置API key或大模型调用失败时的降级，也可作为批量回填时的主模式。
+    """
+
+    def __init__(
+        self,
+        summary_min_words=150,
+        summary_max_words=250,
+        keyword_count=5,
+        max_chars=30000,
+    ):
+        """
+        Args:
+            summary_min_words: 摘要最少词数
+            summary_max_words: 摘要最多词数
+            keyword_count: 关键词数量
+            max_chars: 参与分析的最大字符数（论文正文前部信息量最大，截断以保证速度）
+        """
+        self.summary_min_words = summary_min_words
+        self.summary_max_words = summary_max_words
+        self.keyword_count = keyword_count
+        self.max_chars = max_chars
+
+    def analyze(self, text, layout_title=""):
+        """
+        对论文文本生成标题、摘要和关键词。
+
+        Args:
+            text: 论文文本
+            layout_title: PDF首页版面检测出的标题（可为空）
+
+        Returns:
+            dict: {"title": str, "summary": str, "keywords": list[str]}
+        """
+        if not text:
+            return {"title": layout_title or "", "summary": "", "keywords": []}
+
+        text = self.__strip_references(text[: self.max_chars])
+        sentences = self.__split_sentences(text)
+
+        result = {
+            "title": layout_title or self.__guess_title(text),
+            "summary": self.__summarize(sentences),
+            "keywords": self.__extract_keywords(text),
+        }
+        logger.debug(
+            f"本地分析完成: {len(sentences)}个句子, 关键词{result['keywords']}"
+        )
+        return result
+
+    def __strip_references(self, text):
+        """去除参考文献部分（仅当其出现在正文后半部分时）"""
+        matches = list(_REFERENCES_PATTERN.finditer(text))
+        if matches and matches[-1].start() > len(text) // 2:
+            return text[: matches[-1].start()]
+        return text
+
+    def __split_sentences(self, text):
+        """切分句子，过滤过短或过长（多为表格、公式残留）以及重复（页眉页脚）的句子"""
+        sentences = []
+        seen = set()
+        for sentence in _SENTENCE_SPLIT_PATTERN.split(text):
+            sentence = sentence.strip()
+            word_count = len(sentence.split())
+            if not 6 <= word_count <= 80 or sentence.lower() in seen:
+                continue
+            seen.add(sentence.lower())
+            sentences.append(sentence)
+        return sentences
+
+    def __guess_title(self, text):
+        """在无版面信息时猜测标题：取Abstract之前文本的前若干个词"""
+        abstract_match = _ABSTRACT_PATTERN.search(text[:3000])
+        head = text[: abstract_match.start()] if abstract_match else text[:300]
+        words = head.split()
+        return " ".join(words[:15]).strip()
+
+    def __summarize(self, sentences):
+        """TF-IDF句子排序，选出得分最高的句子并按原文顺序拼接"""
+        if not sentences:
+            return ""
+
+        sentence_terms = [
+            [
+                w
+                for w in _WORD_PATTERN.findall(s.lower())
+                if w not in _RAKE_STOP_WORDS and len(w) > 2
+            ]
+            for s in sentences
+        ]
+
+        # 以句子为文档计算逆文档频率
+        doc_freq = Counter()
+        for terms in sentence_terms:
+            doc_freq.update(set(terms))
+        total = len(sentences)
+        idf = {term: math.log(total / (1 + df)) + 1.0 for term, df in doc_freq.items()}
+
+        scores = []
+        for position, terms in enumerate(sentence_terms):
+            if not terms:
+                scores.append(0.0)
+                continue
+            tf = Counter(terms)
+            score = sum(count * idf[term] for term, count in tf.items()) / len(terms)
+            # 论文开头（摘要、引言）的句子更具概括性，给予位置加权
+            score *= 1.0 + 0.5 * max(0.0, 1.0 - position / 20)
+            scores.append(score)
+
+        ranked = sorted(range(total), key=lambda i: scores[i], reverse=True)
+        selected = []
+        word_count = 0
+        for index in ranked:
+            sentence_words = len(sentences[index].split())
+            if word_count + sentence_words > self.summary_max_words:
+                if word_count >= self.summary_min_words:
+                    break
+                continue
+            selected.append(index)
+            word_count += sentence_words
+
+        return " ".join(sentences[i] for i in sorted(selected))
+
+    def __extract_keywords(self, text):
+        """RAKE关键词抽取"""
+        phrases = []
+        for fragment in _PHRASE_DELIMITER_PATTERN.split(text.lower()):
+            current = []
+            for word in fragment.split():
+                if word in _RAKE_STOP_WORDS or len(word) < 2:
+                    if current:
+                        phrases.append(tuple(current))
+                    current = []
+                else:
+                    current.append(word.strip("-"))
+            if current:
+                phrases.append(tuple(current))
+
+        # 过长的短语多为断行残留，舍弃
+        phrases = [p for p in phrases if 1 <= len(p) <= 3 and all(p)]
+        if not phrases:
+            return []
+
+        word_freq = Counter()
+        word_degree = defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                word_freq[word] += 1
+                word_degree[word] += len(phrase)
+
+        word_score = {w: word_degree[w] / word_freq[w] for w in word_freq}
+        phrase_freq = Counter(phrases)
+
+        # 短语得分 = 词得分之和，且要求至少出现两次以排除偶然组合
+        phrase_scores = {
+            phrase: sum(word_score[w] for w in phrase) * math.log(1 + count)
+            for phrase, count in phrase_freq.items()
+            if count >= 2 or len(phrase_freq) < 50
+        }
+        ranked = sorted(phrase_scores, key=phrase_scores.get, reverse=True)
+
+        keywords = []
+        seen_words = set()
+        for phrase in ranked:
+            # 避免关键词之间大量重复（如 "attention" 与 "self attention"）
+            if set(phrase) <= seen_words:
+                continue
+            keywords.append(" ".join(phrase))
+            seen_words.update(phrase)
+            if len(keywords) >= self.keyword_count:
+                break
+        return keywords
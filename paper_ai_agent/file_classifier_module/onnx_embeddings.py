@@ -0,0 +1,191 @@
+import os
+import time
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from log_module import logger
+
+from .embedding_registry import DEFAULT_EMBEDDING_MODEL
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    基于ONNX Runtime的本地embedding模型（CPU推理）。
+
+    首次使用时把HuggingFace模型导出为ONNX（可选int8动态量化），缓存在DB/onnx目录下。
+    推理流程与sentence-transformers的all-MiniLM-L6-v2一致：Transformer -> 均值池化 -> L2归一化，
+    因此生成的向量可直接与现有FAISS索引混用（量化模型存在微小的余弦偏差，可用benchmark评估）。
+    """
+
+    def __init__(
+        self,
+        model_name=DEFAULT_EMBEDDING_MODEL,
+        quantize=False,
+        intra_op_threads=None,
+        max_length=256,
+        batch_size=32,
+    ):
+        """
+        Args:
+            model_name: HuggingFace模型名
+            quantize: 是否使用int8动态量化模型
+            intra_op_threads: ONNX Runtime算子内线程数，None时由ONNX Runtime决定（通常为物理核数）
+            max_length: 最大输入token数（超出部分截断，与sentence-transformers一致）
+            batch_size: 单次推理的文本数
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+        project_root = Path(__file__).parent.parent
+        self.export_folder = project_root / "DB" / "onnx" / model_name.replace("/", "--")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        model_path = self.__ensure_onnx_model()
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        logger.debug(
+            f"✔ ONNX embedding模型加载成功: {model_path.name}，线程数: {intra_op_threads or '自动'}"
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self.__encode(texts[start : start + self.batch_size]).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def __encode(self, texts):
+        """编码一个批次：均值池化（忽略padding）后L2归一化"""
+        inputs = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feeds = {name: value.astype(np.int64) for name, value in inputs.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def __ensure_onnx_model(self):
+        """导出（及量化）ONNX模型，已存在时直接复用"""
+        self.export_folder.mkdir(parents=True, exist_ok=True)
+        fp32_path = self.export_folder / "model.onnx"
+        int8_path = self.export_folder / "model.int8.onnx"
+
+        if not fp32_path.exists():
+            self.__export(fp32_path)
+        if not self.quantize:
+            return fp32_path
+
+        if not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+            logger.debug(f"✔ 已生成int8量化模型: {int8_path}")
+        return int8_path
+
+    def __export(self, output_path):
+        """使用torch.onnx把Transformer主干导出为ONNX（动态batch与序列长度）"""
+        import torch
+        from transformers import AutoModel
+
+        logger.debug(f"正在导出ONNX模型: {self.model_name} -> {output_path}")
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        dummy = self.tokenizer(["export"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(dummy[name] for name in input_names),
+                str(output_path),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+            )
+        logger.debug(f"✔ ONNX模型导出完成: {output_path}")
+
+
+def benchmark_embedding_backends(
+    texts=None,
+    model_name=DEFAULT_EMBEDDING_MODEL,
+    intra_op_threads=None,
+    repeat=3,
+):
+    """
+    对比PyTorch（sentence-transformers）、ONNX fp32、ONNX int8三种后端的吞吐量与向量偏差。
+
+    Args:
+        texts: 测试文本，为None时使用256条合成句子
+        model_name: HuggingFace模型名
+        intra_op_threads: ONNX Runtime线程数
+        repeat: 每个后端重复编码的次数（取最快一次）
+
+    Returns:
+        dict: 后端名 -> {"texts_per_second", "mean_cosine", "min_cosine"}，余弦相似度以PyTorch向量为基准
+    """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    if texts is None:
+        texts = [
+            f"Sentence {i}: transformer models use self-attention to encode long documents efficiently."
+            for i in range(256)
+        ]
+
+    backends = {
+        "torch": HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True},
+        ),
+        "onnx": OnnxEmbeddings(model_name, quantize=False, intra_op_threads=intra_op_threads),
+        "onnx-int8": OnnxEmbeddings(model_name, quantize=True, intra_op_threads=intra_op_threads),
+    }
+
+    report = {}
+    reference = None
+    for name, backend in backends.items():
+        backend.embed_documents(texts[:8])  # 预热
+        best = float("inf")
+        vectors = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            vectors = np.asarray(backend.embed_documents(texts))
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = vectors
+        # 向量均已L2归一化，逐行点积即余弦相似度
+        cosine = (reference * vectors).sum(axis=1)
+        report[name] = {
+            "texts_per_second": len(texts) / best,
+            "mean_cosine": float(cosine.mean()),
+            "min_cosine": float(cosine.min()),
+        }
+        logger.debug(
+            f"{name}: {report[name]['texts_per_second']:.1f} 条/秒，"
+            f"平均余弦 {report[name]['mean_cosine']:.5f}，最小余弦 {report[name]['min_cosine']:.5f}"
+        )
+    logger.debug(f"CPU核数: {os.cpu_count()}")
+    return report
@@ -1,10 +1,46 @@
 import json
+import re
 
-from langchain_openai import OpenAI
 from log_module import logger
+from global_module import file_classifier_config
+from utility_module import get_llm_client_factory
 import os
 
+from .analysis_cache import AnalysisCacheSingleton
+from .local_summarizer import LocalSummarizer
+from .prompt_packer import PromptPacker
+
+PROMPT_TEMPLATE_VERSION = "v1"
+"""分析提示词模板版本，修改提示词后需同步更新，使旧缓存失效"""
+BATCH_PROMPT_TEMPLATE_VERSION = "batch-v1"
+"""多论文批量分析提示词模板版本"""
+
+_SYSTEM_PROMPT = (
+    "You are an expert in this field of study,"
+    " with deep insights into computers and artificial intelligence. "
+    "Your way of explaining is humorous, witty, and easy to understand, "
+    "yet remains professional."
+)
+
+
 class PDFContentAnalyzer:
+    def __init__(self, mode=None):
+        """
+        Args:
+            mode: 分析模式，默认读取 file_classifier_config.analysis_mode
+                - "llm": 调用大模型分析，失败或缺失字段时降级到本地抽取
+                - "local": 仅使用本地抽取式摘要与关键词（适合批量回填）
+        """
+        self.mode = mode or file_classifier_config.get("analysis_mode", "llm")
+        self.local_summarizer = LocalSummarizer()
+        self.prompt_packer = PromptPacker(
+            token_budget=file_classifier_config.get("prompt_token_budget", 2500)
+        )
+        # 批量模式下每篇论文只发送摘要等高优先级内容
+        self.batch_prompt_packer = PromptPacker(
+            token_budget=file_classifier_config.get("batch_item_token_budget", 600)
+        )
+
     def run(self, input_queue, output_queue):
         """ "
         调用提取文本队列中的数据流,
@@ -33,13 +69,98 @@ class PDFContentAnalyzer:
 
         return new_file_data_dict
 
+    def analyze_batch(self, file_data_dicts):
+        """
+        批量分析多篇论文：将多篇论文的摘要打包进一次请求，要求模型返回JSON数组。
+
+        每篇论文按id校验返回结果，缺失或解析失败的论文单独走 analyze 降级处理。
+
+        Args:
+            file_data_dicts: 文件信息字典列表
+
+        Returns:
+            list: 分析后的文件信息字典列表（顺序与输入一致）
+        """
+        if self.mode == "local" or len(file_data_dicts) <= 1:
+            return [self.analyze(d) for d in file_data_dicts]
+
+        model = file_classifier_config.get("analysis_model", "deepseek-chat")
+        cache = AnalysisCacheSingleton()
+
+        # 1. 打包每篇论文的关键内容，命中缓存的直接写回
+        pending = {}
+        for index, file_data_dict in enumerate(file_data_dicts):
+            key_text = self.batch_prompt_packer.pack(file_data_dict["file_text"]).text
+            cache_key = cache.make_key(BATCH_PROMPT_TEMPLATE_VERSION, model, key_text)
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                self.__apply_result(file_data_dict, cached_result)
+            else:
+                pending[f"P{index + 1}"] = (index, key_text, cache_key)
+
+        logger.debug(
+            f"批量分析: 共{len(file_data_dicts)}篇，缓存命中{len(file_data_dicts) - len(pending)}篇"
+        )
+        if not pending:
+            return file_data_dicts
+
+        # 2. 一次请求分析全部未命中的论文
+        batch_results = self.__call_ai_model_batch(
+            {paper_id: key_text for paper_id, (_, key_text, _) in pending.items()}
+        )
+
+        # 3. 校验每个id的返回结果，不合格的单独降级处理
+        fallback_count = 0
+        for paper_id, (index, _, cache_key) in pending.items():
+            result = batch_results.get(paper_id)
+            if result is not None:
+                cache.put(cache_key, result)
+                self.__apply_result(file_data_dicts[index], result)
+            else:
+                fallback_count += 1
+                self.analyze(file_data_dicts[index])
+        if fallback_count:
+            logger.debug(f"批量分析有{fallback_count}篇结果缺失或无效，已单独分析")
+        return file_data_dicts
+
     def __generate_summary_and_keywords(self, file_data_dict):
         """
         根据文本,让llm生成信息
         """
         logger.debug("正在生成关键词和总结")
         file_text_content = file_data_dict["file_text"]
-        ai_result = self.__call_ai_model(file_text_content)
+        layout_title = file_data_dict.get("file_layout_title", "")
+
+        if self.mode == "local":
+            ai_result = self.local_summarizer.analyze(file_text_content, layout_title)
+        else:
+            # 按token预算和章节优先级打包关键内容（优先Abstract, Introduction, Method, Conclusion）
+            packed = self.prompt_packer.pack(file_text_content)
+            file_data_dict["analysis_prompt_tokens"] = {
+                "original": packed.original_tokens,
+                "packed": packed.packed_tokens,
+                "saved": packed.tokens_saved,
+            }
+            logger.info(
+                f"{file_data_dict.get('file_name', '')}: 提示词 {packed.packed_tokens} tokens，"
+                f"节省 {packed.tokens_saved} tokens"
+            )
+            ai_result = self.__call_ai_model(packed.text)
+
+        return self.__apply_result(file_data_dict, ai_result)
+
+    def __apply_result(self, file_data_dict, ai_result):
+        """将分析结果写回文件信息字典，缺失字段使用本地抽取结果补全"""
+        ai_result = dict(ai_result)
+        # 大模型未返回的字段（未配置key、超时、解析失败）使用本地抽取结果补全
+        if not all(ai_result.get(k) for k in ("title", "summary", "keywords")):
+            logger.debug("分析结果不完整，使用本地抽取结果补全")
+            local_result = self.local_summarizer.analyze(
+                file_data_dict["file_text"], file_data_dict.get("file_layout_title", "")
+            )
+            for k, v in local_result.items():
+                if not ai_result.get(k):
+                    ai_result[k] = v
 
         # 使用AI结果或默认值
         file_data_dict.update(
@@ -55,24 +176,38 @@ class PDFContentAnalyzer:
         )
         return file_data_dict
 
-    def __call_ai_model(self, text):
-        api_key = os.getenv("API_KEY")
-
-        # 如果没有API key，返回默认值
-        if not api_key:
+    def __chat(self, messages, **kwargs):
+        """通过共享LLM客户端调用大模型，HTTP后端未配置API key时返回None"""
+        api_key = os.getenv("API_KEY", "")
+        factory = get_llm_client_factory()
+        if not factory.is_available(api_key):
             logger.debug("️✖ DeepSeek API Key未配置，跳过AI分析")
-            return {"title": "", "summary": "", "keywords": []}
+            return None
+
+        return factory.chat(
+            api_key=api_key,
+            base_url=file_classifier_config.get(
+                "analysis_base_url", "https://api.deepseek.com"
+            ),
+            model=file_classifier_config.get("analysis_model", "deepseek-chat"),
+            messages=messages,
+            timeout=file_classifier_config.get("timeout", 30),
+            **kwargs,
+        )
 
-        try:
-            # 初始化OpenAI客户端
-            from openai import OpenAI as OpenAIClient
+    def __call_ai_model(self, key_text):
+        model = file_classifier_config.get("analysis_model", "deepseek-chat")
 
-            client = OpenAIClient(api_key=api_key, base_url="https://api.deepseek.com")
+        # 相同文本、相同模型和提示词版本直接复用之前的分析结果
+        cache = AnalysisCacheSingleton()
+        cache_key = cache.make_key(PROMPT_TEMPLATE_VERSION, model, key_text)
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            logger.debug("✔ 命中分析结果缓存，跳过大模型调用")
+            return cached_result
 
+        try:
             """调用大模型API生成摘要和关键词"""
-            # 智能提取关键章节（优先Abstract, Introduction, Method, Conclusion）
-            key_text = self.__extract_key_sections(text, max_chars=10000)
-
             prompt = f"""
                 Please give me the superior main title of the text paper, generate a refined and brief summary(150-250 words) and 5 keywords, according to the content of a paper or thesis:
                 text content:
@@ -86,21 +221,17 @@ class PDFContentAnalyzer:
                 }}
                 """
             logger.debug("开始调用大模型生成关键词和总结")
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert in this field of study,"
-                        " with deep insights into computers and artificial intelligence. "
-                        "Your way of explaining is humorous, witty, and easy to understand, "
-                        "yet remains professional.",
-                    },
+            response = self.__chat(
+                [
+                    {"role": "system", "content": _SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ],
                 max_tokens=800,
                 temperature=0.3,
             )
+            # 如果没有API key，返回默认值
+            if response is None:
+                return {"title": "", "summary": "", "keywords": []}
 
             if response.choices[0].message.content is None:
                 raise ValueError("Empty response from AI model")
@@ -109,11 +240,11 @@ class PDFContentAnalyzer:
             # 尝试解析JSON响应
             try:
                 # 提取JSON部分（避免模型返回额外文本）
-                import re
-
                 json_match = re.search(r"\{.*\}", result_text, re.DOTALL)
                 if json_match:
                     result = json.loads(json_match.group())
+                    # 仅缓存成功解析的结果，解析失败的下次重新生成
+                    cache.put(cache_key, result)
                 else:
                     result = {"title": "", "summary": result_text, "keywords": []}
             except:
@@ -126,65 +257,74 @@ class PDFContentAnalyzer:
             logger.debug(f"✖ 调用AI API时出错: {e}")
             return {"title": "", "summary": "", "keywords": []}
 
-    def __extract_key_sections(self, text, max_chars=10000):
-        """智能提取论文关键章节
-
-        优先级：Abstract > Introduction > Method/Approach > Conclusion > 其他
+    def __call_ai_model_batch(self, papers):
         """
-        import re
-
-        if len(text) <= max_chars:
-            return text
-
-        # 尝试提取各个章节
-        sections = {}
-
-        # 1. Abstract（最重要）
-        abstract_match = re.search(
-            r"(abstract|ABSTRACT)[\s\n]+(.*?)(?=\n\n[A-Z]|introduction|INTRODUCTION|$)",
-            text,
-            re.IGNORECASE | re.DOTALL,
-        )
-        if abstract_match:
-            sections["abstract"] = abstract_match.group(2)[:800]
-
-        # 2. Introduction
-        intro_match = re.search(
-            r"(introduction|INTRODUCTION)[\s\n]+(.*?)(?=\n\n[0-9A-Z]|related work|RELATED|method|METHOD|$)",
-            text,
-            re.IGNORECASE | re.DOTALL,
-        )
-        if intro_match:
-            sections["introduction"] = intro_match.group(2)[:2000]
-
-        # 3. Method/Approach
-        method_match = re.search(
-            r"(method|methodology|approach|METHODOLOGY|APPROACH)[\s\n]+(.*?)(?=\n\n[0-9A-Z]|experiment|EXPERIMENT|result|RESULT|$)",
-            text,
-            re.IGNORECASE | re.DOTALL,
-        )
-        if method_match:
-            sections["method"] = method_match.group(2)[:3000]
-
-        # 4. Conclusion
-        conclusion_match = re.search(
-            r"(conclusion|CONCLUSION|summary|SUMMARY)[\s\n]+(.*?)(?=\n\n[A-Z]|reference|REFERENCE|$)",
-            text,
-            re.IGNORECASE | re.DOTALL,
-        )
-        if conclusion_match:
-            sections["conclusion"] = conclusion_match.group(2)[:1000]
+        一次请求分析多篇论文。
 
-        # 拼接提取的内容
-        extracted = []
-        for section in ["abstract", "introduction", "method", "conclusion"]:
-            if section in sections:
-                extracted.append(sections[section])
+        Args:
+            papers: {论文id: 论文关键内容}
 
-        result = "\n\n".join(extracted)
-
-        # 如果提取失败或太短，使用前max_chars字符
-        if len(result) < 1000:
-            return text[:max_chars]
+        Returns:
+            dict: {论文id: {"title", "summary", "keywords"}}，仅包含校验通过的结果
+        """
+        try:
+            paper_blocks = "\n\n".join(
+                f"[{paper_id}]\n{key_text}" for paper_id, key_text in papers.items()
+            )
+            prompt = f"""
+                Below are {len(papers)} papers, each starting with its id in square brackets.
+                For EACH paper, give the superior main title, a refined and brief summary(150-250 words) and 5 keywords.
+                {paper_blocks}
+
+                Return ONLY a JSON array with one object per paper, without any other redundant description:
+                [
+                    {{
+                        "id": "P1",
+                        "title": "here is the title of the paper",
+                        "summary": "here is the summary of the paper",
+                        "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+                    }}
+                ]
+                """
+            logger.debug(f"开始调用大模型批量分析{len(papers)}篇论文")
+            response = self.__chat(
+                [
+                    {"role": "system", "content": _SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                max_tokens=min(8000, 450 * len(papers)),
+                temperature=0.3,
+            )
+            if response is None:
+                return {}
+            result_text = response.choices[0].message.content
+            if result_text is None:
+                raise ValueError("Empty response from AI model")
 
-        return result[:max_chars]
+            json_match = re.search(r"\[.*\]", result_text, re.DOTALL)
+            if not json_match:
+                raise ValueError("No JSON array in AI response")
+            items = json.loads(json_match.group())
+        except Exception as e:
+            logger.debug(f"✖ 批量调用AI API时出错: {e}")
+            return {}
+
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            paper_id = str(item.get("id", "")).strip("[] ")
+            keywords = item.get("keywords")
+            if (
+                paper_id in papers
+                and isinstance(item.get("title"), str)
+                and isinstance(item.get("summary"), str)
+                and item["summary"].strip()
+                and isinstance(keywords, list)
+            ):
+                results[paper_id] = {
+                    "title": item["title"],
+                    "summary": item["summary"],
+                    "keywords": [str(k) for k in keywords],
+                }
+        return results
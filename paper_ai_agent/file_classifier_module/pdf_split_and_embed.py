@@ -2,15 +2,15 @@ import os
 import pickle
 from collections import Counter, defaultdict
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from langchain_community.embeddings import DashScopeEmbeddings
-import json
 from log_module import *  # 导入全局日志模块
-from global_module import API_KEY
+from global_module import API_KEY, file_classifier_config
 
+from .chunker import SectionAwareChunker, get_model_token_counter
 from .corpus_singleton import CorpusSingleton
 from .faiss_singleton import FAISSVectorStoreSingleton
+from .tokenizer_service import Tokenizer, detect_language
 import math
 
 
@@ -27,6 +27,11 @@ class PDFRagWorker:
         self.embedding_model = embedding_model
 
         self.detected_language: str = "en"  # 检测到的语言（默认按照英文处理）
+        self.tokenizer = Tokenizer(
+            use_stemmer=bool(file_classifier_config.get("tokenizer_stemmer", False))
+        )
+        self._pending_term_stats: list[dict] = []  # 待批量写入的词频统计
+        self._chunker = None  # 首次切分时按embedding模型的分词器创建
 
     def run(self, input_queue, output_queue):
         """
@@ -44,31 +49,17 @@ class PDFRagWorker:
         # 使用bm25进行词频统计和存储
         self.__build_bm25_index(previous_file_data_dict)
 
-    def __detect_language(self, text, sample_size=2000):
-        """检测文本语言（中文/英文）
-
-        Args:
-            text: 待检测文本
-            sample_size: 采样大小
-
-        Returns:
-            'zh' 或 'en'
-        """
-        if not text:
-            return "en"  # 默认英文
-
-        # 采样前sample_size字符
-        sample = text[:sample_size]
-
-        # 统计中文字符数量
-        chinese_chars = len([c for c in sample if "\u4e00" <= c <= "\u9fff"])
-        total_chars = len(sample)
+    def flush_term_stats(self) -> bool:
+        """将本轮入库暂存的词频统计一次性写入数据库"""
+        from database_module import add_or_update_term_stats
 
-        # 如果中文字符占比>20%，认为是中文文档
-        if total_chars > 0 and (chinese_chars / total_chars) > 0.2:
-            return "zh"
-        else:
-            return "en"
+        if not self._pending_term_stats:
+            return True
+        if add_or_update_term_stats(self._pending_term_stats):
+            logger.debug(f"✔ 已批量写入{len(self._pending_term_stats)}条词频统计")
+            self._pending_term_stats = []
+            return True
+        return False
 
     def __get_api_embedding_model(self):
         """获取embedding模型（根据语言自动选择合适模型）
@@ -103,29 +94,37 @@ class PDFRagWorker:
         self.__embed(splitted_docs)
 
     def __content_split(self, previous_file_data_dict):
-
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,  # 块大小
-            chunk_overlap=200,  # 块重叠
-            separators=["\n\n", "\n", ".", "!", "?", " "],  # 分隔符
-        )
-
-        doc = Document(
-            page_content=previous_file_data_dict[
-                "file_text"
-            ],  # 这是已经从PDF提取并清理的文本
-            metadata={
-                "file_name": previous_file_data_dict["file_name"],
-                "file_id": previous_file_data_dict["file_id"],
-                "file_title": previous_file_data_dict["file_title"],
-                "file_summary": previous_file_data_dict["file_summary"],
-                "file_keywords": ", ".join(
-                    previous_file_data_dict["file_keywords"]
-                ),  # 将关键词列表转为字符串
-            },
-        )
-        # 2. 文本分割
-        splitted_doc = text_splitter.split_documents([doc])
+        """按页面、章节与句子边界切分论文，块大小以embedding模型token数计"""
+        if self._chunker is None:
+            self._chunker = SectionAwareChunker(
+                max_tokens=int(file_classifier_config.get("chunk_max_tokens", 240)),
+                max_overlap_ratio=float(
+                    file_classifier_config.get("chunk_overlap_ratio", 0.15)
+                ),
+                token_counter=get_model_token_counter(self.embedding_model),
+            )
+
+        # 旧版转换结果没有逐页文本，退化为整篇单页（无法识别章节，但仍按句子切分）
+        pages = previous_file_data_dict.get("file_pages") or [
+            {"page": None, "text": previous_file_data_dict["file_text"]}
+        ]
+        chunks = self._chunker.split(pages)
+
+        splitted_doc = [
+            Document(
+                page_content=chunk.text,
+                # 只保存块级字段；标题、摘要等论文级字段检索时再按file_id从数据库补全
+                metadata={
+                    "file_id": previous_file_data_dict["file_id"],
+                    "chunk_index": chunk.ordinal,
+                    "start_offset": chunk.start,
+                    "end_offset": chunk.end,
+                    "page": chunk.page,
+                    "section": chunk.section,
+                },
+            )
+            for chunk in chunks
+        ]
         return splitted_doc
 
     def __embed(self, docs):
@@ -147,7 +146,32 @@ class PDFRagWorker:
         # faiss文件保存目录
         save_embed_folder = os.path.join(project_root, "DB", "embedding")
         vector_store = FAISSVectorStoreSingleton(embeddings_model, save_embed_folder)
-        return vector_store.similarity_search_with_score(query, k)
+        return self.__resolve_paper_fields(
+            vector_store.similarity_search_with_score(query, k)
+        )
+
+    def __resolve_paper_fields(self, results):
+        """按file_id批量补全检索结果的论文级字段（file_name、file_title、file_summary、file_keywords）
+
+        返回新的Document对象，不修改docstore中的原始文档，避免补全字段被重新持久化。
+        """
+        from database_module import query_file_briefs_by_ids
+
+        briefs = query_file_briefs_by_ids(
+            [doc.metadata.get("file_id") for doc, _ in results]
+        )
+        resolved = []
+        for doc, score in results:
+            brief = briefs.get(doc.metadata.get("file_id"), {})
+            metadata = {
+                "file_name": brief.get("file_name") or "",
+                "file_title": brief.get("title") or "",
+                "file_summary": brief.get("summary") or "",
+                "file_keywords": (brief.get("keywords") or "").replace(",", ", "),
+                **doc.metadata,  # 旧版块中已有的论文级字段优先保留
+            }
+            resolved.append((Document(page_content=doc.page_content, metadata=metadata), score))
+        return resolved
 
     def get_bm25_retrieval(self, query, k=10, score_threshold=0.0):
         """从BM25索引中检索最相关的k条记录
@@ -235,13 +259,18 @@ class PDFRagWorker:
 
         Storage:
             - DB/bm25/corpus.pkl: BM25语料库（包含所有文档的分词结果）
-            - DB/bm25/term_freq.json: 词频统计结果
+            - 数据库term_stat表: 词频统计结果（调用flush_term_stats后批量写入）
         """
         try:
             logger.debug(f'开始对{previous_file_data_dict["file_name"]}构建BM25索引')
 
-            # 1. 文本分词
-            tokens = self.__tokenize_text(previous_file_data_dict["file_text"])
+            # 1. 检测语言并分词
+            self.detected_language = detect_language(
+                previous_file_data_dict["file_text"]
+            )
+            tokens = self.__tokenize_text(
+                previous_file_data_dict["file_text"], self.detected_language
+            )
 
             if not tokens:
                 logger.debug("警告: 分词结果为空，跳过BM25索引构建")
@@ -258,6 +287,7 @@ class PDFRagWorker:
                 "file_id": previous_file_data_dict["file_id"],
                 "file_name": previous_file_data_dict["file_name"],
                 "tokens": tokens,  # 分词结果
+                "language": self.detected_language,
                 "term_frequency": term_frequency,  # 词频统计
                 "metadata": {
                     "file_title": previous_file_data_dict.get("file_title", ""),
@@ -270,31 +300,16 @@ class PDFRagWorker:
 
             corpus = corpus_manager.get_corpus()
 
-            # 6. 保存词频统计到JSON（便于查看）- 这部分可以保留
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            bm25_folder = os.path.join(project_root, "DB", "BM25")
-            os.makedirs(bm25_folder, exist_ok=True)
-
-            term_freq_path = os.path.join(bm25_folder, "term_freq.json")
-
-            # 加载现有词频统计
-            if os.path.exists(term_freq_path):
-                with open(term_freq_path, "r", encoding="utf-8") as f:
-                    all_term_freq = json.load(f)
-            else:
-                all_term_freq = {}
-
-            # 更新词频统计
-            all_term_freq[previous_file_data_dict["file_id"]] = {
-                "file_name": previous_file_data_dict["file_name"],
-                "top_terms": term_frequency[:50],  # 保存前50个高频词
-                "total_tokens": len(tokens),
-                "unique_tokens": len(set(tokens)),
-            }
-
-            # 保存
-            with open(term_freq_path, "w", encoding="utf-8") as f:
-                json.dump(all_term_freq, f, ensure_ascii=False, indent=2)
+            # 5. 词频统计暂存，由 flush_term_stats 在本轮入库结束时批量写入数据库
+            self._pending_term_stats.append(
+                {
+                    "file_id": previous_file_data_dict["file_id"],
+                    "file_name": previous_file_data_dict["file_name"],
+                    "top_terms": term_frequency[:50],  # 保存前50个高频词
+                    "total_tokens": len(tokens),
+                    "unique_tokens": len(set(tokens)),
+                }
+            )
 
             logger.debug(f"BM25索引构建完成，当前语料库文档数: {len(corpus)}")
             logger.debug(f"文档词数: {len(tokens)}, 独特词数: {len(set(tokens))}")
@@ -304,316 +319,18 @@ class PDFRagWorker:
             logger.debug(f"BM25索引构建失败: {e}")
             raise e
 
-    def __get_stop_words(self, language="en"):
-        """获取停用词表
-
-        Args:
-            language: 'zh' 或 'en'
-
-        Returns:
-            set: 停用词集合
-        """
-        if language == "zh":
-            # 中文停用词表
-            stop_words = {
-                "的",
-                "了",
-                "在",
-                "是",
-                "我",
-                "有",
-                "和",
-                "就",
-                "不",
-                "人",
-                "都",
-                "一",
-                "一个",
-                "上",
-                "也",
-                "很",
-                "到",
-                "说",
-                "要",
-                "去",
-                "你",
-                "会",
-                "着",
-                "没有",
-                "看",
-                "好",
-                "自己",
-                "这",
-                "那",
-                "里",
-                "来",
-                "他",
-                "她",
-                "它",
-                "们",
-                "为",
-                "与",
-                "及",
-                "对",
-                "把",
-                "被",
-                "从",
-                "以",
-                "向",
-                "用",
-                "于",
-                "将",
-                "让",
-                "给",
-                "而",
-                "则",
-                "或",
-                "且",
-                "但",
-                "却",
-                "因",
-                "所",
-                "因为",
-                "所以",
-                "如果",
-                "虽然",
-                "然而",
-                "因此",
-                "并且",
-                "还是",
-                "或者",
-                "不是",
-                "这个",
-                "那个",
-                "什么",
-                "怎么",
-                "为什么",
-                "哪里",
-                "谁",
-                "多少",
-                "几",
-                "些",
-                "每",
-                "比",
-                "更",
-                "最",
-                "非常",
-                "特别",
-                "已",
-                "已经",
-                "正在",
-                "曾",
-                "曾经",
-            }
-        else:
-            # 英文停用词表（包含连词、代词、介词、be动词等）
-            stop_words = {
-                # 冠词
-                "a",
-                "an",
-                "the",
-                # be动词
-                "is",
-                "am",
-                "are",
-                "was",
-                "were",
-                "be",
-                "been",
-                "being",
-                # 助动词
-                "do",
-                "does",
-                "did",
-                "will",
-                "would",
-                "shall",
-                "should",
-                "may",
-                "might",
-                "can",
-                "could",
-                "must",
-                "ought",
-                "have",
-                "has",
-                "had",
-                # 代词
-                "i",
-                "you",
-                "he",
-                "she",
-                "it",
-                "we",
-                "they",
-                "them",
-                "their",
-                "theirs",
-                "my",
-                "mine",
-                "your",
-                "yours",
-                "his",
-                "her",
-                "hers",
-                "its",
-                "our",
-                "ours",
-                "this",
-                "that",
-                "these",
-                "those",
-                "who",
-                "whom",
-                "whose",
-                "which",
-                "what",
-                "myself",
-                "yourself",
-                "himself",
-                "herself",
-                "itself",
-                "ourselves",
-                "themselves",
-                # 介词
-                "in",
-                "on",
-                "at",
-                "by",
-                "for",
-                "with",
-                "about",
-                "against",
-                "between",
-                "into",
-                "through",
-                "during",
-                "before",
-                "after",
-                "above",
-                "below",
-                "to",
-                "from",
-                "up",
-                "down",
-                "out",
-                "off",
-                "over",
-                "under",
-                "again",
-                "further",
-                "then",
-                "once",
-                "of",
-                # 连词
-                "and",
-                "but",
-                "or",
-                "nor",
-                "so",
-                "yet",
-                "as",
-                "if",
-                "when",
-                "where",
-                "while",
-                "because",
-                "although",
-                "though",
-                "since",
-                "unless",
-                "until",
-                # 其他常见词
-                "not",
-                "no",
-                "yes",
-                "all",
-                "any",
-                "both",
-                "each",
-                "few",
-                "more",
-                "most",
-                "other",
-                "some",
-                "such",
-                "only",
-                "own",
-                "same",
-                "than",
-                "too",
-                "very",
-                "just",
-                "now",
-                "here",
-                "there",
-                "how",
-                "why",
-            }
-
-        return stop_words
-
-    def __tokenize_text(self, text):
-        """对文本进行分词（根据语言选择分词工具）
-
-        中文使用jieba分词，英文使用空格分词+标点处理。
-        自动过滤停用词。
+    def __tokenize_text(self, text, language=None):
+        """对文本进行分词（委托给共享的分词服务）
 
         Args:
             text: 待分词的文本
+            language: 'zh'/'en'，为None时自动检测
 
         Returns:
             list: 分词后的词语列表（已过滤停用词）
         """
         try:
-            import re
-
-            if not text:
-                return []
-
-            # 获取停用词表
-            stop_words = self.__get_stop_words(self.detected_language)
-
-            # 根据语言选择分词方法
-            if self.detected_language == "zh":
-                # 中文：使用jieba分词
-                try:
-                    import jieba
-
-                    tokens = jieba.lcut(text)
-                except ImportError:
-                    logger.debug("警告: jieba未安装，中文分词效果将受影响")
-                    tokens = text.split()
-            else:
-                # 英文：使用正则分词（按单词边界分割）
-                # 保留字母和数字组成的单词
-                tokens = re.findall(r"\b[a-zA-Z]+\b", text.lower())
-
-            # 过滤：去除停用词、单字符、纯数字、纯标点
-            filtered_tokens = []
-            for token in tokens:
-                token = token.strip().lower()
-
-                # 基本长度过滤
-                if len(token) < 2:
-                    continue
-
-                # 停用词过滤
-                if token in stop_words:
-                    continue
-
-                # 过滤纯数字
-                if token.isdigit():
-                    continue
-
-                # 中文特殊标点过滤
-                if all(c in '，。！？、；：""' "【】（）《》" for c in token):
-                    continue
-
-                filtered_tokens.append(token)
-
-            return filtered_tokens
-
+            return self.tokenizer.tokenize(text, language)
         except Exception as e:
             logger.debug(f"分词失败: {e}")
             # 降级方案：简单空格分词
@@ -5,6 +5,8 @@ import re
 from log_module import *  # 导入全局日志模块
 from pymupdf import Document, Page
 
+from .chunker import flatten_pages
+
 
 class PDFTransformer:
     def run(self, input_queue, output_queue):
@@ -19,22 +21,81 @@ class PDFTransformer:
         """基于文件名生成md5 id"""
         file_id = self.__generate_file_unique_id(file_name)
 
+        # 逐页提取文本（保留换行，供按页、按章节切分使用）
+        raw_pages = self.__pdf_to_pages(full_path)
+        file_pages = [
+            {"page": index + 1, "text": self.__clean_page_text(page_text)}
+            for index, page_text in enumerate(raw_pages or [])
+        ]
+
         # 提取基础文本
-        file_text = self.__pdf_to_text(full_path)
+        file_text = self.__pdf_to_text(raw_pages)
 
         # 极简OCR策略（针对CV论文）
         ocr_text = self.__smart_ocr(full_path, file_text)
         if ocr_text:
             file_text = file_text + "\n" + ocr_text if file_text else ocr_text
+            # OCR文本来自多页图片，无法对应具体页码
+            file_pages.append({"page": None, "text": self.__clean_page_text(ocr_text)})
             logger.debug(f" OCR识别完成，额外提取{len(ocr_text)}字符")
+        if file_pages:
+            # 全文由逐页文本拼接而成，文本块的偏移量可直接定位到入库保存的file_text
+            file_text = flatten_pages(file_pages)
 
         result = {
             "file_id": file_id,
             "file_text": file_text,
+            "file_pages": file_pages,
             "file_name": file_name,
+            "file_layout_title": self.__detect_layout_title(full_path),
         }
         return result
 
+    def __detect_layout_title(self, full_path):
+        """根据首页版面检测标题：取首页上半部分字号最大的水平文本行"""
+        try:
+            import fitz  # PyMuPDF
+
+            doc: Document = fitz.open(full_path)
+            if len(doc) == 0:
+                doc.close()
+                return ""
+            page: Page = doc[0]
+            page_height = page.rect.height
+            page_dict = page.get_text("dict")
+            doc.close()
+
+            lines = []
+            for block in page_dict.get("blocks", []):
+                for line in block.get("lines", []):
+                    # 跳过竖排文本（如arXiv侧边栏编号）
+                    if abs(line.get("dir", (1, 0))[1]) > 0.1:
+                        continue
+                    spans = [s for s in line.get("spans", []) if s["text"].strip()]
+                    if not spans:
+                        continue
+                    top = line["bbox"][1]
+                    if top > page_height / 2:
+                        continue
+                    size = max(s["size"] for s in spans)
+                    text = " ".join(s["text"].strip() for s in spans)
+                    lines.append((size, top, text))
+
+            if not lines:
+                return ""
+            max_size = max(size for size, _, _ in lines)
+            # 标题可能换行，合并所有与最大字号相近的行
+            title_lines = [
+                text
+                for size, top, text in sorted(lines, key=lambda x: x[1])
+                if size >= max_size - 0.5
+            ]
+            title = self.__clean_text(" ".join(title_lines))
+            return title if 2 <= len(title.split()) <= 30 else ""
+        except Exception as e:
+            logger.debug(f"首页版面标题检测失败: {e}")
+            return ""
+
     def __smart_ocr(self, full_path, base_text):
         """极简OCR策略（simple模式）- 专为CV论文设计
 
@@ -205,21 +266,24 @@ class PDFTransformer:
         except Exception:
             return ""
 
-    def __pdf_to_text(self, full_path):
-        """将PDF文件转换为文本文件"""
+    def __pdf_to_pages(self, full_path):
+        """逐页提取PDF原始文本"""
         try:
-            text_content = ""
             with open(full_path, "rb") as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text_content += page.extract_text() + "\n"
-            cleaned_text_content = self.__clean_text(text_content)
-            return cleaned_text_content
+                return [page.extract_text() or "" for page in pdf_reader.pages]
         except Exception as e:
             logger.debug(e)
             logger.debug("failed at changing pdf to text")
             return None
 
+    def __pdf_to_text(self, raw_pages):
+        """将逐页文本拼接并清理为单行全文"""
+        if raw_pages is None:
+            return None
+        text_content = "".join(page_text + "\n" for page_text in raw_pages)
+        return self.__clean_text(text_content)
+
     def __generate_file_unique_id(self, pdf_path):
 
         md5_hash = hashlib.md5()
@@ -238,3 +302,11 @@ class PDFTransformer:
         content = re.sub(r"[^\x20-\x7E\u4e00-\u9fa5]+", " ", content)
         content = re.sub(r"\s+", " ", content)
         return content.strip()
+
+    def __clean_page_text(self, content):
+        """清理单页文本：与__clean_text相同的字符过滤，但保留换行（标题行、段落边界）"""
+        import re
+
+        content = re.sub(r"[^\x20-\x7E\u4e00-\u9fa5\n]+", " ", content)
+        lines = (re.sub(r"[ \t]+", " ", line).strip() for line in content.split("\n"))
+        return "\n".join(line for line in lines if line)
@@ -0,0 +1,266 @@
+import re
+from dataclasses import dataclass, field
+from log_module import logger
+
+_SECTION_NAMES = {
+    "abstract": ["Abstract"],
+    "introduction": ["Introduction"],
+    "related": ["Related Work", "Background"],
+    "method": ["Method", "Methods", "Methodology", "Approach", "Model Architecture"],
+    "experiments": ["Experiments", "Experiment", "Experimental Setup"],
+    "results": ["Results", "Evaluation"],
+    "conclusion": ["Conclusion", "Conclusions", "Discussion"],
+    "references": ["References", "Bibliography"],
+    "acknowledgements": ["Acknowledgements", "Acknowledgments", "Acknowledgement"],
+}
+"""章节规范名 -> 标题写法"""
+
+_DROPPED_SECTIONS = frozenset({"references", "acknowledgements"})
+"""直接丢弃的样板章节"""
+
+_SECTION_PRIORITY = [
+    ("front", 0.05),
+    ("abstract", 0.15),
+    ("introduction", 0.2),
+    ("method", 0.25),
+    ("conclusion", 0.15),
+    ("results", 0.1),
+    ("experiments", 0.05),
+    ("related", 0.05),
+    ("body", 1.0),
+]
+"""(章节, 预算占比)，按优先级排列；第二轮按此顺序分配剩余预算"""
+
+
+def _build_heading_pattern():
+    """构建章节标题正则：编号标题（如"3 Model Architecture"）、全大写标题，或Abstract/References"""
+    alternatives = []
+    for canonical, names in _SECTION_NAMES.items():
+        for name in names:
+            escaped = re.escape(name).replace(r"\ ", r"\s+")
+            upper = re.escape(name.upper()).replace(r"\ ", r"\s+")
+            alternatives.append(
+                rf"(?P<{canonical}_{len(alternatives)}>(?:\b\d{{1,2}}(?:\.\d)?\.?\s+{escaped})|{upper}"
+                + (rf"|{escaped}" if canonical in ("abstract", "references") else "")
+                + r")\b"
+            )
+    return re.compile("|".join(alternatives))
+
+
+_HEADING_PATTERN = _build_heading_pattern()
+_SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?。！？])\s+")
+_ALPHA_PATTERN = re.compile(r"[A-Za-z\u4e00-\u9fff]")
+
+
+class _TokenCounter:
+    """基于tiktoken的token计数器，不可用时按字符数估算"""
+
+    def __init__(self, encoding_name="cl100k_base"):
+        self._encoding = None
+        try:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.debug(f"tiktoken不可用，使用字符数估算token: {e}")
+
+    def count(self, text):
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        # 英文约4字符/token，中文约1字/token
+        cjk = len(re.findall(r"[\u4e00-\u9fff]", text))
+        return cjk + (len(text) - cjk) // 4 + 1
+
+
+_token_counter = None
+
+
+def count_tokens(text):
+    """统计文本token数（进程内共享同一个编码器）"""
+    global _token_counter
+    if _token_counter is None:
+        _token_counter = _TokenCounter()
+    return _token_counter.count(text)
+
+
+@dataclass
+class PackedPrompt:
+    """提示词打包结果"""
+
+    text: str
+    original_tokens: int
+    packed_tokens: int
+    sections: list = field(default_factory=list)
+
+    @property
+    def tokens_saved(self):
+        return max(0, self.original_tokens - self.packed_tokens)
+
+
+class PromptPacker:
+    """
+    按token预算打包论文文本。
+
+    1. 去除样板内容：参考文献、致谢、重复出现的页眉页脚、非文本残留
+    2. 识别章节，按优先级（摘要 > 引言 > 方法 > 结论 > 其他）分配预算
+    3. 以句子为单位填充，最终按原文顺序输出
+    """
+
+    def __init__(
+        self,
+        token_budget=2500,
+        boilerplate_ngram=6,
+        boilerplate_min_repeat=3,
+        min_boilerplate_gap=150,
+    ):
+        """
+        Args:
+            token_budget: 打包后文本的token上限
+            boilerplate_ngram: 判定页眉页脚重复片段的词n-gram长度
+            boilerplate_min_repeat: n-gram重复出现多少次视为页眉页脚
+            min_boilerplate_gap: 页眉页脚相邻两次出现的最小间隔（词数）
+        """
+        self.token_budget = token_budget
+        self.boilerplate_ngram = boilerplate_ngram
+        self.boilerplate_min_repeat = boilerplate_min_repeat
+        self.min_boilerplate_gap = min_boilerplate_gap
+
+    def pack(self, text):
+        """
+        打包论文文本。
+
+        Returns:
+            PackedPrompt: 打包后的文本及token统计
+        """
+        if not text:
+            return PackedPrompt("", 0, 0)
+
+        original_tokens = count_tokens(text)
+        sections = self.__split_sections(self.__remove_repeated_ngrams(text))
+
+        # 每个章节切分为句子并统计token
+        section_sentences = []
+        seen_sentences = set()
+        for name, content in sections:
+            sentences = []
+            for sentence in _SENTENCE_SPLIT_PATTERN.split(content):
+                sentence = sentence.strip()
+                key = sentence.lower()
+                if not sentence or key in seen_sentences:
+                    continue
+                # 字母占比过低的多为表格、公式、页码残留
+                if len(_ALPHA_PATTERN.findall(sentence)) < 0.5 * len(sentence):
+                    continue
+                seen_sentences.add(key)
+                sentences.append((sentence, count_tokens(sentence)))
+            section_sentences.append((name, sentences))
+
+        selected = self.__fill_budget(section_sentences)
+
+        blocks = []
+        for index, (name, sentences) in enumerate(section_sentences):
+            chosen = [sentences[i][0] for i in sorted(selected.get(index, []))]
+            if chosen:
+                blocks.append(" ".join(chosen))
+        packed_text = "\n\n".join(blocks)
+
+        packed = PackedPrompt(
+            text=packed_text,
+            original_tokens=original_tokens,
+            packed_tokens=count_tokens(packed_text),
+            sections=[name for name, _ in sections],
+        )
+        logger.debug(
+            f"提示词打包完成: {packed.original_tokens} -> {packed.packed_tokens} tokens，"
+            f"节省 {packed.tokens_saved} tokens，章节: {packed.sections}"
+        )
+        return packed
+
+    def __remove_repeated_ngrams(self, text):
+        """去除按页重复出现的长片段（页眉、页脚、版权声明），保留首次出现
+
+        页眉页脚每页出现一次，相邻两次出现之间相隔较远；正文中的常用搭配往往集中出现，
+        因此只有出现次数足够且间隔均匀拉开的n-gram才视为样板内容。
+        """
+        words = text.split()
+        n = self.boilerplate_ngram
+        if len(words) < n * self.boilerplate_min_repeat:
+            return text
+
+        positions = {}
+        for i in range(len(words) - n + 1):
+            positions.setdefault(tuple(words[i : i + n]), []).append(i)
+
+        drop = [False] * len(words)
+        for gram_positions in positions.values():
+            if len(gram_positions) < self.boilerplate_min_repeat:
+                continue
+            gaps = [b - a for a, b in zip(gram_positions, gram_positions[1:])]
+            if min(gaps) < self.min_boilerplate_gap:
+                continue
+            for start in gram_positions[1:]:
+                for j in range(start, start + n):
+                    drop[j] = True
+        return " ".join(w for w, d in zip(words, drop) if not d)
+
+    def __split_sections(self, text):
+        """按章节标题切分文本，每个章节只取首次出现的标题，丢弃样板章节"""
+        boundaries = []
+        found = set()
+        for match in _HEADING_PATTERN.finditer(text):
+            canonical = match.lastgroup.rsplit("_", 1)[0]
+            if canonical in found:
+                continue
+            found.add(canonical)
+            boundaries.append((match.start(), match.end(), canonical))
+
+        if not boundaries:
+            return [("body", text)]
+
+        sections = []
+        if boundaries[0][0] > 0:
+            sections.append(("front", text[: boundaries[0][0]]))
+        for i, (start, end, canonical) in enumerate(boundaries):
+            stop = boundaries[i + 1][0] if i + 1 < len(boundaries) else len(text)
+            if canonical not in _DROPPED_SECTIONS:
+                sections.append((canonical, text[end:stop]))
+        return sections
+
+    def __fill_budget(self, section_sentences):
+        """两轮分配预算：先按占比分配，再把剩余预算按优先级补充"""
+        priority = dict(_SECTION_PRIORITY)
+        order = [name for name, _ in _SECTION_PRIORITY]
+        indices = sorted(
+            range(len(section_sentences)),
+            key=lambda i: order.index(section_sentences[i][0])
+            if section_sentences[i][0] in priority
+            else len(order),
+        )
+
+        selected = {i: [] for i in indices}
+        cursor = {i: 0 for i in indices}
+        used = 0
+
+        def take(index, limit):
+            nonlocal used
+            spent = 0
+            sentences = section_sentences[index][1]
+            while cursor[index] < len(sentences):
+                tokens = sentences[cursor[index]][1]
+                if spent + tokens > limit or used + tokens > self.token_budget:
+                    break
+                selected[index].append(cursor[index])
+                cursor[index] += 1
+                spent += tokens
+                used += tokens
+
+        # 第一轮：按占比
+        for index in indices:
+            share = priority.get(section_sentences[index][0], 0.05)
+            take(index, int(self.token_budget * share))
+        # 第二轮：剩余预算按优先级补充
+        for index in indices:
+            take(index, self.token_budget - used)
+        return selected
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from utility_module import SingletonMeta
+from log_module import logger
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+"""默认交叉编码器（约90MB，CPU上单对推理约数毫秒）"""
+
+
+class CrossEncoderReranker(metaclass=SingletonMeta):
+    """
+    交叉编码器重排序（单例）。
+
+    对混合检索融合后的前N个候选，用交叉编码器对 (查询, 文本块) 逐对打分并重新排序。
+    - 候选数N自适应：按每对推理耗时的指数滑动平均估算，在延迟目标内尽可能多地重排
+    - 打分结果按 (查询, 文本) 缓存（LRU），重复查询无需再次推理
+    """
+
+    def __init__(
+        self,
+        model_name=DEFAULT_RERANK_MODEL,
+        latency_slo_ms=150.0,
+        min_candidates=5,
+        max_candidates=30,
+        batch_size=16,
+        cache_size=20000,
+    ):
+        """
+        初始化重排序器。单例模式确保此方法只执行一次，模型在首次重排时加载。
+
+        Args:
+            model_name: sentence-transformers交叉编码器模型名
+            latency_slo_ms: 单次重排的延迟目标（毫秒）
+            min_candidates: 候选数下限（即使超出延迟目标也至少重排这么多）
+            max_candidates: 候选数上限
+            batch_size: 批量推理大小
+            cache_size: 打分缓存的最大条目数
+        """
+        self.model_name = model_name
+        self.latency_slo_ms = latency_slo_ms
+        self.min_candidates = min_candidates
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: OrderedDict[str, float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._ms_per_pair: float | None = None  # 每对推理耗时的指数滑动平均
+        self._smoothing = 0.3
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def candidate_budget(self) -> int:
+        """根据延迟目标与历史耗时计算本次可重排的候选数"""
+        if not self._ms_per_pair:
+            return self.max_candidates
+        budget = int(self.latency_slo_ms / self._ms_per_pair)
+        return max(self.min_candidates, min(self.max_candidates, budget))
+
+    def rerank(self, query, hits):
+        """
+        重排检索结果。
+
+        Args:
+            query: 查询文本
+            hits: 已按融合得分排序的RetrievalHit列表
+
+        Returns:
+            list: 前N个候选按交叉编码器得分重排，其余保持原顺序排在后面；
+                  重排得分记录在hit.leg_scores["rerank"]
+        """
+        if not hits:
+            return hits
+        model = self.__get_model()
+        if model is None:
+            return hits
+
+        budget = self.candidate_budget()
+        candidates, rest = hits[:budget], hits[budget:]
+
+        keys = [self.__cache_key(query, self.__hit_text(hit)) for hit in candidates]
+        scores = {}
+        missing = []
+        with self._cache_lock:
+            for index, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[index] = self._cache[key]
+                    self.cache_hits += 1
+                else:
+                    missing.append(index)
+                    self.cache_misses += 1
+
+        if missing:
+            start = time.perf_counter()
+            pairs = [(query, self.__hit_text(candidates[i])) for i in missing]
+            predicted = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.__update_latency(elapsed_ms / len(missing))
+
+            with self._cache_lock:
+                for index, score in zip(missing, predicted):
+                    scores[index] = float(score)
+                    self._cache[keys[index]] = float(score)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        for index, hit in enumerate(candidates):
+            hit.leg_scores["rerank"] = scores[index]
+        candidates.sort(key=lambda hit: hit.leg_scores["rerank"], reverse=True)
+
+        logger.debug(
+            f"✔ 重排完成: {len(candidates)}个候选（新推理{len(missing)}对），"
+            f"每对耗时约{self._ms_per_pair or 0:.1f}ms，下次候选数{self.candidate_budget()}"
+        )
+        return candidates + rest
+
+    def metrics(self) -> dict:
+        total = self.cache_hits + self.cache_misses
+        return {
+            "ms_per_pair": self._ms_per_pair,
+            "candidate_budget": self.candidate_budget(),
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / total if total else 0.0,
+        }
+
+    def __get_model(self):
+        if self._model is not None:
+            return self._model
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+
+                    start = time.perf_counter()
+                    self._model = CrossEncoder(self.model_name, device="cpu", max_length=512)
+                    logger.debug(
+                        f"✔ 交叉编码器加载成功: {self.model_name}，耗时{time.perf_counter() - start:.2f}s"
+                    )
+                except Exception as e:
+                    logger.debug(f"✖ 交叉编码器加载失败，跳过重排: {e}")
+                    return None
+        return self._model
+
+    def __update_latency(self, ms_per_pair):
+        if self._ms_per_pair is None:
+            self._ms_per_pair = ms_per_pair
+        else:
+            self._ms_per_pair += self._smoothing * (ms_per_pair - self._ms_per_pair)
+
+    @staticmethod
+    def __hit_text(hit):
+        """用于打分的文本：最相似的文本块，无文本块时（仅BM25命中）使用标题与摘要"""
+        if hit.chunks:
+            return hit.chunks[0][0].page_content
+        return f"{hit.metadata.get('file_title', '')}. {hit.metadata.get('file_summary', '')}"
+
+    @staticmethod
+    def __cache_key(query, text):
+        return hashlib.sha1(f"{query.strip().lower()}\x00{text}".encode("utf-8")).hexdigest()
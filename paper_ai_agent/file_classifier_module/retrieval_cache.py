@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from utility_module import SingletonMeta, normalize_query
+from log_module import logger
+
+from .corpus_singleton import CorpusSingleton
+from .faiss_singleton import FAISSVectorStoreSingleton
+
+
+def current_index_version() -> tuple[int, int]:
+    """当前索引版本：(BM25语料库版本, FAISS向量库版本)，任一索引变更都会改变该值"""
+    return (CorpusSingleton.version, FAISSVectorStoreSingleton.version)
+
+
+class RetrievalCache(metaclass=SingletonMeta):
+    """
+    检索结果缓存（单例，LRU + TTL）。
+
+    以 (规范化查询, 检索参数, 索引版本) 为键缓存混合检索结果。
+    索引版本在语料库或向量库每次写入时递增，因此入库后旧结果自然失效，无需手动清理；
+    TTL用于兜底（如数据库中的论文字段被修改）。
+    缓存的结果对象在调用方之间共享，调用方不应修改。
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=600.0):
+        """
+        Args:
+            max_entries: 最大缓存条目数，超出时淘汰最久未使用的条目
+            ttl_seconds: 条目有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @staticmethod
+    def make_key(query: str, *params) -> tuple:
+        """生成缓存键，索引版本自动加入键中"""
+        return (normalize_query(query), *params, current_index_version())
+
+    def get(self, key: tuple):
+        """查询缓存，未命中或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            # 先清理旧版本索引的条目，再按LRU淘汰
+            version = key[-1]
+            stale = [k for k in self._entries if k[-1] != version]
+            for stale_key in stale:
+                del self._entries[stale_key]
+            if stale:
+                logger.debug(f"索引版本已变更，清理{len(stale)}条过期检索缓存")
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        """返回命中率及各计数"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "index_version": current_index_version(),
+        }
@@ -0,0 +1,199 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from log_module import logger
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+    logger.debug("警告: jieba未安装，中文分词效果将受影响")
+
+# region 停用词表（模块级只读集合，所有分词调用共享）
+EN_STOP_WORDS = frozenset(
+    {
+        # 冠词
+        "a", "an", "the",
+        # be动词
+        "is", "am", "are", "was", "were", "be", "been", "being",
+        # 助动词
+        "do", "does", "did", "will", "would", "shall", "should", "may", "might",
+        "can", "could", "must", "ought", "have", "has", "had",
+        # 代词
+        "i", "you", "he", "she", "it", "we", "they", "them", "their", "theirs",
+        "my", "mine", "your", "yours", "his", "her", "hers", "its", "our", "ours",
+        "this", "that", "these", "those", "who", "whom", "whose", "which", "what",
+        "myself", "yourself", "himself", "herself", "itself", "ourselves",
+        "themselves",
+        # 介词
+        "in", "on", "at", "by", "for", "with", "about", "against", "between",
+        "into", "through", "during", "before", "after", "above", "below", "to",
+        "from", "up", "down", "out", "off", "over", "under", "again", "further",
+        "then", "once", "of",
+        # 连词
+        "and", "but", "or", "nor", "so", "yet", "as", "if", "when", "where",
+        "while", "because", "although", "though", "since", "unless", "until",
+        # 其他常见词
+        "not", "no", "yes", "all", "any", "both", "each", "few", "more", "most",
+        "other", "some", "such", "only", "own", "same", "than", "too", "very",
+        "just", "now", "here", "there", "how", "why",
+    }
+)
+"""英文停用词表（包含连词、代词、介词、be动词等）"""
+
+ZH_STOP_WORDS = frozenset(
+    {
+        "的", "了", "在", "是", "我", "有", "和", "就", "不", "人", "都", "一", "一个", "上", "也",
+        "很", "到", "说", "要", "去", "你", "会", "着", "没有", "看", "好", "自己", "这", "那", "里",
+        "来", "他", "她", "它", "们", "为", "与", "及", "对", "把", "被", "从", "以", "向", "用",
+        "于", "将", "让", "给", "而", "则", "或", "且", "但", "却", "因", "所", "因为", "所以",
+        "如果", "虽然", "然而", "因此", "并且", "还是", "或者", "不是", "这个", "那个", "什么", "怎么",
+        "为什么", "哪里", "谁", "多少", "几", "些", "每", "比", "更", "最", "非常", "特别", "已", "已经",
+        "正在", "曾", "曾经",
+    }
+)
+"""中文停用词表"""
+
+_MIXED_STOP_WORDS = ZH_STOP_WORDS | EN_STOP_WORDS
+"""中文文档中常夹杂英文术语，同时过滤两种停用词"""
+# endregion
+
+# region 预编译正则
+_EN_TOKEN_PATTERN = re.compile(r"\b[a-zA-Z]+\b")
+"""英文单词（按单词边界分割，只保留字母）"""
+_CJK_CHAR_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+"""中文字符"""
+_PUNCT_ONLY_PATTERN = re.compile(r"^[\W_]+$")
+"""纯标点/符号词"""
+# endregion
+
+
+def detect_language(text, sample_size=2000):
+    """检测文本语言（中文/英文）
+
+    Args:
+        text: 待检测文本
+        sample_size: 采样大小
+
+    Returns:
+        'zh' 或 'en'
+    """
+    if not text:
+        return "en"  # 默认英文
+
+    # 采样前sample_size字符
+    sample = text[:sample_size]
+    chinese_chars = len(_CJK_CHAR_PATTERN.findall(sample))
+
+    # 如果中文字符占比>20%，认为是中文文档
+    return "zh" if chinese_chars / len(sample) > 0.2 else "en"
+
+
+@lru_cache(maxsize=1)
+def _get_stemmer():
+    """获取英文词干提取器（可选依赖snowballstemmer）"""
+    try:
+        import snowballstemmer
+
+        return snowballstemmer.stemmer("english")
+    except ImportError:
+        logger.debug("警告: snowballstemmer未安装，已禁用词干提取")
+        return None
+
+
+@lru_cache(maxsize=100000)
+def _stem(word):
+    """带缓存的词干提取（论文词汇重复度高，缓存命中率很高）"""
+    stemmer = _get_stemmer()
+    return stemmer.stemWord(word) if stemmer is not None else word
+
+
+def tokenize(text, language=None, use_stemmer=False):
+    """对文本进行分词（根据语言选择分词工具）
+
+    中文使用jieba分词，英文使用正则分词。
+    自动过滤停用词、单字符、纯数字、纯标点。
+
+    Args:
+        text: 待分词的文本
+        language: 'zh'/'en'，为None时自动检测
+        use_stemmer: 是否对英文词做词干提取（启用后需重建BM25语料库）
+
+    Returns:
+        list: 分词后的词语列表（已过滤停用词）
+    """
+    if not text:
+        return []
+
+    if language is None:
+        language = detect_language(text)
+
+    if language == "zh" and jieba is not None:
+        tokens = [
+            token
+            for token in (t.strip().lower() for t in jieba.lcut(text))
+            if len(token) > 1
+            and token not in _MIXED_STOP_WORDS
+            and not token.isdigit()
+            and not _PUNCT_ONLY_PATTERN.match(token)
+        ]
+    else:
+        # 正则只匹配字母，无需再过滤数字和标点
+        tokens = [
+            token
+            for token in _EN_TOKEN_PATTERN.findall(text.lower())
+            if len(token) > 1 and token not in EN_STOP_WORDS
+        ]
+
+    if use_stemmer:
+        tokens = [_stem(t) if t.isascii() else t for t in tokens]
+    return tokens
+
+
+def _tokenize_item(args):
+    """进程池工作函数（需为模块级函数以便pickle）"""
+    text, language, use_stemmer = args
+    return tokenize(text, language, use_stemmer)
+
+
+def tokenize_many(texts, languages=None, use_stemmer=False, max_workers=None):
+    """批量分词
+
+    Args:
+        texts: 文本列表
+        languages: 与texts等长的语言列表，为None时逐篇自动检测
+        use_stemmer: 是否做词干提取
+        max_workers: 进程数，None或1时在当前进程内顺序执行
+
+    Returns:
+        list[list[str]]: 与texts顺序一致的分词结果
+    """
+    if languages is None:
+        languages = [None] * len(texts)
+    items = [(text, lang, use_stemmer) for text, lang in zip(texts, languages)]
+
+    if not max_workers or max_workers <= 1 or len(items) <= 1:
+        return [_tokenize_item(item) for item in items]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunksize = max(1, len(items) // (max_workers * 4))
+        return list(executor.map(_tokenize_item, items, chunksize=chunksize))
+
+
+class Tokenizer:
+    """可复用的分词组件，保存分词配置（是否词干提取）"""
+
+    def __init__(self, use_stemmer=False):
+        """
+        Args:
+            use_stemmer: 是否对英文词做词干提取
+        """
+        self.use_stemmer = use_stemmer
+
+    def tokenize(self, text, language=None):
+        """对单篇文本分词，language为None时自动检测语言"""
+        return tokenize(text, language, self.use_stemmer)
+
+    def tokenize_many(self, texts, languages=None, max_workers=None):
+        """批量分词，可通过max_workers使用进程池"""
+        return tokenize_many(texts, languages, self.use_stemmer, max_workers)
@@ -4,7 +4,11 @@ import shutil
 from typing import Any
 from log_module import *
 
+from .embedding_registry import EmbeddingModelRegistry
+from .hybrid_retriever import HybridRetriever, HybridRetrievalResult
 from .pdf_split_and_embed import PDFRagWorker
+from .reranker import DEFAULT_RERANK_MODEL, CrossEncoderReranker
+from .retrieval_cache import RetrievalCache
 
 
 def move_files(source, target, success_filename_list):
@@ -93,53 +97,166 @@ def query_files_by_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]
     return query_files_by_attributes(attributes)
 
 
+_legacy_term_freq_migrated = False
+"""旧版term_freq.json是否已导入数据库"""
+
+
+def _migrate_legacy_term_freq_json() -> None:
+    """将旧版DB/BM25/term_freq.json中数据库尚未收录的词频统计导入term_stat表（每个进程只执行一次）"""
+    global _legacy_term_freq_migrated
+    if _legacy_term_freq_migrated:
+        return
+    _legacy_term_freq_migrated = True
+
+    from database_module import add_or_update_term_stats, query_term_stats
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    term_freq_path = os.path.join(project_root, "DB", "BM25", "term_freq.json")
+    if not os.path.exists(term_freq_path):
+        return
+    try:
+        with open(term_freq_path, "r", encoding="utf-8") as f:
+            legacy_term_freq: dict = json.load(f)
+        existing_ids = {
+            stats["file_id"] for stats in query_term_stats(list(legacy_term_freq))
+        }
+        missing = [
+            {"file_id": file_id, **stats}
+            for file_id, stats in legacy_term_freq.items()
+            if file_id not in existing_ids
+        ]
+        if missing and add_or_update_term_stats(missing):
+            logger.debug(f"✔ 已从term_freq.json导入{len(missing)}条词频统计")
+    except Exception as e:
+        logger.debug(f"✖ 导入旧版词频统计失败: {e}")
+
+
+def get_term_stats(file_ids: list[str] | None = None) -> list[dict[str, Any]]:
+    """
+    读取文档词频统计（供UI与回答生成器使用）
+
+    参数:
+        file_ids (list[str] | None): 文件ID列表，为None时返回全部
+    返回:
+        stats (list[dict[str, Any]]): 词频统计列表，包含file_id、file_name、top_terms、total_tokens、unique_tokens
+    """
+    from database_module import query_term_stats
+
+    _migrate_legacy_term_freq_json()
+    return query_term_stats(file_ids)
+
+
+def hybrid_retrieve(
+    query: str,
+    k: int = 5,
+    k_segments: int = 20,
+    k_articles: int = 10,
+    granularity: str | None = None,
+) -> HybridRetrievalResult:
+    """
+    混合检索统一接口：FAISS与BM25并发检索并融合为一个排序列表
+
+    参数:
+        query (str): 查询文本
+        k (int): 融合后返回的结果数量
+        k_segments (int): FAISS检索的文本块数量
+        k_articles (int): BM25检索的论文数量
+        granularity (str | None): 融合粒度"paper"/"chunk"，为None时读取配置
+    返回:
+        result (HybridRetrievalResult): 融合结果（含各路得分与耗时）
+    """
+    from global_module import file_classifier_config
+
+    fusion = file_classifier_config.get("retrieval_fusion", "rrf")
+    granularity = granularity or file_classifier_config.get("retrieval_granularity", "paper")
+    reranker = get_reranker()
+
+    cache = get_retrieval_cache()
+    cache_key = cache.make_key(
+        query, k, k_segments, k_articles, fusion, granularity, reranker is not None
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        logger.debug(f"✔ 检索缓存命中: '{query}'")
+        return cached
+
+    retriever = HybridRetriever(
+        PDFRagWorker(get_local_embedding_model()),
+        fusion=fusion,
+        granularity=granularity,
+        timeout=file_classifier_config.get("retrieval_timeout", None),
+        reranker=reranker,
+    )
+    result = retriever.retrieve(query, k, k_segments, k_articles)
+    # 有检索路超时被放弃时结果不完整，不写入缓存
+    if len(result.completed_legs) == 2:
+        cache.put(cache_key, result)
+    return result
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """获取检索结果缓存（容量与有效期读取配置）"""
+    from global_module import file_classifier_config
+
+    return RetrievalCache(
+        max_entries=int(file_classifier_config.get("retrieval_cache_size", 256)),
+        ttl_seconds=float(file_classifier_config.get("retrieval_cache_ttl", 600)),
+    )
+
+
+def get_retrieval_cache_metrics() -> dict[str, Any]:
+    """
+    获取检索缓存指标
+
+    返回:
+        metrics (dict[str, Any]): 条目数、命中/未命中次数、命中率、当前索引版本等
+    """
+    return get_retrieval_cache().metrics()
+
+
+def get_reranker() -> CrossEncoderReranker | None:
+    """按配置获取交叉编码器重排序器，未启用时返回None"""
+    from global_module import file_classifier_config
+
+    if not file_classifier_config.get("rerank_enabled", False):
+        return None
+    return CrossEncoderReranker(
+        model_name=file_classifier_config.get("rerank_model", DEFAULT_RERANK_MODEL),
+        latency_slo_ms=float(file_classifier_config.get("rerank_latency_slo_ms", 150)),
+        min_candidates=int(file_classifier_config.get("rerank_min_candidates", 5)),
+        max_candidates=int(file_classifier_config.get("rerank_max_candidates", 30)),
+    )
+
+
 def get_retrieval_content(query: str, k_segments: int = 20, k_articles: int = 5):
-    embedding_model = get_local_embedding_model()
-    worker = PDFRagWorker(embedding_model)
-    faiss_retrieval = worker.get_faiss_retrieval(query, k_segments)
-    bm25_retrieval = worker.get_bm25_retrieval(query, k_articles)
+    result = hybrid_retrieve(query, k_articles, k_segments, k_articles)
     retrieval = {
-        "most_similar_paragrapghs": faiss_retrieval,
-        "most_similar_paper": bm25_retrieval,
+        "most_similar_paragrapghs": result.leg_results["faiss"],
+        "most_similar_paper": result.leg_results["bm25"],
+        "hybrid": result.to_dict(),
     }
     return retrieval
 
 
 def get_local_embedding_model():
-    # 使用本地HuggingFace模型
-    logger.debug("获取本地Embedding模型")
-    try:
-        from langchain_community.embeddings import HuggingFaceEmbeddings
-        import os.path
-
-        # 根据检测到的语言选择模型
-
-        model_name = "sentence-transformers/all-MiniLM-L6-v2"  # 英文模型，约90MB
-        logger.debug(f"  选择模型: {model_name}")
-
-        # 检查模型是否已下载
-        cache_dir = os.path.expanduser("~/.cache/huggingface/hub")
-        model_dir_name = f"models--{model_name.replace('/', '--')}"
-        model_path = os.path.join(cache_dir, model_dir_name)
-
-        if os.path.exists(model_path):
-            logger.debug(f"  本地模型已缓存: {model_path}")
-        else:
-            logger.debug(f"  本地模型未找到，开始自动下载...")
-            logger.debug(f"  模型大小: { '~90MB'}")
-            logger.debug(f"  下载位置: {cache_dir}")
-
-        # 加载模型（如果不存在会自动下载）
-        embeddings_model = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={"device": "cpu"},  # 使用CPU，如有GPU可改为'cuda'
-            encode_kwargs={"normalize_embeddings": True},
-        )
-        logger.debug(f"本地模型加载成功: {model_name}")
-        return embeddings_model
+    """获取本地Embedding模型（进程内只加载一次，并发编码请求经EmbeddingService合并为微批次）"""
+    from global_module import file_classifier_config
 
-    except Exception as e:
-        logger.debug(f"本地模型加载失败: {e}")
-        logger.debug("首次使用需要下载模型，请确保网络连接")
-        logger.debug("或安装: pip install sentence-transformers")
-        return None
+    return EmbeddingModelRegistry().get_service(
+        file_classifier_config.get("embedding_model", None),
+        file_classifier_config.get("embedding_device", "cpu"),
+        file_classifier_config.get("embedding_backend", "torch"),
+        file_classifier_config.get("embedding_onnx_threads", None),
+        max_batch_size=int(file_classifier_config.get("embedding_batch_size", 64)),
+        max_wait_ms=float(file_classifier_config.get("embedding_max_wait_ms", 5)),
+    )
+
+
+def get_embedding_metrics() -> dict[str, dict]:
+    """
+    获取已加载embedding模型的指标
+
+    返回:
+        metrics (dict[str, dict]): 模型键 -> 加载耗时、内存增量、获取次数等
+    """
+    return EmbeddingModelRegistry().metrics()
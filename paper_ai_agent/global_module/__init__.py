@@ -18,6 +18,7 @@ __all__ = [
     "crawler_config",
     "answer_generator_config",
     "file_classifier_config",
+    "llm_client_config",
 ]
 load_dotenv(encoding="utf-8", verbose=True)  # 从.env文件加载环境变量
 # region 项目静态信息
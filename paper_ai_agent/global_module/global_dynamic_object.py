@@ -326,3 +326,7 @@ file_classifier_config: GlobalDynamicObject._Node = _load_config_or_raise_error(
     "file_classifier_config", "文件分类器配置未找到或未正确加载。"
 )
 """全局文件分类器配置对象"""
+llm_client_config: GlobalDynamicObject._Node = _load_config_or_raise_error(
+    "llm_client_config", "LLM客户端配置未找到或未正确加载。"
+)
+"""全局LLM客户端配置对象"""
@@ -36,9 +36,37 @@ def create_app(
     _app.config.from_object(_config)
     _app.logger.addHandler(logger.handlers[0])
     _app.logger.propagate = False  # 避免重复日志输出
+
+    @_app.teardown_appcontext
+    def _remove_database_session(_exception=None) -> None:
+        """请求结束时释放当前线程的数据库会话（归还连接并结束读事务）"""
+        from database_module import session
+
+        session.remove()
+
     return _app
 
 
+def warm_up_models() -> None:
+    """后台预加载embedding模型，避免首个检索请求承担模型加载耗时"""
+    from global_module import file_classifier_config
+
+    if not file_classifier_config.get("embedding_warmup", True):
+        return
+    try:
+        from file_classifier_module.embedding_registry import EmbeddingModelRegistry
+
+        EmbeddingModelRegistry().warm_up(
+            [file_classifier_config.get("embedding_model", None)],
+            device=file_classifier_config.get("embedding_device", "cpu"),
+            backend=file_classifier_config.get("embedding_backend", "torch"),
+            onnx_threads=file_classifier_config.get("embedding_onnx_threads", None),
+        )
+        logger.debug("✔ 已启动embedding模型后台预热")
+    except Exception as e:
+        logger.debug(f"✖ 启动embedding模型预热失败: {e}")
+
+
 def run() -> None:
     """程序运行函数"""
     logger.debug("主程序启动程序...")
@@ -48,6 +76,7 @@ def run() -> None:
 
     global launcher_app
     register_blueprints(launcher_app)
+    warm_up_models()
     launcher_app.run(
         debug=True, host=HOST, port=PORT, load_dotenv=True, use_reloader=False
     )
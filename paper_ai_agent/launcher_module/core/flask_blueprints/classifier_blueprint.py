@@ -6,6 +6,11 @@ from jinja2 import TemplateNotFound
 from pathlib import Path
 from log_module import *  # 导入全局日志模块
 from file_classifier_module import start_file_classify_task
+from file_classifier_module.utils import (
+    get_embedding_metrics,
+    get_retrieval_cache_metrics,
+    get_term_stats,
+)
 import sys
 
 classifier_bp = Blueprint(
@@ -32,3 +37,42 @@ def classifier_bp_start_file_classify_task() -> Any:
     except Exception as e:
         abort(500, description="✖ 启动文件分类任务失败")
         raise e
+
+
+@classifier_bp.route("/get_term_stats", methods=["GET"])
+def classifier_bp_get_term_stats() -> Any:
+    """获取文档词频统计，可通过file_id参数指定文档（可重复传入）"""
+    logger.debug(f"{sys._getframe().f_code.co_name}接口收到获取词频统计请求...")
+    try:
+        file_ids: list[str] = request.args.getlist("file_id")
+        term_stats = get_term_stats(file_ids or None)
+        response_data = {"status": "success", "term_stats": term_stats}
+        logger.debug(f"✔ 获取词频统计成功，共{len(term_stats)}条记录")
+        return jsonify(response_data)
+    except Exception as e:
+        logger.debug(f"✖ 获取词频统计失败: {e}")
+        abort(500, description="✖ 获取词频统计失败")
+
+
+@classifier_bp.route("/get_embedding_metrics", methods=["GET"])
+def classifier_bp_get_embedding_metrics() -> Any:
+    """获取embedding模型的加载耗时、内存占用等指标"""
+    logger.debug(f"{sys._getframe().f_code.co_name}接口收到获取embedding模型指标请求...")
+    try:
+        response_data = {"status": "success", "metrics": get_embedding_metrics()}
+        return jsonify(response_data)
+    except Exception as e:
+        logger.debug(f"✖ 获取embedding模型指标失败: {e}")
+        abort(500, description="✖ 获取embedding模型指标失败")
+
+
+@classifier_bp.route("/get_retrieval_cache_metrics", methods=["GET"])
+def classifier_bp_get_retrieval_cache_metrics() -> Any:
+    """获取检索缓存的命中率等指标"""
+    logger.debug(f"{sys._getframe().f_code.co_name}接口收到获取检索缓存指标请求...")
+    try:
+        response_data = {"status": "success", "metrics": get_retrieval_cache_metrics()}
+        return jsonify(response_data)
+    except Exception as e:
+        logger.debug(f"✖ 获取检索缓存指标失败: {e}")
+        abort(500, description="✖ 获取检索缓存指标失败")
@@ -1,15 +1,61 @@
 from email import generator
+import asyncio
 import json
 import sys
 from typing import Any
-from flask import Blueprint, jsonify, render_template, abort, Response, request
+from flask import Blueprint, jsonify, render_template, abort, Response, request, stream_with_context, g
 from jinja2 import TemplateNotFound
 from log_module import *  # 导入全局日志模块
 from answer_generator_module import generator
+from answer_generator_module.session import SessionManager
 
 generator_bp: Blueprint = Blueprint("generator_blueprint", __name__)
 """回答生成器蓝图模块"""
 
+SESSION_COOKIE_NAME: str = "paper_ai_agent_session"
+"""未在请求体或请求头中提供会话ID的客户端通过该Cookie保持会话"""
+
+
+def _get_session_id(request_data: dict[str, Any] | None) -> str:
+    """
+    依次从请求体的session_id字段、X-Session-Id请求头与会话Cookie获取会话ID；
+    均未提供时为该客户端分配新的会话ID（随响应通过Cookie与X-Session-Id响应头返回），不与其他客户端共享会话
+    """
+    if request_data and request_data.get("session_id"):
+        return str(request_data["session_id"])
+    session_id = request.headers.get("X-Session-Id") or request.cookies.get(SESSION_COOKIE_NAME)
+    if session_id:
+        return session_id
+    if "issued_session_id" not in g:
+        g.issued_session_id = SessionManager.new_session_id()
+        logger.debug(f"为新客户端分配会话: {g.issued_session_id}")
+    return g.issued_session_id
+
+
+@generator_bp.after_request
+def _return_issued_session_id(response: Response) -> Response:
+    """把本次请求新分配的会话ID返回给客户端，后续请求携带Cookie或X-Session-Id即可继续该会话"""
+    issued_session_id = g.get("issued_session_id")
+    if issued_session_id:
+        response.headers["X-Session-Id"] = issued_session_id
+        response.set_cookie(SESSION_COOKIE_NAME, issued_session_id, httponly=True, samesite="Lax")
+    return response
+
+
+def _iterate_async(async_gen):
+    """在当前请求线程中用独立事件循环逐个取出异步生成器的元素（Flask视图为同步函数）"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_gen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        # 客户端断开时同样会执行，确保关闭上游流式连接
+        loop.run_until_complete(async_gen.aclose())
+        loop.close()
+
 
 @generator_bp.route("/set_demand", methods=("POST",))
 def set_demand() -> Any:
@@ -21,7 +67,7 @@ def set_demand() -> Any:
         demand = request_data.get("demand", "")
         logger.debug(f"Received demand: {demand}")
         # 这里可以添加代码将需求传递给回答生成器模块
-        if generator.set_demand(demand):
+        if generator.set_demand(demand, _get_session_id(request_data)):
             response_data = {"status": "success", "message": "Demand set successfully"}
         else:
             response_data = {"status": "failure", "message": "Failed to set demand"}
@@ -41,9 +87,97 @@ def get_LLM_reply() -> Response:
         question = request_data.get("question", "")
         logger.debug(f"Received question: {question}")
         # 这里可以添加代码将问题传递给回答生成器模块并获取回复
-        reply = generator.get_LLM_reply()
+        reply = generator.get_LLM_reply(_get_session_id(request_data))
         response_data = {"status": "success", "message": reply}
         return jsonify(response_data)
     except Exception as e:
         logger.debug(f"✖ 获取LLM回复失败: {e}")
         abort(500, description="✖ 获取LLM回复失败")
+
+
+@generator_bp.route("/get_answer_cache_metrics", methods=("GET",))
+def get_answer_cache_metrics() -> Response:
+    """获取语义问答缓存的命中率等指标"""
+    try:
+        return jsonify({"status": "success", "metrics": generator.get_answer_cache_metrics()})
+    except Exception as e:
+        logger.debug(f"✖ 获取问答缓存指标失败: {e}")
+        abort(500, description="✖ 获取问答缓存指标失败")
+
+
+@generator_bp.route("/get_llm_metrics", methods=("GET",))
+def get_llm_metrics() -> Response:
+    """获取各模型LLM调用的延迟与token用量"""
+    try:
+        return jsonify({"status": "success", "metrics": generator.get_llm_metrics()})
+    except Exception as e:
+        logger.debug(f"✖ 获取LLM调用指标失败: {e}")
+        abort(500, description="✖ 获取LLM调用指标失败")
+
+
+@generator_bp.route("/stream_LLM_reply", methods=("POST",))
+def stream_LLM_reply() -> Response:
+    """
+    以Server-Sent Events流式返回LLM回复：
+    问答的每个增量为一条data事件；文件查询的文档列表为一条result事件；出错时发送error事件；正常结束时发送done事件
+    """
+    request_data: dict[str, Any] = request.get_json(silent=True) or {}
+    logger.debug(f"{sys._getframe().f_code.co_name}接口请求数据：{ request_data }")
+    session_id = _get_session_id(request_data)
+
+    def event_stream():
+        try:
+            for item in _iterate_async(generator.stream_LLM_reply(session_id)):
+                if isinstance(item, dict):
+                    yield f"event: result\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+                else:
+                    yield f"data: {json.dumps({'delta': item}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.debug(f"✖ 流式获取LLM回复失败: {e}")
+            yield f"event: error\ndata: {json.dumps({'message': str(e)}, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@generator_bp.route("/stop_current_task", methods=("POST",))
+def stop_current_task() -> Response:
+    """停止当前会话的流式输出"""
+    try:
+        request_data: dict[str, Any] = request.get_json(silent=True) or {}
+        logger.debug(f"{sys._getframe().f_code.co_name}接口请求数据：{ request_data }")
+        generator.stop_current_task(_get_session_id(request_data))
+        return jsonify({"status": "success", "message": "Task stopped"})
+    except Exception as e:
+        logger.debug(f"✖ 停止任务失败: {e}")
+        abort(500, description="✖ 停止任务失败")
+
+
+@generator_bp.route("/get_conversation", methods=("POST",))
+def get_conversation() -> Response:
+    """获取当前会话的对话历史"""
+    try:
+        request_data: dict[str, Any] = request.get_json(silent=True) or {}
+        logger.debug(f"{sys._getframe().f_code.co_name}接口请求数据：{ request_data }")
+        conversation = generator.get_conversation(_get_session_id(request_data))
+        return jsonify({"status": "success", "conversation": conversation})
+    except Exception as e:
+        logger.debug(f"✖ 获取对话历史失败: {e}")
+        abort(500, description="✖ 获取对话历史失败")
+
+
+@generator_bp.route("/reset_conversation", methods=("POST",))
+def reset_conversation() -> Response:
+    """清空当前会话的对话历史"""
+    try:
+        request_data: dict[str, Any] = request.get_json(silent=True) or {}
+        logger.debug(f"{sys._getframe().f_code.co_name}接口请求数据：{ request_data }")
+        generator.reset_conversation(_get_session_id(request_data))
+        return jsonify({"status": "success", "message": "Conversation reset"})
+    except Exception as e:
+        logger.debug(f"✖ 清空对话历史失败: {e}")
+        abort(500, description="✖ 清空对话历史失败")
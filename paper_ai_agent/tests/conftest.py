@@ -0,0 +1,15 @@
+"""测试环境：把项目根目录加入导入路径，数据库指向临时文件（不读写DB/app_database.db）"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+if not os.environ.get("DATABASE_PATH"):
+    _database_file = Path(tempfile.mkdtemp(prefix="paper_ai_agent_test_")) / "test.db"
+    _database_file.touch()
+    os.environ["DATABASE_PATH"] = str(_database_file)
@@ -0,0 +1,384 @@
+"""
+/generator/stream_LLM_reply 流式接口测试。
+
+通过蓝图驱动真实的Generator.stream_LLM_reply与LLMClientFactory.stream：
+- stub后端：本地确定性桩模型
+- openai后端：OpenAIBackend（AsyncOpenAI, stream=True）指向本地模拟的OpenAI兼容SSE服务
+检查data/result/error/done事件、停止与客户端断开时关闭上游，以及并发槽位的释放；
+另检查未提供会话ID的客户端各自获得独立会话。
+"""
+
+import importlib.util
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from conftest import PROJECT_ROOT
+from global_module import answer_generator_config, llm_client_config
+
+# 必须在导入回答生成器之前设置：Generator与LLMClientFactory均为单例，首次创建时读取配置
+llm_client_config.backend = "stub"
+llm_client_config.stub = {"latency_ms": 0, "tokens_per_second": 200, "reply_tokens": 12}
+llm_client_config.rate_limits = {}
+llm_client_config.max_concurrency = 2
+answer_generator_config.answer_cache_enabled = False
+
+from answer_generator_module import semantic_service  # noqa: E402
+from answer_generator_module.data_models import DemandType, QueryResult  # noqa: E402
+
+
+def _load_blueprint_module():
+    """只加载generator蓝图（不经过flask_blueprints包，避免导入其他蓝图的依赖）"""
+    path = PROJECT_ROOT / "launcher_module" / "core" / "flask_blueprints" / "generator_blueprint.py"
+    spec = importlib.util.spec_from_file_location("_generator_blueprint_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _parse_events(body):
+    """把SSE响应体解析为 [(事件名, 数据)]，未指定事件名的为"message" """
+    events = []
+    for block in body.split("\n\n"):
+        if not block.strip():
+            continue
+        name, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event:"):
+                name = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:") :].strip())
+        events.append((name, data))
+    return events
+
+
+def _decode(chunk):
+    return chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class _MockOpenAIServer:
+    """本地OpenAI兼容服务：/chat/completions以SSE逐个返回chunk，记录请求数与客户端提前断开"""
+
+    def __init__(self, chunks=40, interval=0.02):
+        self.chunks = chunks
+        self.interval = interval
+        self.requests = 0
+        self.completed = 0
+        self.disconnected = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for index in range(server.chunks):
+                        chunk = {
+                            "id": "chatcmpl-test",
+                            "object": "chat.completion.chunk",
+                            "created": 0,
+                            "model": body["model"],
+                            "choices": [
+                                {"index": 0, "delta": {"content": f"tok{index} "}, "finish_reason": None}
+                            ],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        time.sleep(server.interval)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                    server.completed += 1
+                except (BrokenPipeError, ConnectionResetError):
+                    server.disconnected += 1
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _StreamRouteTestBase:
+    """两种后端共用的用例；子类在setUp中选择后端"""
+
+    backend = None
+
+    @classmethod
+    def setUpClass(cls):
+        blueprint_module = _load_blueprint_module()
+        from flask import Flask
+
+        app = Flask(__name__)
+        app.register_blueprint(blueprint_module.generator_bp, url_prefix="/generator")
+        cls.app = app
+        cls.generator = blueprint_module.generator
+        cls.factory = cls.generator._llm
+
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(self.factory, "backend", self.backend),
+            # 每个用例使用独立的并发槽位，槽位泄漏只会让当前用例失败，不会阻塞后续用例
+            mock.patch.object(
+                self.factory, "_semaphore", threading.BoundedSemaphore(self.factory.max_concurrency)
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.client = self.app.test_client()
+        self.session_id = f"{self.backend}-{self.id()}"
+
+    def tearDown(self):
+        self.generator.end_session(self.session_id)
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    # ---------- 辅助 ----------
+
+    def set_demand(self, demand_type=DemandType.QA):
+        """直接写入会话的需求与检索结果（跳过检索，只测试回复流程）"""
+        session = self.generator._sessions.get(self.session_id)
+        with session.lock:
+            session.demand_raw = "What is multi-head attention?"
+            session.demand_type = demand_type
+            session.turn_pending = True
+            session.query_results = [
+                QueryResult(
+                    doc_id="paper-1",
+                    title="Attention Is All You Need",
+                    relevance=100.0,
+                    summary="The Transformer architecture.",
+                    high_freq_terms={"attention": 12},
+                    passages=[
+                        {
+                            "text": "Multi-head attention runs several attention layers in parallel.",
+                            "similarity": 0.9,
+                            "chunk_index": 3,
+                        }
+                    ],
+                )
+            ]
+        return session
+
+    def post_stream(self, buffered=True):
+        return self.client.post(
+            "/generator/stream_LLM_reply", json={"session_id": self.session_id}, buffered=buffered
+        )
+
+    def metrics_calls(self):
+        stats = self.factory.metrics().get(answer_generator_config.model, {})
+        return stats.get("calls", 0)
+
+    def assertSlotsReleased(self):
+        self.assertTrue(
+            _wait_until(lambda: self.factory._semaphore._value == self.factory.max_concurrency),
+            "LLM concurrency slot was not released",
+        )
+
+    # ---------- 用例 ----------
+
+    def test_streams_deltas_then_done_and_records_turn(self):
+        session = self.set_demand()
+
+        response = self.post_stream()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith("text/event-stream"))
+        events = _parse_events(response.get_data(as_text=True))
+        deltas = [data["delta"] for name, data in events if name == "message"]
+        self.assertGreater(len(deltas), 1)
+        self.assertEqual(events[-1], ("done", {}))
+        self.assertEqual(len(session.conversation.turns), 1)
+        self.assertEqual(session.conversation.turns[0].answer, "".join(deltas).strip())
+        self.assertEqual(session.conversation.turns[0].chunk_ids, ["paper-1#3"])
+        self.assertSlotsReleased()
+
+    def test_file_query_is_sent_as_result_event(self):
+        self.set_demand(DemandType.FILE_QUERY)
+
+        events = _parse_events(self.post_stream().get_data(as_text=True))
+
+        self.assertEqual([name for name, _ in events], ["result", "done"])
+        self.assertEqual(events[0][1]["type"], "file_query")
+        self.assertEqual(events[0][1]["results"][0]["doc_id"], "paper-1")
+
+    def test_missing_demand_is_an_error_event(self):
+        events = _parse_events(self.post_stream().get_data(as_text=True))
+
+        self.assertEqual(events, [("error", {"message": "no demand set"})])
+
+    def test_stop_current_task_ends_stream_and_releases_slot(self):
+        session = self.set_demand()
+        calls_before = self.metrics_calls()
+        response = self.post_stream(buffered=False)
+        chunks = iter(response.response)
+        self.assertEqual(_parse_events(_decode(next(chunks)))[0][0], "message")
+
+        stop = self.client.post("/generator/stop_current_task", json={"session_id": self.session_id})
+        self.assertEqual(stop.get_json()["status"], "success")
+        rest = "".join(_decode(chunk) for chunk in chunks)
+        response.close()
+
+        self.assertEqual(_parse_events(rest)[-1], ("done", {}))
+        self.assertLessEqual(len(_parse_events(rest)), 2)  # 停止前可能已有一个增量在途
+        self.assertEqual(session.conversation.turns, [])  # 被停止的回复不计入对话历史
+        self.assertEqual(self.metrics_calls(), calls_before + 1)
+        self.assertSlotsReleased()
+
+    def test_demand_replaced_during_stream_is_not_recorded_as_its_turn(self):
+        session = self.set_demand()
+        response = self.post_stream(buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+
+        # 回复进行中另一个请求替换了需求：已开始的回复使用旧快照，且不能记为新需求的回答
+        with session.lock:
+            session.demand_id += 1
+            session.demand_raw = "What optimizer is used?"
+            session.turn_pending = True
+        rest = "".join(_decode(chunk) for chunk in chunks)
+        response.close()
+
+        self.assertEqual(_parse_events(rest)[-1], ("done", {}))
+        self.assertEqual(session.conversation.turns, [])
+        self.assertTrue(session.turn_pending)
+        self.assertSlotsReleased()
+
+    def test_client_disconnect_closes_stream_and_releases_slot(self):
+        self.set_demand()
+        calls_before = self.metrics_calls()
+        response = self.post_stream(buffered=False)
+        next(iter(response.response))
+
+        response.close()
+
+        self.assertEqual(self.metrics_calls(), calls_before + 1)
+        self.assertSlotsReleased()
+
+
+class StubBackendStreamTest(_StreamRouteTestBase, unittest.TestCase):
+    backend = "stub"
+
+
+class OpenAIBackendStreamTest(_StreamRouteTestBase, unittest.TestCase):
+    backend = "openai"
+
+    def setUp(self):
+        super().setUp()
+        self.server = _MockOpenAIServer()
+        patches = [
+            mock.patch.object(semantic_service, "API_KEY", "test-key"),
+            mock.patch.object(answer_generator_config, "base_url", self.server.base_url),
+        ]
+        for patch in patches:
+            patch.start()
+        self.patches.extend(patches)
+
+    def tearDown(self):
+        super().tearDown()
+        self.server.close()
+
+    def test_streams_deltas_then_done_and_records_turn(self):
+        super().test_streams_deltas_then_done_and_records_turn()
+        self.assertEqual(self.server.completed, 1)
+
+    def test_stop_current_task_ends_stream_and_releases_slot(self):
+        super().test_stop_current_task_ends_stream_and_releases_slot()
+        # 停止后上游连接被关闭，模拟服务端写入失败
+        self.assertTrue(_wait_until(lambda: self.server.disconnected == 1))
+        self.assertEqual(self.server.completed, 0)
+
+    def test_client_disconnect_closes_stream_and_releases_slot(self):
+        super().test_client_disconnect_closes_stream_and_releases_slot()
+        self.assertTrue(_wait_until(lambda: self.server.disconnected == 1))
+
+    def test_missing_api_key_is_an_error_event(self):
+        self.set_demand()
+
+        with mock.patch.object(semantic_service, "API_KEY", ""):
+            events = _parse_events(self.post_stream().get_data(as_text=True))
+
+        self.assertEqual(events, [("error", {"message": "QA without api key"})])
+        self.assertEqual(self.server.requests, 0)
+
+
+class SessionIdTest(unittest.TestCase):
+    """未提供会话ID时每个客户端分配独立的会话，并通过Cookie保持"""
+
+    @classmethod
+    def setUpClass(cls):
+        blueprint_module = _load_blueprint_module()
+        from flask import Flask
+
+        app = Flask(__name__)
+        app.register_blueprint(blueprint_module.generator_bp, url_prefix="/generator")
+        cls.app = app
+        cls.cookie_name = blueprint_module.SESSION_COOKIE_NAME
+        cls.generator = blueprint_module.generator
+
+    def issue(self, client, **kwargs):
+        response = client.post("/generator/get_conversation", **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_clients_without_session_id_get_separate_sessions(self):
+        first, second = self.app.test_client(), self.app.test_client()
+
+        first_id = self.issue(first, json={}).headers.get("X-Session-Id")
+        second_id = self.issue(second, json={}).headers.get("X-Session-Id")
+        self.addCleanup(self.generator.end_session, first_id)
+        self.addCleanup(self.generator.end_session, second_id)
+
+        self.assertTrue(first_id)
+        self.assertTrue(second_id)
+        self.assertNotEqual(first_id, second_id)
+        self.assertEqual(first.get_cookie(self.cookie_name).value, first_id)
+
+        # 后续请求携带Cookie继续同一会话，不再分配新ID
+        again = self.issue(first, json={})
+        self.assertNotIn("X-Session-Id", again.headers)
+
+        # 停止当前任务只作用于本客户端的会话
+        first.post("/generator/stop_current_task", json={})
+        self.assertTrue(self.generator._sessions.get(first_id).stopped)
+        self.assertFalse(self.generator._sessions.get(second_id).stopped)
+
+    def test_explicit_session_id_is_used_without_issuing_cookie(self):
+        client = self.app.test_client()
+        self.addCleanup(self.generator.end_session, "explicit-session")
+
+        by_body = self.issue(client, json={"session_id": "explicit-session"})
+        by_header = self.issue(client, json={}, headers={"X-Session-Id": "explicit-session"})
+
+        for response in (by_body, by_header):
+            self.assertNotIn("X-Session-Id", response.headers)
+            self.assertNotIn("Set-Cookie", response.headers)
+        self.assertIsNone(client.get_cookie(self.cookie_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""本地意图分类器测试（未训练时的初始权重）"""
+
+import importlib.util
+import sys
+import unittest
+import uuid
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def _load_intent_module():
+    """直接加载分类器模块（不经过answer_generator_module包，避免初始化回答生成器）"""
+    path = PROJECT_ROOT / "answer_generator_module" / "intent_classifier.py"
+    spec = importlib.util.spec_from_file_location("_intent_classifier_under_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class UntrainedIntentClassifierTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.module = _load_intent_module()
+        # 使用不存在的日志文件，保证分类器只有初始权重
+        cls.classifier = cls.module.IntentClassifier(
+            confidence_threshold=0.8, log_filename=f"test-{uuid.uuid4().hex}.jsonl"
+        )
+
+    def assertNotConfidentFile(self, query):
+        label, confidence = self.classifier.predict(query)
+        self.assertFalse(
+            label == self.module.FILE_LABEL and confidence >= self.classifier.confidence_threshold,
+            f"{query!r} classified FILE locally with confidence {confidence:.2f}",
+        )
+
+    def test_questions_about_a_paper_are_not_decided_as_file_queries(self):
+        for query in (
+            "What does the paper propose",
+            "Does the paper use dropout",
+            "In the paper, what dataset is used for evaluation",
+            "Summarize the main contribution of this paper",
+            "Which papers report results on ImageNet?",
+        ):
+            with self.subTest(query=query):
+                self.assertNotConfidentFile(query)
+
+    def test_single_keyword_hit_falls_back_to_llm(self):
+        fallback_calls = []
+
+        def fallback(query):
+            fallback_calls.append(query)
+            return self.module.QA_LABEL
+
+        label = self.classifier.classify(
+            "Show the attention equation of the paper", fallback=fallback, record_fallback=False
+        )
+
+        self.assertEqual(fallback_calls, ["Show the attention equation of the paper"])
+        self.assertEqual(label, self.module.QA_LABEL)
+
+    def test_several_file_keywords_are_decided_locally(self):
+        label, confidence = self.classifier.predict("list pdf files about transformers")
+
+        self.assertEqual(label, self.module.FILE_LABEL)
+        self.assertGreaterEqual(confidence, self.classifier.confidence_threshold)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
 """实用工具模块"""
 
 from .singleton_meta import SingletonMeta  # 顶级导入
+from .llm_client import LLMClientFactory, get_llm_client_factory
+from .text_utils import WORD_PATTERN, normalize_query
 
 __all__ = [
     "SingletonMeta",
+    "LLMClientFactory",
+    "get_llm_client_factory",
+    "WORD_PATTERN",
+    "normalize_query",
 ]
@@ -0,0 +1,231 @@
+"""LLM推理后端模块"""
+
+import abc
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+LLM_BACKENDS = ("openai", "stub", "llamacpp")
+"""推理后端：OpenAI兼容HTTP接口、本地确定性桩模型、llama.cpp本地模型"""
+
+
+def _to_chat_completion(payload: Dict[str, Any]):
+    """把OpenAI格式的字典转换为ChatCompletion对象，与HTTP后端的返回类型一致"""
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate(payload)
+
+
+class LLMBackend(abc.ABC):
+    """LLM推理后端接口：同步补全与异步流式补全，消息与参数均为OpenAI chat.completions格式"""
+
+    requires_api_key: bool = True
+    """是否需要API key才能调用"""
+
+    @abc.abstractmethod
+    def chat(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        """返回ChatCompletion"""
+
+    @abc.abstractmethod
+    def stream(self, model: str, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """异步逐个返回文本增量"""
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI兼容HTTP接口（DeepSeek等），同步调用共享连接池"""
+
+    def __init__(self, factory, api_key: str, base_url: Optional[str]):
+        self.factory = factory
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def chat(self, model, messages, **kwargs):
+        client = self.factory.get_client(self.api_key, self.base_url)
+        return client.chat.completions.create(model=model, messages=messages, **kwargs)
+
+    async def stream(self, model, messages, **kwargs):
+        # 异步客户端的连接绑定在当前事件循环上，每次流式调用单独创建
+        async with self.factory.create_async_client(self.api_key, self.base_url) as client:
+            response = await client.chat.completions.create(
+                model=model, messages=messages, stream=True, **kwargs
+            )
+            try:
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await response.close()
+
+
+class StubBackend(LLMBackend):
+    """
+    本地确定性桩模型（压测用）。
+
+    不访问网络，回复只由输入消息决定；耗时 = 固定延迟 + 输出token数 / 生成速率，
+    用于在隔离环境中压测 /generator 与论文分析流程。
+    - 意图分类提示词：按关键字回答 FILE 或 QA
+    - 论文分析提示词（要求返回JSON）：返回结构完整的标题、摘要与关键词
+    - 其他：返回由输入哈希生成的固定长度文本，引用上下文中的第一个论文id
+    """
+
+    requires_api_key = False
+    _WORDS = (
+        "retrieval", "augmented", "generation", "model", "attention", "context", "document",
+        "embedding", "index", "answer", "token", "layer", "training", "latency", "paper",
+    )
+
+    def __init__(self, latency_ms: float = 50.0, tokens_per_second: float = 50.0, reply_tokens: int = 64):
+        """
+        Args:
+            latency_ms: 首个token前的固定延迟（毫秒）
+            tokens_per_second: 生成速率
+            reply_tokens: 普通回复的token数（不超过max_tokens）
+        """
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+
+    def chat(self, model, messages, **kwargs):
+        tokens = self.__reply_tokens(messages, kwargs.get("max_tokens"))
+        time.sleep(self.latency_ms / 1000 + len(tokens) / self.tokens_per_second)
+        return self.__completion(model, messages, "".join(tokens))
+
+    async def stream(self, model, messages, **kwargs):
+        tokens = self.__reply_tokens(messages, kwargs.get("max_tokens"))
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in tokens:
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+    def __reply_tokens(self, messages, max_tokens) -> List[str]:
+        """生成回复并切分为token（单词及其前导空格）"""
+        text = self.__reply_text(messages, max_tokens or self.reply_tokens)
+        return re.findall(r"\s*\S+", text)
+
+    def __reply_text(self, messages, max_tokens: int) -> str:
+        system = " ".join(m["content"] for m in messages if m.get("role") == "system")
+        prompt = messages[-1]["content"] if messages else ""
+
+        if "intent classifier" in system:
+            # 只看用户查询本身，提示词的其余部分（如"Your answer (FILE or QA):"）不参与判断
+            match = re.search(r"User query:\n(.*?)\n\nYour answer", prompt, re.DOTALL)
+            query = (match.group(1) if match else prompt).lower()
+            file_words = ("file", "document", "list", "show", "open", "report", "pdf", "find", "search")
+            return "FILE" if any(word in query for word in file_words) else "QA"
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        words = [self._WORDS[b % len(self._WORDS)] for b in digest]
+
+        if '"keywords"' in prompt:
+            paper_ids = re.findall(r"^\s*\[([^\]\n]+)\]\s*$", prompt, re.MULTILINE)
+            item = lambda paper_id: {
+                **({"id": paper_id} if paper_id else {}),
+                "title": " ".join(words[:6]).title(),
+                "summary": " ".join(words * 2) + ".",
+                "keywords": words[:5],
+            }
+            if paper_ids and prompt.lstrip().startswith("Below are"):
+                return json.dumps([item(paper_id) for paper_id in paper_ids])
+            return json.dumps(item(None))
+
+        # 上下文段落以"[论文id] 标题"开头（排除[DOCUMENTS]等全大写的提示词分节标记）
+        citations = [
+            match
+            for match in re.findall(r"^\[([0-9a-zA-Z_-]+)\]", prompt, re.MULTILINE)
+            if not match.isupper()
+        ]
+        count = min(max_tokens, self.reply_tokens)
+        body = " ".join(words[i % len(words)] for i in range(max(1, count - 1)))
+        return body + (f" [{citations[0]}]" if citations else "")
+
+    @staticmethod
+    def __completion(model, messages, text):
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+        completion_tokens = len(text.split())
+        return _to_chat_completion(
+            {
+                "id": "stub-" + hashlib.md5(text.encode("utf-8")).hexdigest()[:12],
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    llama.cpp本地模型（需安装llama-cpp-python并提供GGUF模型文件）。
+
+    llama.cpp的推理上下文不是线程安全的，同一时间只处理一个请求。
+    """
+
+    requires_api_key = False
+
+    def __init__(self, model_path: str, n_ctx: int = 4096, n_threads: Optional[int] = None):
+        """
+        Args:
+            model_path: GGUF模型文件路径
+            n_ctx: 上下文长度
+            n_threads: 推理线程数，None时由llama.cpp决定
+        """
+        from llama_cpp import Llama
+
+        self.llama = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self._lock = threading.Lock()
+
+    def chat(self, model, messages, **kwargs):
+        with self._lock:
+            payload = self.llama.create_chat_completion(messages=messages, **self.__options(kwargs))
+        return _to_chat_completion(payload)
+
+    async def stream(self, model, messages, **kwargs):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def _produce():
+            # 在线程中运行同步的llama.cpp流式接口，通过队列把增量交给事件循环
+            try:
+                with self._lock:
+                    for chunk in self.llama.create_chat_completion(
+                        messages=messages, stream=True, **self.__options(kwargs)
+                    ):
+                        if cancelled.is_set():
+                            break
+                        content = chunk["choices"][0].get("delta", {}).get("content")
+                        if content:
+                            loop.call_soon_threadsafe(queue.put_nowait, content)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = loop.run_in_executor(None, _produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+        finally:
+            cancelled.set()
+            await producer
+
+    @staticmethod
+    def __options(kwargs) -> Dict[str, Any]:
+        return {key: kwargs[key] for key in ("max_tokens", "temperature") if key in kwargs}
@@ -0,0 +1,319 @@
+"""共享LLM客户端模块"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .singleton_meta import SingletonMeta
+from .llm_backends import LLM_BACKENDS, LLMBackend, LlamaCppBackend, OpenAIBackend, StubBackend
+
+
+class _RateLimiter:
+    """令牌桶限流器：按每分钟请求数匀速发放令牌，允许少量突发"""
+
+    def __init__(self, requests_per_minute: float, burst: int = 1):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """获取一个令牌，必要时阻塞等待，返回等待秒数"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class LLMClientFactory(metaclass=SingletonMeta):
+    """
+    共享LLM客户端工厂（单例）。
+
+    - 所有同步OpenAI兼容客户端共用一个httpx连接池（HTTP/1.1 keep-alive），按 (API key, base_url) 复用客户端
+    - 统一的超时策略与全局并发上限
+    - 按模型的每分钟请求数限流
+    - 记录每个模型的调用次数、失败次数、延迟分位数与token用量
+    - 推理后端可替换：OpenAI兼容HTTP接口（默认）、本地确定性桩模型（压测）、llama.cpp本地模型
+    """
+
+    def __init__(
+        self,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        max_concurrency: int = 8,
+        max_retries: int = 1,
+        rate_limits: Optional[Dict[str, float]] = None,
+        backend: str = "openai",
+        backend_options: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        初始化工厂。单例模式确保此方法只执行一次。
+
+        Args:
+            timeout: 读写超时（秒）
+            connect_timeout: 建立连接超时（秒）
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 保持空闲的最大连接数
+            keepalive_expiry: 空闲连接保持时间（秒）
+            max_concurrency: 同时进行的LLM调用上限
+            max_retries: OpenAI SDK的自动重试次数
+            rate_limits: {模型名: 每分钟请求数}，未列出的模型不限流
+            backend: 推理后端，见LLM_BACKENDS
+            backend_options: 本地后端的构造参数（stub: latency_ms/tokens_per_second/reply_tokens；
+                             llamacpp: model_path/n_ctx/n_threads）
+        """
+        if backend not in LLM_BACKENDS:
+            raise ValueError(f"不支持的LLM后端: {backend}")
+        import httpx
+
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._http_client = httpx.Client(limits=self._limits, timeout=self._timeout)
+        self._clients: Dict[tuple, Any] = {}
+        self._clients_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._rate_limiters = {
+            model: _RateLimiter(rpm) for model, rpm in (rate_limits or {}).items() if rpm
+        }
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        self._metrics_lock = threading.Lock()
+        self.backend = backend
+        self._backend_options = dict(backend_options or {})
+        self._backends: Dict[tuple, LLMBackend] = {}
+
+    def get_backend(self, api_key: str = "", base_url: Optional[str] = None) -> LLMBackend:
+        """获取当前配置的推理后端（HTTP后端按 (API key, base_url) 区分，本地后端进程内只创建一个）"""
+        key = (api_key, base_url) if self.backend == "openai" else (self.backend,)
+        backend = self._backends.get(key)
+        if backend is None:
+            with self._clients_lock:
+                backend = self._backends.get(key)
+                if backend is None:
+                    if self.backend == "stub":
+                        backend = StubBackend(**self._backend_options)
+                    elif self.backend == "llamacpp":
+                        backend = LlamaCppBackend(**self._backend_options)
+                    else:
+                        backend = OpenAIBackend(self, api_key, base_url)
+                    self._backends[key] = backend
+        return backend
+
+    def is_available(self, api_key: Optional[str]) -> bool:
+        """当前后端是否可调用（HTTP后端需要API key）"""
+        return not self.__backend_class().requires_api_key or bool((api_key or "").strip())
+
+    def __backend_class(self):
+        return {"stub": StubBackend, "llamacpp": LlamaCppBackend}.get(self.backend, OpenAIBackend)
+
+    def get_client(self, api_key: str, base_url: Optional[str] = None):
+        """获取共享连接池的同步OpenAI客户端"""
+        from openai import OpenAI
+
+        key = (api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = OpenAI(
+                        api_key=api_key,
+                        base_url=base_url,
+                        max_retries=self.max_retries,
+                        http_client=self._http_client,
+                    )
+                    self._clients[key] = client
+        return client
+
+    def create_async_client(self, api_key: str, base_url: Optional[str] = None):
+        """
+        创建异步OpenAI客户端（超时与连接上限与同步客户端一致）。
+
+        异步连接绑定在创建时的事件循环上，无法跨请求复用，调用方应在使用后关闭（async with）。
+        """
+        import httpx
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=self.max_retries,
+            http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout),
+        )
+
+    def chat(self, *, api_key: str, base_url: Optional[str], model: str, messages, **kwargs):
+        """
+        调用chat.completions.create（经过限流与并发控制并记录指标）。
+
+        Returns:
+            ChatCompletion: 原始响应，异常原样抛出
+        """
+        backend = self.get_backend(api_key, base_url)
+        rate_wait = self.wait_for_rate_limit(model)
+        with self._semaphore:
+            start = time.perf_counter()
+            try:
+                response = backend.chat(model, messages, **kwargs)
+            except Exception:
+                self.record(model, (time.perf_counter() - start) * 1000, error=True, rate_wait=rate_wait)
+                raise
+        usage = getattr(response, "usage", None)
+        self.record(
+            model,
+            (time.perf_counter() - start) * 1000,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            rate_wait=rate_wait,
+        )
+        return response
+
+    async def stream(
+        self, *, api_key: str, base_url: Optional[str], model: str, messages, **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        流式调用，逐个返回文本增量（经过限流与并发控制并记录总耗时与首个增量耗时）。
+
+        限流等待与并发槽位的获取在线程中进行，不阻塞事件循环；并发槽位在流结束时释放。
+        调用方提前结束迭代（aclose）时后端连接随之关闭。
+        """
+        backend = self.get_backend(api_key, base_url)
+        rate_wait = await asyncio.to_thread(self.wait_for_rate_limit, model)
+        await self.__acquire_slot_async()
+        try:
+            start = time.perf_counter()
+            first_delta_ms: Optional[float] = None
+            error = False
+            deltas = backend.stream(model, messages, **kwargs)
+            try:
+                async for delta in deltas:
+                    if first_delta_ms is None:
+                        first_delta_ms = (time.perf_counter() - start) * 1000
+                    yield delta
+            except Exception:
+                error = True
+                raise
+            finally:
+                await deltas.aclose()
+                self.record(
+                    model,
+                    (time.perf_counter() - start) * 1000,
+                    error=error,
+                    rate_wait=rate_wait,
+                    first_token_ms=first_delta_ms,
+                )
+        finally:
+            self._semaphore.release()
+
+    async def __acquire_slot_async(self) -> None:
+        """在线程中等待并发槽位；等待期间被取消时，稍后获取到的槽位立即归还"""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._semaphore.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(
+                lambda task: self._semaphore.release() if not task.cancelled() and task.exception() is None else None
+            )
+            raise
+
+    def wait_for_rate_limit(self, model: str) -> float:
+        """按模型限流，返回等待秒数"""
+        limiter = self._rate_limiters.get(model)
+        return limiter.acquire() if limiter is not None else 0.0
+
+    def record(
+        self,
+        model: str,
+        latency_ms: float,
+        *,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        error: bool = False,
+        rate_wait: float = 0.0,
+        first_token_ms: Optional[float] = None,
+    ) -> None:
+        """记录一次调用的指标（流式调用由调用方自行计时后记录）"""
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(
+                model,
+                {
+                    "calls": 0,
+                    "errors": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "rate_limit_wait_seconds": 0.0,
+                    "latencies": deque(maxlen=500),
+                    "first_token_latencies": deque(maxlen=500),
+                },
+            )
+            stats["calls"] += 1
+            stats["errors"] += int(error)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["rate_limit_wait_seconds"] += rate_wait
+            stats["latencies"].append(latency_ms)
+            if first_token_ms is not None:
+                stats["first_token_latencies"].append(first_token_ms)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """返回各模型的调用次数、失败次数、token用量与最近500次调用的延迟（毫秒）"""
+        report = {}
+        with self._metrics_lock:
+            for model, stats in self._metrics.items():
+                latencies = sorted(stats["latencies"])
+                first_token = sorted(stats["first_token_latencies"])
+                report[model] = {
+                    key: value
+                    for key, value in stats.items()
+                    if key not in ("latencies", "first_token_latencies")
+                }
+                if latencies:
+                    report[model].update(
+                        {
+                            "latency_ms_avg": sum(latencies) / len(latencies),
+                            "latency_ms_p50": latencies[len(latencies) // 2],
+                            "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                        }
+                    )
+                if first_token:
+                    report[model]["first_token_ms_p50"] = first_token[len(first_token) // 2]
+        return report
+
+
+def get_llm_client_factory() -> LLMClientFactory:
+    """按 llm_client_config 配置获取共享LLM客户端工厂"""
+    from global_module import llm_client_config
+
+    rate_limits = llm_client_config.get("rate_limits")
+    backend = llm_client_config.get("backend", "openai")
+    backend_options = llm_client_config.get(backend) if backend != "openai" else None
+    return LLMClientFactory(
+        timeout=float(llm_client_config.get("timeout", 60)),
+        connect_timeout=float(llm_client_config.get("connect_timeout", 5)),
+        max_connections=int(llm_client_config.get("max_connections", 20)),
+        max_keepalive_connections=int(llm_client_config.get("max_keepalive_connections", 10)),
+        keepalive_expiry=float(llm_client_config.get("keepalive_expiry", 30)),
+        max_concurrency=int(llm_client_config.get("max_concurrency", 8)),
+        max_retries=int(llm_client_config.get("max_retries", 1)),
+        rate_limits=rate_limits.to_dict() if rate_limits is not None else {},
+        backend=backend,
+        backend_options=backend_options.to_dict() if backend_options is not None else {},
+    )
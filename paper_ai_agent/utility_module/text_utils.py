@@ -0,0 +1,14 @@
+"""查询文本处理工具（意图分类、检索缓存、上下文构建与对话历史共用）"""
+
+import re
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]")
+"""词切分：小写英文/数字串为一个词，每个汉字为一个词（输入需先转为小写）"""
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_TRAILING_PUNCT_PATTERN = re.compile(r"[\s?？!！.。]+$")
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询文本：小写、合并空白、去除末尾标点"""
+    return _TRAILING_PUNCT_PATTERN.sub("", _WHITESPACE_PATTERN.sub(" ", query.strip().lower()))